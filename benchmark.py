@@ -0,0 +1,408 @@
+# cryptocurrency/benchmark.py
+
+"""
+Benchmarks dos caminhos críticos do nó.
+
+Gera cadeias sintéticas de "tickets" (o mesmo formato aceito por
+/add_transaction) e mede:
+
+- a taxa de hashes da prova de trabalho;
+- o hash dos blocos e is_chain_valid conforme a cadeia cresce;
+- a busca (search_recursively e a rota /search) conforme a cadeia cresce;
+- o custo de gravação da cadeia por bloco;
+- a vazão ponta a ponta de /add_transaction e /mine_block (cliente de teste do Flask).
+
+O resultado é um JSON (na saída padrão ou em --output). Com --baseline, os
+resultados são comparados com uma execução anterior e o programa termina
+com código 1 se alguma métrica piorar mais que --tolerance.
+
+Exemplo de uso:
+    python benchmark.py --sizes 10 100 500 --output resultados.json
+    python benchmark.py --baseline resultados.json --tolerance 0.25
+"""
+
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+
+from flask import Flask
+
+from blockchain import Blockchain
+from gossip import TransactionGossip
+from miner import ProofOfWorkEngine
+from scheduler import MiningScheduler
+from sync import ChainSynchronizer
+import views
+
+# Métricas em que um valor maior é melhor; nas demais (tempos), menor é melhor
+HIGHER_IS_BETTER = ('hashes_per_second', 'blocks_per_second', 'requests_per_second',
+                    'transactions_per_second')
+
+ENGINES = ['V8', 'SpiderMonkey', 'JavaScriptCore', 'Chakra', 'Hermes']
+
+
+def make_ticket(number, rng):
+    """
+    Cria um ticket sintético no formato aceito por /add_transaction.
+
+    Args:
+        number (int): Número sequencial, usado no id.
+        rng (random.Random): Gerador de números aleatórios (para reprodutibilidade).
+
+    Returns:
+        dict: O ticket.
+    """
+    converter_id = rng.randint(1, 50)
+    return {
+        'id': f'ticket-{number}',
+        'name': f'Ticket {number}',
+        'engine': rng.choice(ENGINES),
+        'converter': {
+            'id': converter_id,
+            'code': f'CV{converter_id:03d}',
+            'name': f'Conversor {converter_id}'
+        }
+    }
+
+
+class ProofSequence:
+    """
+    Provas de trabalho válidas em sequência a partir do Bloco Gênesis.
+
+    A prova de um bloco depende só da prova anterior, então a mesma
+    sequência serve para qualquer cadeia sintética; ela é minerada uma única
+    vez e reaproveitada entre os tamanhos de cadeia.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._proofs = [1]
+
+    def get(self, count):
+        """Retorna as `count` primeiras provas (a primeira é a do Bloco Gênesis)."""
+        while len(self._proofs) < count:
+            self._proofs.append(self.engine.search(self._proofs[-1]).proof)
+        return self._proofs[:count]
+
+
+def build_blockchain(data_dir, blocks, transactions_per_block, proofs, seed):
+    """
+    Cria, em `data_dir`, um Blockchain com `blocks` blocos de tickets sintéticos.
+
+    Returns:
+        Blockchain: A instância, com a cadeia já gravada em disco.
+    """
+    rng = random.Random(seed)
+    # Dificuldade fixa, para que a mesma sequência de provas sirva a todas as cadeias
+    blockchain = Blockchain(data_dir, retarget_window=0)
+    blockchain.max_block_transactions = transactions_per_block
+    number = 0
+    for proof in proofs.get(blocks)[1:]:
+        tickets = [make_ticket(number + i, rng) for i in range(transactions_per_block)]
+        number += transactions_per_block
+        blockchain.add_transactions(tickets)
+        blockchain.create_block(proof, blockchain.get_block_hash(len(blockchain.chain) - 1))
+    return blockchain
+
+
+def timed(function, repeat):
+    """
+    Executa `function` `repeat` vezes.
+
+    Returns:
+        list: A duração de cada execução, em segundos.
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def summarize(durations):
+    """Resume uma lista de durações (mediana, mínimo e máximo, em milissegundos)."""
+    return {
+        'median_ms': round(statistics.median(durations) * 1000, 3),
+        'min_ms': round(min(durations) * 1000, 3),
+        'max_ms': round(max(durations) * 1000, 3)
+    }
+
+
+def bench_proof_of_work(args):
+    results = []
+    for workers in sorted(set(args.workers)):
+        engine = ProofOfWorkEngine(workers=workers)
+        hashes = elapsed = 0
+        previous_proof = 1
+        for _ in range(args.pow_rounds):
+            result = engine.search(previous_proof)
+            hashes += result.hashes
+            elapsed += result.elapsed
+            previous_proof = result.proof
+        results.append({
+            'benchmark': 'proof_of_work',
+            'params': {'workers': engine.workers, 'rounds': args.pow_rounds},
+            'metrics': {
+                'hashes_per_second': round(hashes / elapsed, 1) if elapsed else None,
+                'seconds_per_block': round(elapsed / args.pow_rounds, 4)
+            }
+        })
+    return results
+
+
+def bench_chain(blockchain, size, args):
+    """Benchmarks que dependem de uma cadeia de `size` blocos já montada."""
+    chain = list(blockchain.chain)
+    params = {'blocks': size, 'transactions_per_block': args.transactions_per_block}
+    results = []
+
+    durations = timed(lambda: [blockchain.hash(block) for block in chain], args.repeat)
+    results.append({
+        'benchmark': 'hash',
+        'params': params,
+        'metrics': dict(summarize(durations),
+                        blocks_per_second=round(size / statistics.median(durations), 1))
+    })
+
+    durations = timed(lambda: [blockchain.get_block_hash(position) for position in range(size)], args.repeat)
+    results.append({
+        'benchmark': 'stored_hash',
+        'params': params,
+        'metrics': dict(summarize(durations),
+                        blocks_per_second=round(size / statistics.median(durations), 1))
+    })
+
+    durations = timed(lambda: blockchain.is_chain_valid(blockchain.chain, full=True), args.repeat)
+    results.append({
+        'benchmark': 'is_chain_valid_full',
+        'params': params,
+        'metrics': dict(summarize(durations),
+                        blocks_per_second=round(size / statistics.median(durations), 1))
+    })
+
+    # Validação incremental: após a primeira, só o que mudou é conferido
+    blockchain.is_chain_valid(blockchain.chain)
+    durations = timed(lambda: blockchain.is_chain_valid(blockchain.chain), args.repeat)
+    results.append({
+        'benchmark': 'is_chain_valid_incremental',
+        'params': params,
+        'metrics': summarize(durations)
+    })
+
+    # Busca por um termo que aparece em poucos tickets, no meio da cadeia
+    term = chain[size // 2]['transactions'][0]['id'] if size > 1 else 'inexistente'
+
+    def scan():
+        return [transaction for block in chain for transaction in block['transactions']
+                if views.search_recursively(transaction, term)]
+
+    results.append({
+        'benchmark': 'search_recursively',
+        'params': params,
+        'metrics': summarize(timed(scan, args.repeat))
+    })
+
+    client = make_client(blockchain)
+    results.append({
+        'benchmark': 'search_route',
+        'params': params,
+        'metrics': summarize(timed(lambda: client.get('/search', query_string={'q': term}), args.repeat))
+    })
+
+    durations = timed(blockchain.save_chain_to_disk, args.repeat)
+    results.append({
+        'benchmark': 'save_chain_to_disk',
+        'params': params,
+        'metrics': dict(summarize(durations),
+                        ms_per_block=round(statistics.median(durations) * 1000 / size, 4))
+    })
+    return results
+
+
+def bench_end_to_end(data_dir, args):
+    """Vazão de /add_transaction e /mine_block pelo cliente de teste do Flask."""
+    blockchain = Blockchain(data_dir, retarget_window=0)
+    blockchain.max_block_transactions = args.transactions_per_block
+    client = make_client(blockchain)
+    rng = random.Random(args.seed)
+
+    requests_count = args.requests
+    batch = args.transactions_per_request
+    started = time.perf_counter()
+    for number in range(requests_count):
+        tickets = [make_ticket(number * batch + i, rng) for i in range(batch)]
+        response = client.post('/add_transaction', json={'transactions': tickets})
+        if response.status_code != 201:
+            raise RuntimeError(f'/add_transaction respondeu {response.status_code}: {response.get_data(as_text=True)}')
+    elapsed = time.perf_counter() - started
+    results = [{
+        'benchmark': 'add_transaction_route',
+        'params': {'requests': requests_count, 'transactions_per_request': batch},
+        'metrics': {
+            'requests_per_second': round(requests_count / elapsed, 1),
+            'transactions_per_second': round(requests_count * batch / elapsed, 1)
+        }
+    }]
+
+    blocks = args.mine_blocks
+    started = time.perf_counter()
+    for _ in range(blocks):
+        job = client.get('/mine_block').get_json()['job']
+        while job['status'] in ('queued', 'running'):
+            time.sleep(0.005)
+            job = client.get(f"/mining/jobs/{job['id']}").get_json()
+        if job['status'] != 'found':
+            raise RuntimeError(f"Mineração terminou com estado {job['status']}: {job.get('error')}")
+    elapsed = time.perf_counter() - started
+    results.append({
+        'benchmark': 'mine_block_route',
+        'params': {'blocks': blocks, 'transactions_per_block': args.transactions_per_block},
+        'metrics': {'blocks_per_second': round(blocks / elapsed, 3)}
+    })
+    blockchain.storage.close()
+    return results
+
+
+def make_client(blockchain):
+    """Monta uma aplicação Flask com as rotas do nó, sem rede, e retorna seu cliente de teste."""
+    synchronizer = ChainSynchronizer(blockchain, interval=0)
+    views.set_blockchain(blockchain)
+    views.set_chain_synchronizer(synchronizer)
+    views.set_mining_scheduler(MiningScheduler(blockchain, synchronizer))
+    views.set_transaction_gossip(TransactionGossip(blockchain))
+    app = Flask(__name__)
+    app.register_blueprint(views.api_blueprint)
+    return app.test_client()
+
+
+def environment():
+    """Informações do ambiente, para comparar execuções de máquinas diferentes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compara os resultados com uma execução anterior.
+
+    Returns:
+        list: As regressões encontradas (métricas que pioraram mais que `tolerance`).
+    """
+    previous = {(entry['benchmark'], json.dumps(entry['params'], sort_keys=True)): entry['metrics']
+                for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        old_metrics = previous.get((entry['benchmark'], json.dumps(entry['params'], sort_keys=True)))
+        if old_metrics is None:
+            continue
+        for name, value in entry['metrics'].items():
+            old_value = old_metrics.get(name)
+            if not old_value or value is None or name in ('min_ms', 'max_ms'):
+                continue
+            change = (value - old_value) / old_value
+            if name in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append({
+                    'benchmark': entry['benchmark'],
+                    'params': entry['params'],
+                    'metric': name,
+                    'baseline': old_value,
+                    'current': value,
+                    'change': round(change, 3)
+                })
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description='Benchmarks dos caminhos críticos do nó')
+    parser.add_argument('--sizes', nargs='+', default=[10, 100, 500], type=int,
+                        help='Tamanhos (em blocos) das cadeias sintéticas')
+    parser.add_argument('--transactions-per-block', default=20, type=int,
+                        help='Tickets por bloco nas cadeias sintéticas')
+    parser.add_argument('--repeat', default=5, type=int, help='Repetições de cada medição')
+    parser.add_argument('--workers', nargs='+', default=[1], type=int,
+                        help='Processos testados na prova de trabalho (0 = um por núcleo)')
+    parser.add_argument('--pow-rounds', default=20, type=int, help='Provas mineradas por medição de hash rate')
+    parser.add_argument('--requests', default=200, type=int, help='Requisições a /add_transaction')
+    parser.add_argument('--transactions-per-request', default=5, type=int,
+                        help='Tickets por requisição a /add_transaction')
+    parser.add_argument('--mine-blocks', default=5, type=int, help='Blocos minerados via /mine_block')
+    parser.add_argument('--seed', default=42, type=int, help='Semente dos dados sintéticos')
+    parser.add_argument('--only', nargs='+', choices=['pow', 'chain', 'e2e'],
+                        help='Executa apenas os grupos escolhidos')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: saída padrão)')
+    parser.add_argument('--baseline', help='Resultado anterior para detectar regressões')
+    parser.add_argument('--tolerance', default=0.2, type=float,
+                        help='Piora relativa máxima aceita em relação ao --baseline')
+    args = parser.parse_args()
+    groups = set(args.only or ['pow', 'chain', 'e2e'])
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='blockchain-bench-')
+    # As mensagens de progresso do nó (Blockchain, agendador, consenso) vão
+    # para a saída de erro, para que a saída padrão tenha só o relatório JSON
+    try:
+        with redirect_stdout(sys.stderr):
+            if 'pow' in groups:
+                print('Medindo a prova de trabalho...', file=sys.stderr)
+                results.extend(bench_proof_of_work(args))
+
+            if 'chain' in groups:
+                proofs = ProofSequence(ProofOfWorkEngine(workers=0))
+                for size in sorted(args.sizes):
+                    print(f'Medindo a cadeia de {size} blocos...', file=sys.stderr)
+                    data_dir = os.path.join(work_dir, f'chain-{size}')
+                    os.makedirs(data_dir)
+                    blockchain = build_blockchain(data_dir, size, args.transactions_per_block, proofs, args.seed)
+                    results.extend(bench_chain(blockchain, size, args))
+                    blockchain.storage.close()
+
+            if 'e2e' in groups:
+                print('Medindo as rotas ponta a ponta...', file=sys.stderr)
+                data_dir = os.path.join(work_dir, 'e2e')
+                os.makedirs(data_dir)
+                results.extend(bench_end_to_end(data_dir, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'environment': environment(), 'params': vars(args), 'results': results}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            report['regressions'] = compare(results, json.load(f), args.tolerance)
+        if report['regressions']:
+            print(f"{len(report['regressions'])} regressão(ões) acima de {args.tolerance:.0%}.", file=sys.stderr)
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,59 +3,434 @@
 import datetime
 import hashlib
 import json
-import requests
+import os
 from urllib.parse import urlparse
 
+import metrics
+from locks import ReadWriteLock
+from merkle import merkle_root
+from mempool import Mempool
+from miner import LEGACY_DIFFICULTY, ProofOfWorkEngine, valid_proof, work_target
+from peers import PeerClient, PeerRegistry
+from search_index import SearchIndex
+from storage import BlockLog, BlockStore, ChainView, PrunedBlockError, StateSnapshot
+
+# Quanto o relógio de um bloco pode estar adiantado em relação ao nosso
+MAX_FUTURE_DRIFT = datetime.timedelta(minutes=2)
+# Campos que todo bloco recebido de outro nó precisa ter
+BLOCK_REQUIRED_KEYS = ['index', 'timestamp', 'proof', 'previous_hash', 'transactions']
+
+
+def _is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_block_fields(block):
+    """
+    Confere os campos e os tipos de um bloco recebido de outro nó, antes que
+    ele chegue à validação da cadeia (que supõe os tipos corretos).
+
+    Returns:
+        str: A descrição do problema, ou None se os tipos estiverem corretos.
+    """
+    if not isinstance(block, dict) or not all(key in block for key in BLOCK_REQUIRED_KEYS):
+        return f'Os campos {", ".join(BLOCK_REQUIRED_KEYS)} são obrigatórios.'
+    if not _is_integer(block['index']) or block['index'] < 1:
+        return 'O campo "index" deve ser um inteiro positivo.'
+    if not _is_integer(block['proof']):
+        return 'O campo "proof" deve ser um inteiro.'
+    if 'difficulty' in block and (not _is_integer(block['difficulty']) or block['difficulty'] < 1):
+        return 'O campo "difficulty" deve ser um inteiro positivo.'
+    for key in ('timestamp', 'previous_hash', 'merkle_root'):
+        if key in block and not isinstance(block[key], str):
+            return f'O campo "{key}" deve ser um texto.'
+    transactions = block['transactions']
+    if not isinstance(transactions, list) or not all(isinstance(t, dict) for t in transactions):
+        return 'O campo "transactions" deve ser uma lista de objetos.'
+    return None
+
+
+def validate_head(head):
+    """
+    Confere os campos e os tipos do topo anunciado por outro nó
+    (/chain/head ou /chain/snapshot).
+
+    Returns:
+        str: A descrição do problema, ou None se os tipos estiverem corretos.
+    """
+    if not isinstance(head, dict):
+        return 'A resposta deve ser um objeto.'
+    if not _is_integer(head.get('height')) or head['height'] < 1:
+        return 'O campo "height" deve ser um inteiro positivo.'
+    if not _is_integer(head.get('cumulative_work')) or head['cumulative_work'] < 0:
+        return 'O campo "cumulative_work" deve ser um inteiro não negativo.'
+    if 'first_index' in head and (not _is_integer(head['first_index'])
+                                  or not 1 <= head['first_index'] <= head['height']):
+        return 'O campo "first_index" deve ser um inteiro entre 1 e "height".'
+    if 'tip_hash' in head and not isinstance(head['tip_hash'], str):
+        return 'O campo "tip_hash" deve ser um texto.'
+    return None
+
+
 class Blockchain:
     """
     Classe que representa a estrutura e as operações do Blockchain.
+
+    O acesso à cadeia é protegido por `self.lock` (leitores/escritor): várias
+    leituras podem acontecer ao mesmo tempo, enquanto o commit de um bloco e
+    a substituição da cadeia são atômicos. As transações pendentes ficam no
+    mempool, que tem trava própria, para que novas transações não esperem
+    pelos commits.
+
+    Com `read_only`, a instância é uma réplica que só lê os blocos gravados
+    por outro processo no mesmo diretório (ver refresh), usada pelos
+    processos extras do modo de produção.
+
+    A cada `checkpoint_interval` blocos o retrato do estado derivado é
+    gravado e, com `prune_depth`, os blocos mais antigos que essa
+    profundidade são descartados do disco (ver prune). Um nó novo pode
+    começar a partir do retrato de outro nó e dos blocos recentes, sem
+    baixar a cadeia desde o Bloco Gênesis (ver bootstrap).
     """
     
-    # 1. SUBSTITUA SEU __init__ POR ESTE
-    def __init__(self):
+    def __init__(self, data_dir='.', mining_workers=1, max_block_transactions=500,
+                 target_block_interval=10.0, retarget_window=10, read_only=False,
+                 checkpoint_interval=1000, prune_depth=0):
         self.chain = []
-        self.transactions = []
-        self.nodes = set()
+        self.mempool = Mempool()
+        # Quantidade máxima de transações do mempool incluídas em cada bloco
+        self.max_block_transactions = max_block_transactions
+        # Ajuste de dificuldade: intervalo desejado entre blocos (segundos) e
+        # quantos blocos recentes são considerados (0 = dificuldade fixa).
+        # Precisam ser iguais em todos os nós da rede.
+        self.target_block_interval = target_block_interval
+        self.retarget_window = retarget_window
+        self.read_only = read_only
+        # Blocos entre os retratos periódicos do estado (0 = só ao encerrar) e
+        # quantos blocos abaixo do topo são mantidos em disco (0 = todos)
+        self.checkpoint_interval = checkpoint_interval
+        self.prune_depth = prune_depth
+        # Trabalho acumulado dos blocos já podados (anteriores ao primeiro guardado)
+        self.pruned_work = 0
+        self._last_checkpoint = 0
+        self.lock = ReadWriteLock()
+        # Nós da rede, com latência, falhas e topo anunciado de cada um
+        self.peers = PeerRegistry()
+        # Funções chamadas sempre que a cadeia local é substituída por outra
+        self.chain_replaced_listeners = []
+        # Funções chamadas como listener(bloco) a cada bloco minerado por este nó
+        self.block_listeners = []
+        # Tamanho do prefixo da cadeia local já validado
+        self._validated_length = 0
+        # Quantas vezes um bloco já gravado foi alterado (ver edit_block_test)
+        self.edit_count = 0
+        # Índice invertido das transações, usado pela rota /search
+        self.search_index = SearchIndex()
+        self.peer_client = PeerClient(registry=self.peers)
+        # Latência e erros por nó da última rodada de consenso
+        self.last_peer_report = []
+        self.miner = ProofOfWorkEngine(workers=mining_workers)
+        # Blocos em formato binário com índice e o hash de cada bloco, calculado
+        # uma vez ao gravá-lo; o log JSON-lines antigo é migrado
+        self.storage = BlockStore(data_dir, legacy_log=BlockLog(
+            path=os.path.join(data_dir, 'blockchain_data.jsonl'),
+            legacy_path=os.path.join(data_dir, 'blockchain_data.json')
+        ), hasher=self.hash, read_only=read_only)
+        # Estado derivado salvo ao encerrar, para iniciar sem percorrer a cadeia
+        self.snapshot = StateSnapshot(os.path.join(data_dir, 'chain_state.json'))
+        # Pontos de poda: índice e hash do último bloco descartado e o
+        # trabalho acumulado até ele (ver prune)
+        self.prune_points = StateSnapshot(os.path.join(data_dir, 'prune_points.json'))
         # Tenta carregar a cadeia do disco
         self.load_chain_from_disk()
 
-    # 2. ADICIONE ESTES DOIS NOVOS MÉTODOS À SUA CLASSE
     def load_chain_from_disk(self):
-        """Carrega a blockchain de um arquivo JSON, se existir."""
-        try:
-            with open('blockchain_data.json', 'r') as f:
-                self.chain = json.load(f)
-            # Se o arquivo estava vazio ou corrompido
-            if not self.chain:
-                print("Arquivo encontrado, mas vazio. Criando Bloco Gênesis.")
+        """
+        Abre o armazenamento de blocos. Os blocos são lidos do disco sob
+        demanda (ver ChainView), e não carregados todos na memória.
+
+        O estado derivado (trabalho acumulado, índice de busca, ids gravados)
+        vem do último retrato salvo; a cadeia só é percorrida inteira se o
+        retrato não existir ou não conferir com os blocos.
+        """
+        with self.lock.write_locked():
+            self.storage.open()
+            self.chain = ChainView(self.storage)
+            self._validated_length = 0
+            self.pruned_work = self._load_pruned_work()
+            if not self._restore_snapshot():
+                if self.chain.first:
+                    print("AVISO: Cadeia podada sem retrato de estado válido. Os ids gravados e o "
+                          "índice de busca cobrirão apenas os blocos mantidos em disco.")
+                self.total_work = self.pruned_work + self.chain_work(self.chain)
+                self.search_index.rebuild(self.chain)
+                self.mempool.rebuild_committed(self.chain)
+            self._last_checkpoint = len(self.chain)
+            if not self.chain and not self.read_only:
+                print("Nenhum bloco encontrado em disco. Criando Bloco Gênesis.")
                 self.create_block(proof=1, previous_hash='0')
-        except (FileNotFoundError, json.JSONDecodeError):
-            print("Nenhum arquivo de blockchain encontrado. Criando Bloco Gênesis.")
-            self.create_block(proof=1, previous_hash='0')
 
     def save_chain_to_disk(self):
-        """Salva a blockchain atual em um arquivo JSON."""
-        with open('blockchain_data.json', 'w') as f:
-            json.dump(self.chain, f, indent=4)
-
-    # 3. MODIFIQUE SEU create_block PARA CHAMAR O MÉTODO DE SALVAR
-    def create_block(self, proof, previous_hash):
-        # ... (toda a lógica que você já tem para criar o 'block') ...
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': f'{datetime.datetime.now(datetime.timezone.utc).isoformat()}',
-            'proof': proof,
-            'previous_hash': previous_hash,
-            'transactions': self.transactions
-        }
-        self.transactions = []
-        self.chain.append(block)
-        
-        # A LINHA MÁGICA:
-        self.save_chain_to_disk() # Salva toda vez que um bloco é criado
+        """
+        Regrava a cadeia inteira no armazenamento de blocos. Só é necessário
+        quando a cadeia é substituída; blocos novos são anexados em create_block.
+        """
+        with self.lock.write_locked():
+            # Materializa os blocos antes, pois a cadeia pode estar sendo lida do próprio arquivo
+            blocks = list(self.chain)
+            self.storage.rewrite(blocks, self.storage.base_index)
+            self.chain = ChainView(self.storage)
+
+    def save_snapshot(self):
+        """
+        Grava o retrato do estado derivado da cadeia (ver load_chain_from_disk).
+        Não grava nada se algum bloco tiver sido alterado só na memória.
+        """
+        with self.lock.read_locked():
+            if not self.chain or self.chain.edited:
+                return
+            height = len(self.chain)
+            state = {
+                'height': height,
+                'tip_hash': self.get_block_hash(height - 1),
+                'total_work': self.total_work,
+                'validated_length': self._validated_length,
+                'search_index': self.search_index.export_state(),
+                'committed_ids': self.mempool.committed_ids()
+            }
+            # Serializado ainda sob a trava, pois o índice é alterado a cada bloco
+            self.snapshot.save(state)
+
+    def close(self):
+        """Salva o retrato do estado e fecha o armazenamento de blocos."""
+        if not self.read_only:
+            self.save_snapshot()
+        self.storage.close()
+
+    def refresh(self):
+        """
+        Réplica (`read_only`): incorpora os blocos gravados pelo processo
+        escritor desde a última chamada, atualizando o estado derivado.
+
+        Returns:
+            bool: True se a cadeia mudou.
+        """
+        with self.lock.read_locked():
+            if not self.storage.changed():
+                return False
+        with self.lock.write_locked():
+            height = len(self.chain)
+            change = self.storage.refresh()
+            if change == 'replaced':
+                self.chain = ChainView(self.storage)
+                self._validated_length = 0
+                self.pruned_work = self._load_pruned_work()
+                self.total_work = self.pruned_work + self.chain_work(self.chain)
+                self.search_index.rebuild(self.chain)
+            elif change == 'grown':
+                for block in self.chain[height:]:
+                    self.total_work += self.block_work(block)
+                    self.search_index.add_block(block)
+            return change is not None
+
+    def _restore_snapshot(self):
+        """
+        Restaura o estado derivado a partir do retrato salvo. Blocos gravados
+        depois do retrato (ex: o nó caiu sem encerrar) são processados em
+        seguida. Requer a trava de escrita.
 
+        Returns:
+            bool: True se o retrato foi usado, False se a cadeia precisa ser percorrida.
+        """
+        state = self.snapshot.load()
+        if state is None:
+            return False
+        height = state['height']
+        try:
+            matches = 0 < height <= len(self.chain) and self.chain.digest(height - 1) == state['tip_hash']
+        except PrunedBlockError:
+            matches = False
+        if not matches:
+            print("AVISO: O retrato de estado não confere com os blocos em disco. Reconstruindo.")
+            return False
+
+        self.total_work = state['total_work']
+        self.search_index.load_state(state['search_index'])
+        if self.chain.first:
+            # O retrato pode ser anterior à última poda
+            self.search_index.prune(self.chain.first + 1)
+        self.mempool.restore_committed(state['committed_ids'])
+        self._validated_length = min(state['validated_length'], height)
+        for block in self.chain[height:]:
+            self.total_work += self.block_work(block)
+            self.search_index.add_block(block)
+            self.mempool.mark_committed(block['transactions'])
+        if self.chain.first:
+            self._narrow_committed()
+        return True
+
+    def prune(self):
+        """
+        Descarta do disco os blocos mais antigos que `prune_depth` blocos
+        abaixo do topo. São sempre mantidos ao menos `retarget_window` + 2
+        blocos, para que a dificuldade dos próximos blocos possa ser
+        conferida. O trabalho acumulado continua contando os blocos
+        descartados; o índice de busca e os ids gravados (a janela em que o
+        mempool recusa ids repetidos) passam a cobrir só os blocos mantidos,
+        para que não cresçam sem limite. Requer a trava de escrita.
+
+        Returns:
+            int: Quantos blocos foram descartados.
+        """
+        if self.prune_depth <= 0 or self.chain.edited:
+            return 0
+        first = len(self.chain) - max(self.prune_depth, self.retarget_window + 2)
+        if first <= self.chain.first:
+            return 0
+        dropped = first - self.chain.first
+        pruned_work = self.pruned_work + self.chain_work(self.chain[self.chain.first:first])
+        # O ponto de poda é gravado antes dos blocos serem descartados
+        self._save_prune_point(first, self.get_block_hash(first - 1), pruned_work)
+        self.storage.prune(dropped)
+        self.chain = ChainView(self.storage)
+        self.pruned_work = pruned_work
+        self.search_index.prune(first + 1)
+        self._narrow_committed()
+        print(f"PODA: {dropped} bloco(s) descartado(s); a cadeia guardada começa no bloco {first + 1}.")
+        return dropped
+
+    def _narrow_committed(self):
+        """
+        Em um nó que poda a cadeia, mantém só os ids gravados nos blocos
+        guardados em disco, consultando o índice de busca (que já cobre só
+        esses blocos). Requer a trava de escrita.
+        """
+        if self.prune_depth <= 0:
+            return
+        self.mempool.retain_committed(lambda tx_id: bool(self.search_index.search(tx_id, field='id')))
+
+    def _checkpoint_if_due(self):
+        """
+        A cada `checkpoint_interval` blocos, grava o retrato do estado e poda
+        os blocos antigos. Requer a trava de escrita.
+        """
+        height = len(self.chain)
+        if self.checkpoint_interval <= 0 or height - self._last_checkpoint < self.checkpoint_interval:
+            return
+        self._last_checkpoint = height
+        # O retrato vem antes da poda: se o nó cair entre os dois, o topo
+        # do retrato continua em disco e ele ainda pode ser usado
+        self.save_snapshot()
+        self.prune()
+
+    def _save_prune_point(self, index, block_hash, cumulative_work):
+        """Registra o último bloco descartado (mantendo também o ponto anterior)."""
+        state = self.prune_points.load() or {}
+        points = state.get('points', [])[-1:]
+        points.append({'index': index, 'hash': block_hash, 'cumulative_work': cumulative_work})
+        self.prune_points.save({'points': points})
+
+    def _load_pruned_work(self):
+        """
+        Retorna o trabalho acumulado dos blocos podados, a partir do ponto de
+        poda que corresponde ao primeiro bloco guardado em disco.
+        """
+        first = self.chain.first
+        if not first:
+            return 0
+        state = self.prune_points.load() or {}
+        for point in state.get('points', []):
+            if point['index'] == first and point['hash'] == self.chain[first]['previous_hash']:
+                return point['cumulative_work']
+        print(f"AVISO: Ponto de poda do bloco {first} não encontrado. O trabalho acumulado "
+              f"contará apenas os blocos mantidos em disco.")
+        return 0
+
+    def create_block(self, proof, previous_hash, extra_transactions=()):
+        """
+        Cria um novo bloco com um lote de transações pendentes (no máximo
+        `max_block_transactions`) e o anexa à cadeia.
+
+        Args:
+            proof (int): A prova de trabalho do novo bloco.
+            previous_hash (str): O hash do bloco anterior.
+            extra_transactions (iterable, opcional): Transações incluídas
+                após o lote, fora do mempool (ex: a recompensa de mineração).
+
+        Returns:
+            dict: O bloco criado.
+        """
+        with self.lock.write_locked():
+            # Retira o lote do mempool de uma vez: transações que chegarem
+            # durante o commit continuam pendentes para o próximo bloco
+            batch = self.mempool.take_batch(self.max_block_transactions)
+            transactions = batch + list(extra_transactions)
+            try:
+                # O horário de um bloco não pode ser anterior ao do bloco anterior
+                timestamp = datetime.datetime.now(datetime.timezone.utc)
+                if self.chain:
+                    try:
+                        timestamp = max(timestamp, self.block_time(self.chain[-1]))
+                    except ValueError:
+                        pass
+
+                block = {
+                    'index': len(self.chain) + 1,
+                    'timestamp': f'{timestamp.isoformat()}',
+                    'proof': proof,
+                    'previous_hash': previous_hash,
+                    'difficulty': self.next_difficulty() if self.chain else LEGACY_DIFFICULTY,
+                    'merkle_root': merkle_root(transactions),
+                    'transactions': transactions
+                }
+                # Apenas anexa o novo bloco ao armazenamento, sem regravar a cadeia inteira
+                self.chain.append(block)
+            except BaseException:
+                # O bloco não foi gravado: o lote volta a ficar pendente
+                self.mempool.return_batch(batch)
+                raise
+            self.total_work += self.block_work(block)
+            self.search_index.add_block(block)
+            self._checkpoint_if_due()
+
+        for listener in self.block_listeners:
+            listener(block)
         return block
 
+    def receive_block(self, block):
+        """
+        Tenta anexar ao topo um bloco anunciado por outro nó. Só o próprio
+        bloco é conferido contra o nosso último bloco, sem revalidar a cadeia.
+
+        Args:
+            block (dict): O bloco anunciado.
+
+        Returns:
+            str: 'appended' se foi anexado; 'known' se já o temos (ou se ele é
+            anterior aos blocos mantidos após a poda, e não altera o topo); 'gap' se
+            faltam blocos entre o nosso topo e ele; 'fork' se ele não se
+            encaixa no nosso topo; 'invalid' se a dificuldade, o horário ou a
+            prova de trabalho não conferirem.
+        """
+        with self.lock.write_locked():
+            height = len(self.chain)
+            if block['index'] <= height:
+                if block['index'] <= self.chain.first:
+                    return 'known'
+                if self.hash(block) == self.get_block_hash(block['index'] - 1):
+                    return 'known'
+                return 'fork'
+            if block['index'] > height + 1:
+                return 'gap'
+            if block['previous_hash'] != self.get_block_hash(height - 1):
+                return 'fork'
+            if not self.is_extension_valid([block]):
+                return 'invalid'
+            self._extend_chain([block])
+
+        self._notify_chain_replaced()
+        return 'appended'
+
     def get_previous_block(self):
         """
         Retorna o último bloco da cadeia.
@@ -63,26 +438,68 @@ class Blockchain:
         Returns:
             dict: O bloco mais recente da cadeia.
         """
-        return self.chain[-1]
+        with self.lock.read_locked():
+            return self.chain[-1]
+
+    @property
+    def transactions(self):
+        """Cópia da lista de transações pendentes, em ordem de chegada."""
+        return self.mempool.transactions()
 
     def add_transaction(self, transaction):
         """
-        Adiciona uma nova transação à lista de transações pendentes.
+        Adiciona uma nova transação ao mempool.
 
         Args:
             transaction (dict): A transação a ser adicionada.
 
         Returns:
-            int: O índice do bloco que irá conter esta transação.
+            int: O índice do próximo bloco a ser minerado.
+
+        Raises:
+            TransactionRejected: Se o id já existir ou o mempool estiver cheio.
+        """
+        return self.add_transactions([transaction])
+
+    def add_transactions(self, transactions):
+        """
+        Adiciona um lote de transações ao mempool: ou todas entram, ou nenhuma.
+
+        Args:
+            transactions (list): As transações a serem adicionadas.
+
+        Returns:
+            int: O índice do próximo bloco a ser minerado.
+
+        Raises:
+            TransactionRejected: Se algum id já existir ou o lote não couber.
         """
-        self.transactions.append(transaction)
+        self.mempool.add_many(transactions)
         previous_block = self.get_previous_block()
         return previous_block['index'] + 1
 
+    def add_transactions_bulk(self, transactions):
+        """
+        Adiciona ao mempool, de uma só vez, as transações que puderem entrar;
+        as recusadas não afetam as demais (ver Mempool.add_bulk).
+
+        Args:
+            transactions (list): As transações a serem adicionadas.
+
+        Returns:
+            tuple: (lista com None ou o motivo da recusa de cada transação,
+            índice do próximo bloco a ser minerado).
+        """
+        results = self.mempool.add_bulk(transactions)
+        previous_block = self.get_previous_block()
+        return results, previous_block['index'] + 1
+
     def proof_of_work(self, previous_proof):
         """
         Encontra um número (prova) que, quando combinado com a prova anterior,
-        produz um hash com 4 zeros à esquerda.
+        produz um hash abaixo do alvo do próximo bloco (ver next_difficulty).
+        A busca é feita pelo motor de mineração (`self.miner`), que pode usar
+        vários processos.
 
         Args:
             previous_proof (int): A prova de trabalho do bloco anterior.
@@ -90,118 +507,768 @@ class Blockchain:
         Returns:
             int: A nova prova de trabalho encontrada.
         """
-        new_proof = 1
-        check_proof = False
-        while not check_proof:
-            # Operação de hash para o algoritmo de consenso
-            hash_operation = hashlib.sha256(
-                str(new_proof**2 - previous_proof**2).encode()
-            ).hexdigest()
-            
-            # Verifica se o hash atende à condição de dificuldade
-            if hash_operation[:4] == '0000':
-                check_proof = True
-            else:
-                new_proof += 1
-        return new_proof
+        return self.miner.search(previous_proof, target=work_target(self.next_difficulty())).proof
+
+    def next_difficulty(self):
+        """
+        Retorna a dificuldade exigida do próximo bloco a ser minerado.
+
+        Returns:
+            int: A dificuldade (quantidade média de hashes para encontrar a prova).
+        """
+        with self.lock.read_locked():
+            window = self.chain[max(0, len(self.chain) - self.retarget_window - 1):]
+            return self._expected_difficulty(window, len(window))
+
+    @staticmethod
+    def block_time(block):
+        """
+        Retorna o horário de um bloco. Horários sem fuso (blocos antigos) são
+        tratados como UTC.
+
+        Raises:
+            ValueError: Se o horário não estiver no formato ISO 8601.
+        """
+        moment = datetime.datetime.fromisoformat(block['timestamp'])
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        return moment
 
     def hash(self, block):
         """
         Calcula o hash SHA-256 de um bloco.
 
+        Blocos com 'merkle_root' têm o hash calculado só sobre o cabeçalho
+        (as transações entram pela raiz de Merkle), então o mesmo hash pode
+        ser obtido a partir do bloco completo ou apenas do cabeçalho. Blocos
+        antigos, sem a raiz, têm o hash calculado sobre o bloco inteiro.
+
         Args:
-            block (dict): O bloco para o qual o hash será calculado.
+            block (dict): O bloco (ou cabeçalho) para o qual o hash será calculado.
 
         Returns:
             str: O hash do bloco em formato hexadecimal.
         """
+        if 'merkle_root' in block:
+            block = self.block_header(block)
         encoded_block = json.dumps(block, sort_keys=True).encode()
         return hashlib.sha256(encoded_block).hexdigest()
 
-    def is_chain_valid(self, chain):
+    @staticmethod
+    def block_header(block):
+        """
+        Retorna o cabeçalho do bloco: todos os campos, exceto as transações.
+
+        Args:
+            block (dict): O bloco.
+
+        Returns:
+            dict: O cabeçalho.
+        """
+        return {key: value for key, value in block.items() if key != 'transactions'}
+
+    def get_block_hash(self, position):
+        """
+        Retorna o hash de um bloco da cadeia local. É o hash gravado junto ao
+        bloco (ver BlockStore), sem serializar o bloco de novo, exceto se o
+        bloco tiver sido alterado na memória.
+
+        Args:
+            position (int): Posição do bloco na cadeia (0 é o Bloco Gênesis).
+
+        Returns:
+            str: O hash do bloco em formato hexadecimal.
         """
-        Verifica a integridade de toda a cadeia de blocos.
+        with self.lock.read_locked():
+            return self.chain.digest(position)
+
+    def invalidate_block(self, position):
+        """
+        Recua o ponto de validação após a alteração de um bloco, para que a
+        próxima verificação confira o bloco novamente. O hash gravado do bloco
+        já deixa de valer ao alterá-lo (ver ChainView.digest).
+
+        Args:
+            position (int): Posição do bloco alterado na cadeia.
+        """
+        with self.lock.write_locked():
+            self._validated_length = min(self._validated_length, position)
+            self.edit_count += 1
+
+    def is_chain_valid(self, chain, full=False):
+        """
+        Verifica a integridade da cadeia de blocos.
+
+        Para a cadeia local, apenas os blocos posteriores ao último ponto já
+        validado são conferidos, usando os hashes gravados. Em outras cadeias,
+        o prefixo formado pelos mesmos blocos (objetos) da nossa cadeia
+        validada também é pulado. Em uma cadeia podada, a conferência começa
+        após a janela de dificuldade que segue o primeiro bloco guardado.
+        Uma lista que começa depois do Bloco Gênesis (ex: /get_chain de um nó
+        podado) tem a janela inicial conferida só no encadeamento e na raiz
+        de Merkle, e o restante por completo.
 
         Args:
             chain (list): A cadeia de blocos a ser validada.
+            full (bool): Se True, revalida tudo desde o Bloco Gênesis (ou
+                desde o primeiro bloco guardado), recalculando os hashes (modo de auditoria, que também detecta
+                blocos alterados diretamente nos arquivos).
 
         Returns:
             bool: True se a cadeia for válida, False caso contrário.
         """
-        previous_block = chain[0]
-        block_index = 1
+        mode = 'full' if full else ('local' if chain is self.chain else 'foreign')
+        with metrics.chain_validation_duration.labels(mode).time():
+            with self.lock.read_locked():
+                first = self._first_checked(chain)
+                if chain is self.chain:
+                    if full:
+                        return self._check_links(chain, first, lambda position: self.hash(chain[position]))
+                    valid = self._check_links(chain, max(self._validated_length, first), self.get_block_hash)
+                    if valid:
+                        self._validated_length = len(chain)
+                    return valid
+
+                start = first
+                if not full and first == 1 and not self.chain.first:
+                    limit = min(self._validated_length, len(chain))
+                    while start < limit and chain[start] is self.chain[start]:
+                        start += 1
+            if not isinstance(chain, ChainView) and first > 1 and not self._check_checkpoint_window(chain, first):
+                return False
+            return self._check_links(chain, start, lambda position: self.hash(chain[position]))
+
+    def is_extension_valid(self, blocks):
+        """
+        Verifica blocos que estendem a nossa cadeia, a partir do bloco de
+        índice blocks[0]['index'] - 1 (que precisa existir na cadeia local).
+        Os blocos anteriores da cadeia local servem de janela para conferir
+        a dificuldade dos novos blocos.
+
+        Args:
+            blocks (list): Os novos blocos, em ordem.
+
+        Returns:
+            bool: True se os blocos forem válidos sobre a nossa cadeia.
+        """
+        with metrics.chain_validation_duration.labels('extension').time():
+            with self.lock.read_locked():
+                height = blocks[0]['index'] - 1
+                if not self.chain.first < height <= len(self.chain):
+                    return False
+                context = self.chain[max(0, height - self.retarget_window - 1):height]
+                tip_hash = self.chain.digest(height - 1)
+            chain = context + list(blocks)
+            tip = len(context) - 1
+            return self._check_links(chain, len(context), lambda position: (
+                tip_hash if position == tip else self.hash(chain[position])))
+
+    def _first_checked(self, chain):
+        """
+        Primeira posição conferida por completo em uma cadeia: 1 (o bloco
+        após o Gênesis) ou, em uma cadeia que não começa no Gênesis (a local
+        podada ou uma lista de blocos a partir de um ponto de poda), a
+        primeira cuja janela de dificuldade não alcança blocos ausentes. Na
+        cadeia local, os blocos anteriores a ela foram conferidos antes da poda.
+        """
+        if isinstance(chain, ChainView):
+            return chain.first + self.retarget_window + 1 if chain.first else 1
+        return self.retarget_window + 1 if chain and chain[0]['index'] > 1 else 1
+
+    def _check_checkpoint_window(self, chain, stop):
+        """
+        Confere os blocos anteriores à posição `stop` de uma lista que começa
+        em um ponto de poda: encadeamento, raiz de Merkle e a prova de
+        trabalho contra a dificuldade declarada por cada bloco. A dificuldade
+        exigida não pode ser recalculada sem os blocos anteriores, então o
+        trabalho desses blocos só conta se eles forem os nossos (ver
+        chain_total_work).
+        """
+        for position in range(min(stop, len(chain))):
+            if not self._check_merkle_root(chain, position):
+                return False
+            if not position:
+                # A prova do primeiro bloco depende da do bloco anterior, que não veio
+                continue
+            block = chain[position]
+            if block['previous_hash'] != self.hash(chain[position - 1]):
+                return False
+            if not valid_proof(block['proof'], chain[position - 1]['proof'], work_target(self.block_work(block))):
+                return False
+        return True
+
+    def chain_total_work(self, chain):
+        """
+        Trabalho acumulado de uma cadeia recebida de outro nó, que pode
+        começar em um ponto de poda. Nesse caso, a janela inicial (os
+        `retarget_window` + 1 primeiros blocos, cuja dificuldade não pode ser
+        recalculada; ver _check_checkpoint_window) precisa ser a da nossa
+        cadeia, e o trabalho até o fim dela é o nosso.
+
+        Args:
+            chain (list): Os blocos, em ordem.
+
+        Returns:
+            int: O trabalho acumulado, ou None se a janela inicial não for
+            formada por blocos da nossa cadeia.
+        """
+        if not chain or chain[0]['index'] == 1:
+            return self.chain_work(chain)
+        window = chain[:self.retarget_window + 1]
+        last = window[-1]['index'] - 1 # Posição do último bloco da janela na nossa cadeia
+        with self.lock.read_locked():
+            first = self.chain.first
+            # O hash do último bloco cobre os cabeçalhos de toda a janela
+            if (not first <= chain[0]['index'] - 1 or last >= len(self.chain)
+                    or self.chain.digest(last) != self.hash(window[-1])):
+                return None
+            work = self.pruned_work + self.chain_work(self.chain[first:last + 1])
+        return work + self.chain_work(chain[len(window):])
+
+    def is_header_chain_valid(self, headers):
+        """
+        Verifica uma cadeia de cabeçalhos (blocos sem as transações), desde o
+        Bloco Gênesis: encadeamento, dificuldade e prova de trabalho. É o que
+        um cliente leve confere antes de aceitar uma prova de Merkle.
+
+        Args:
+            headers (list): Os cabeçalhos, em ordem.
+
+        Returns:
+            bool: True se os cabeçalhos formarem uma cadeia válida.
+        """
+        with metrics.chain_validation_duration.labels('headers').time():
+            return self._check_links(headers, 1, lambda position: self.hash(headers[position]),
+                                     headers_only=True)
+
+    def _check_links(self, chain, start, hash_at, headers_only=False):
+        """
+        Confere o encadeamento, a raiz de Merkle, a dificuldade e a prova de
+        trabalho dos blocos a partir da posição `start`. `hash_at(posição)`
+        devolve o hash do bloco naquela posição (o que permite usar os hashes
+        gravados da cadeia local). Com `headers_only`, a raiz de Merkle não é
+        conferida, pois os cabeçalhos não trazem as transações.
+
+        `chain` precisa começar no Bloco Gênesis ou ter ao menos
+        `retarget_window` + 1 blocos antes de `start`, para que a janela de
+        ajuste de dificuldade de cada bloco conferido esteja completa.
+        """
+        # O hash de um bloco com raiz de Merkle não cobre as transações, então
+        # o Bloco Gênesis (que nenhum outro bloco confere) é conferido aqui
+        if start == 1 and len(chain) and not headers_only and not self._check_merkle_root(chain, 0):
+            return False
+
+        block_index = start
         while block_index < len(chain):
             block = chain[block_index]
-            
+            previous_block = chain[block_index - 1]
+
             # 1. Verifica se o hash do bloco anterior está correto
-            if block['previous_hash'] != self.hash(previous_block):
+            if block['previous_hash'] != hash_at(block_index - 1):
                 return False
-            
-            # 2. Verifica se a prova de trabalho é válida
+
+            # 1.1. Verifica se as transações conferem com a raiz de Merkle
+            if not headers_only and not self._check_merkle_root(chain, block_index):
+                return False
+
+            # 2. Verifica a dificuldade e o horário do bloco
+            difficulty = self._check_difficulty(chain, block_index)
+            if difficulty is None:
+                return False
+
+            # 3. Verifica se a prova de trabalho atende ao alvo do bloco
             previous_proof = previous_block['proof']
             proof = block['proof']
-            hash_operation = hashlib.sha256(
-                str(proof**2 - previous_proof**2).encode()
-            ).hexdigest()
-            if hash_operation[:4] != '0000':
+            if not valid_proof(proof, previous_proof, work_target(difficulty)):
                 return False
-            
-            previous_block = block
+
             block_index += 1
-            
+
         return True
-    
+
+    def _check_merkle_root(self, chain, position):
+        """
+        Confere a raiz de Merkle do bloco na posição `position`. Blocos sem a
+        raiz são do formato anterior e só são aceitos antes do primeiro bloco
+        que a tenha.
+        """
+        block = chain[position]
+        if 'merkle_root' not in block:
+            return position == 0 or 'merkle_root' not in chain[position - 1]
+        return block['merkle_root'] == merkle_root(block['transactions'])
+
+    def _check_difficulty(self, chain, position):
+        """
+        Confere a dificuldade declarada pelo bloco na posição `position`.
+
+        Blocos sem o campo 'difficulty' são do formato anterior e valem
+        LEGACY_DIFFICULTY ('0000'); eles só são aceitos antes do primeiro
+        bloco com o campo. Nos demais, a dificuldade precisa ser a calculada
+        pela janela de blocos anteriores, e o horário não pode ser anterior
+        ao do bloco anterior nem estar adiantado demais.
+
+        Returns:
+            int: A dificuldade do bloco, ou None se ele for inválido.
+        """
+        block = chain[position]
+        previous_block = chain[position - 1]
+        if 'difficulty' not in block:
+            return None if 'difficulty' in previous_block else LEGACY_DIFFICULTY
+
+        difficulty = block['difficulty']
+        if type(difficulty) is not int or difficulty != self._expected_difficulty(chain, position):
+            return None
+        try:
+            moment = self.block_time(block)
+        except (ValueError, TypeError, KeyError):
+            return None
+        if moment > datetime.datetime.now(datetime.timezone.utc) + MAX_FUTURE_DRIFT:
+            return None
+        try:
+            if moment < self.block_time(previous_block):
+                return None
+        except (ValueError, TypeError, KeyError):
+            # Bloco anterior antigo com horário ilegível: não há limite inferior
+            pass
+        return difficulty
+
+    def _expected_difficulty(self, chain, position):
+        """
+        Calcula a dificuldade exigida do bloco na posição `position` a partir
+        dos blocos anteriores (só chain[:position] é lido).
+
+        Nos últimos `retarget_window` intervalos, compara o tempo gasto com
+        o desejado (`target_block_interval` por bloco) e ajusta o trabalho
+        médio desses blocos na mesma proporção. O tempo considerado fica
+        entre 1/4 e 4 vezes o desejado, limitando cada ajuste.
+
+        Returns:
+            int: A dificuldade exigida.
+        """
+        previous_block = chain[position - 1]
+        intervals = min(self.retarget_window, position - 1)
+        if intervals < 1:
+            return self.block_work(previous_block)
+        try:
+            span = self.block_time(previous_block) - self.block_time(chain[position - 1 - intervals])
+        except (ValueError, TypeError, KeyError):
+            return self.block_work(previous_block)
+
+        # Aritmética inteira (microssegundos), para que todos os nós cheguem ao mesmo valor
+        target_us = round(self.target_block_interval * 1_000_000)
+        expected_us = intervals * target_us
+        span_us = span // datetime.timedelta(microseconds=1)
+        span_us = min(max(span_us, expected_us // 4, 1), expected_us * 4)
+        work = sum(self.block_work(block) for block in chain[position - intervals:position])
+        return max(1, work * target_us // span_us)
+
+    @property
+    def nodes(self):
+        """Os endereços de todos os nós registrados (ver self.peers)."""
+        return set(self.peers)
+
     def register_node(self, address):
         """
-        Adiciona um novo nó à lista de nós.
+        Adiciona um novo nó ao registro de nós.
 
         Args:
             address (str): Endereço do nó. Ex: 'http://192.168.0.5:5000'
+
+        Returns:
+            str: O endereço registrado. Ex: '192.168.0.5:5000'
         """
         parsed_url = urlparse(address)
         if parsed_url.netloc:
-            self.nodes.add(parsed_url.netloc)
+            node = parsed_url.netloc
         elif parsed_url.path:
             # Aceita endereços como '192.168.0.5:5000'
-            self.nodes.add(parsed_url.path)
+            node = parsed_url.path
         else:
             raise ValueError('URL inválido')
+        self.peers.add(node)
+        return node
+
+    def block_work(self, block):
+        """
+        Retorna o trabalho representado por um bloco, isto é, o número esperado
+        de hashes necessários para encontrar sua prova (a sua dificuldade).
+
+        Args:
+            block (dict): O bloco.
+
+        Returns:
+            int: O trabalho do bloco.
+        """
+        return block.get('difficulty', LEGACY_DIFFICULTY)
+
+    def chain_work(self, chain):
+        """
+        Retorna o trabalho somado dos blocos de uma cadeia (ver block_work),
+        o critério usado para escolher entre cadeias concorrentes.
+
+        Args:
+            chain (list): Os blocos.
+
+        Returns:
+            int: O trabalho acumulado.
+        """
+        return sum(self.block_work(block) for block in chain)
+
+    def get_head(self):
+        """
+        Retorna o resumo do topo da cadeia, usado pelos outros nós para
+        comparar cadeias sem baixá-las.
+
+        Returns:
+            dict: Altura, hash do último bloco e trabalho acumulado.
+        """
+        with self.lock.read_locked():
+            return {
+                'height': len(self.chain),
+                'first_index': self.chain.first + 1,
+                'tip_hash': self.get_block_hash(len(self.chain) - 1),
+                'cumulative_work': self.total_work
+            }
+
+    def iter_blocks(self, start=0, stop=None):
+        """
+        Percorre as posições de `start` a `stop` (exclusivo) da cadeia atual,
+        lendo um bloco por vez do disco, cada leitura sob a trava de leitura.
+        Usado nas respostas enviadas aos poucos, para que nem a memória nem o
+        tempo com a trava cresçam com o tamanho da cadeia.
+
+        Raises:
+            RuntimeError: (durante a iteração) Se a cadeia for substituída ou
+                podada depois da chamada, em vez de misturar blocos de duas cadeias.
+        """
+        with self.lock.read_locked():
+            view = self.chain
+            start = max(start, getattr(view, 'first', 0))
+            stop = len(view) if stop is None else min(stop, len(view))
+
+        def blocks():
+            for position in range(start, stop):
+                with self.lock.read_locked():
+                    if self.chain is not view:
+                        raise RuntimeError('A cadeia local foi substituída durante a leitura.')
+                    block = view[position]
+                yield block
+        return blocks()
+
+    def get_blocks(self, start, limit):
+        """
+        Retorna até `limit` blocos a partir do bloco de índice `start` (o
+        índice do Bloco Gênesis é 1).
+
+        Args:
+            start (int): Índice do primeiro bloco desejado.
+            limit (int): Quantidade máxima de blocos.
+
+        Returns:
+            list: Os blocos encontrados.
+        """
+        first = max(start, 1) - 1
+        with self.lock.read_locked():
+            return self.chain[first:first + limit]
+
+    def get_headers(self, start, limit):
+        """
+        Retorna até `limit` cabeçalhos a partir do bloco de índice `start`
+        (ver get_blocks).
+
+        Returns:
+            list: Os cabeçalhos (blocos sem as transações).
+        """
+        return [self.block_header(block) for block in self.get_blocks(start, limit)]
+
+    def find_transaction(self, tx_id):
+        """
+        Procura uma transação gravada na cadeia pelo seu id, usando o índice de busca.
+
+        Args:
+            tx_id (str): O id da transação.
+
+        Returns:
+            tuple: (bloco, posição da transação no bloco), ou (None, None).
+        """
+        tx_id = str(tx_id)
+        with self.lock.read_locked():
+            for block_index, position in self.search_index.search(tx_id, field='id'):
+                block = self.chain[block_index - 1]
+                if str(block['transactions'][position].get('id')) == tx_id:
+                    return block, position
+        return None, None
 
     def resolve_conflicts(self):
         """
         Este é o nosso Algoritmo de Consenso. Ele resolve conflitos
-        substituindo nossa cadeia pela mais longa da rede.
+        substituindo nossa cadeia pela de maior trabalho acumulado da rede.
+
+        Primeiro consulta apenas o topo (/chain/head) de cada nó disponível
+        (nós em backoff após falhas seguidas são pulados). Só o melhor
+        nó é consultado novamente, e apenas pelos blocos que nos faltam
+        (/chain/blocks), que são validados a partir do nosso último bloco.
+        A cadeia completa só é baixada quando há uma bifurcação.
 
         Returns:
             bool: True se nossa cadeia foi substituída, False se não.
         """
-        neighbours = self.nodes
-        new_chain = None
+        # Retrato do nosso topo; a rede é consultada sem segurar a trava
+        with self.lock.read_locked():
+            our_height = len(self.chain)
+            our_work = self.total_work
+            tip_hash = self.get_block_hash(our_height - 1)
 
-        # Estamos apenas procurando por cadeias mais longas que a nossa
-        max_length = len(self.chain)
+        # Nós em backoff (falhas recentes) ficam de fora; os mais saudáveis vêm primeiro
+        nodes = self.peers.available()
+        responses = self.peer_client.fetch_all(nodes, '/chain/head')
+        self.last_peer_report = [response.to_dict() for response in responses]
 
-        # Pega e verifica as cadeias de todos os nós na nossa rede
-        for node in neighbours:
-            try:
-                response = requests.get(f'http://{node}/get_chain')
-                if response.status_code == 200:
-                    length = response.json()['length']
-                    chain = response.json()['chain']
-
-                    # Verifica se o tamanho é maior e se a cadeia é válida
-                    if length > max_length and self.is_chain_valid(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.exceptions.RequestException as e:
-                print(f"Não foi possível conectar ao nó {node}: {e}")
+        candidates = []
+        for response in responses:
+            if not response.ok:
+                print(f"Não foi possível conectar ao nó {response.node}: {response.error or response.status_code}")
                 continue
+            error = validate_head(response.data)
+            if error:
+                print(f"AVISO: Topo inválido do nó {response.node}: {error} Ignorando o nó.")
+                continue
+            self.peers.update_head(response.node, response.data['height'], response.data['cumulative_work'])
+            # Estamos apenas procurando por cadeias com mais trabalho que a nossa
+            if response.data['cumulative_work'] > our_work:
+                candidates.append(response)
+        # Maior trabalho primeiro; no empate, o nó mais saudável
+        health = {node: position for position, node in enumerate(nodes)}
+        candidates.sort(key=lambda response: (-response.data['cumulative_work'], health[response.node]))
+
+        for candidate in candidates:
+            node = candidate.node
+            height = candidate.data['height']
 
+            # Caso comum: o nó tem a nossa cadeia mais alguns blocos
+            suffix = self._fetch_blocks(node, our_height + 1, height)
+            if suffix and suffix[0]['previous_hash'] == tip_hash:
+                if not self.is_extension_valid(suffix):
+                    continue
+                with self.lock.write_locked():
+                    # Se a cadeia local mudou durante o download, deixa para a próxima rodada
+                    if (len(self.chain) != our_height
+                            or self.get_block_hash(our_height - 1) != tip_hash):
+                        return False
+                    self._extend_chain(suffix)
+                self._notify_chain_replaced()
+                return True
 
-        # Substitui nossa cadeia se descobrirmos uma nova cadeia válida e mais longa
-        if new_chain:
-            self.chain = new_chain
-            self.save_chain_to_disk() # Salva a nova cadeia no disco
-            return True
+            # Bifurcação: baixa e valida a cadeia completa deste nó
+            print(f"CONSENSO: Bifurcação detectada no nó {node}. Baixando a cadeia completa.")
+            start = max(candidate.data.get('first_index', 1), self.chain.first + 1)
+            if start > 1:
+                if self._replace_from_checkpoint(node, start, height, our_work):
+                    self._notify_chain_replaced()
+                    return True
+                continue
+            chain = self._fetch_blocks(node, 1, height)
+            if chain and self.chain_work(chain) > our_work and self.is_chain_valid(chain):
+                with self.lock.write_locked():
+                    if self.chain_work(chain) <= self.total_work:
+                        return False
+                    self._replace_chain(chain)
+                self._notify_chain_replaced()
+                return True
 
         return False
+
+    def _replace_from_checkpoint(self, node, start, height, our_work):
+        """
+        Bifurcação quando a cadeia local ou a do nó está podada: baixa os
+        blocos do nó a partir do índice `start` (o primeiro que os dois
+        guardam). Os blocos anteriores não podem ser conferidos, então a
+        bifurcação só é aceita depois da janela de dificuldade que segue
+        `start` (ver _first_checked); até ali, os blocos do nó precisam ser
+        os nossos. Nossos blocos anteriores a `start` são descartados, como
+        em uma poda.
+
+        Returns:
+            bool: True se nossa cadeia foi substituída.
+        """
+        window = self.retarget_window
+        # Posição, na nossa cadeia, do último bloco que precisa ser comum
+        shared_position = start - 1 + window
+        blocks = self._fetch_blocks(node, start, height)
+        if not blocks or len(blocks) <= window + 1:
+            return False
+        shared_hash = self.hash(blocks[window])
+        with self.lock.read_locked():
+            shared = (self.chain.first <= start - 1 and shared_position < len(self.chain)
+                      and self.chain.digest(shared_position) == shared_hash)
+        if not shared:
+            print(f"AVISO: A bifurcação do nó {node} começa antes do primeiro bloco "
+                  f"conferível das cadeias podadas. Ignorando o nó.")
+            return False
+        work = self.chain_total_work(blocks)
+        if work is None or work <= our_work or not self.is_chain_valid(blocks):
+            return False
+
+        with self.lock.write_locked():
+            # A cadeia local pode ter mudado (ou sido podada) durante o download
+            if (self.chain.first > start - 1 or shared_position >= len(self.chain)
+                    or self.chain.digest(shared_position) != shared_hash or work <= self.total_work):
+                return False
+            pruned_work = work - self.chain_work(blocks)
+            # Os ids gravados nos blocos anteriores a `start` continuam valendo;
+            # os dos nossos blocos seguintes dão lugar aos dos blocos do nó
+            committed_ids = set(self.mempool.committed_ids())
+            for block in self.chain[start - 1:]:
+                committed_ids.difference_update(
+                    self.mempool.transaction_id(transaction) for transaction in block['transactions'])
+            if start - 1 > self.chain.first:
+                self._save_prune_point(start - 1, blocks[0]['previous_hash'], pruned_work)
+            self._replace_chain(blocks, base_index=start, pruned_work=pruned_work,
+                                committed_ids=committed_ids)
+        return True
+
+    def get_bootstrap_state(self):
+        """
+        Retorna o que um nó novo precisa para começar pelo topo desta cadeia
+        sem baixá-la inteira (ver bootstrap): o topo e os ids gravados.
+
+        Returns:
+            dict: Altura, hash do último bloco, trabalho acumulado e ids gravados.
+        """
+        with self.lock.read_locked():
+            state = self.get_head()
+            state['committed_ids'] = self.mempool.committed_ids()
+            return state
+
+    def bootstrap(self, node):
+        """
+        Inicia um nó novo a partir do retrato de outro nó (/chain/snapshot)
+        e dos seus blocos recentes, em vez de baixar e validar a cadeia
+        inteira. Só os `retarget_window` + 2 blocos do topo são baixados:
+        todos têm o encadeamento e a raiz de Merkle conferidos, e o último
+        também a dificuldade e a prova de trabalho. O trabalho acumulado e os ids
+        gravados dos blocos anteriores são aceitos do nó, que precisa ser
+        confiável. A cadeia local fica podada (ver prune).
+
+        Args:
+            node (str): Endereço do nó. Ex: '192.168.0.5:5000'
+
+        Returns:
+            bool: True se a cadeia local foi substituída.
+        """
+        with self.lock.read_locked():
+            if len(self.chain) > 1:
+                print("AVISO: A cadeia local já tem blocos. Bootstrap ignorado.")
+                return False
+        response = self.peer_client.get_json(node, '/chain/snapshot')
+        self.last_peer_report = [response.to_dict()]
+        if not response.ok:
+            print(f"ERRO: Não foi possível obter o retrato do nó {node}: {response.error or response.status_code}")
+            return False
+        state = response.data
+        error = validate_head(state)
+        if not error and not (isinstance(state.get('tip_hash'), str) and isinstance(state.get('committed_ids'), list)):
+            error = 'Os campos "tip_hash" e "committed_ids" são obrigatórios.'
+        if error:
+            print(f"ERRO: Retrato inválido do nó {node}: {error}")
+            return False
+        height = state['height']
+        start = max(1, height - self.retarget_window - 1)
+        blocks = self._fetch_blocks(node, start, height)
+        if not blocks or self.hash(blocks[-1]) != state['tip_hash'] or not self.is_chain_valid(blocks):
+            print(f"ERRO: Os blocos do nó {node} não conferem com o seu retrato. Bootstrap cancelado.")
+            return False
+        pruned_work = state['cumulative_work'] - self.chain_work(blocks)
+        if pruned_work < 0:
+            return False
+
+        with self.lock.write_locked():
+            if len(self.chain) > 1:
+                return False
+            if start > 1:
+                self._save_prune_point(start - 1, blocks[0]['previous_hash'], pruned_work)
+            self._replace_chain(blocks, base_index=start, pruned_work=pruned_work,
+                                committed_ids=state['committed_ids'])
+        print(f"CONSENSO: Bootstrap a partir do nó {node}: cadeia iniciada no bloco {start}, "
+              f"topo no bloco {height}.")
+        self._notify_chain_replaced()
+        return True
+
+    def _fetch_blocks(self, node, start, height, page_size=500):
+        """
+        Baixa, em páginas, os blocos de índice `start` até `height` de um nó.
+
+        Returns:
+            list: Os blocos baixados, ou None se o nó falhar ou responder
+            com blocos malformados ou fora de ordem.
+        """
+        blocks = []
+        while start + len(blocks) <= height:
+            response = self.peer_client.get_json(
+                node, '/chain/blocks', {'from': start + len(blocks), 'limit': page_size}
+            )
+            self.last_peer_report.append(response.to_dict())
+            if not response.ok:
+                return None
+            page = response.data.get('blocks') if isinstance(response.data, dict) else None
+            if not isinstance(page, list):
+                print(f"AVISO: O nó {node} não respondeu com uma lista de blocos. Ignorando o nó.")
+                return None
+            if not page:
+                return None
+            for block in page:
+                error = validate_block_fields(block)
+                if error or block['index'] != start + len(blocks):
+                    print(f"AVISO: Bloco inválido do nó {node}: {error or 'fora de ordem.'} Ignorando o nó.")
+                    return None
+                blocks.append(block)
+        return blocks
+
+    def _extend_chain(self, blocks):
+        """
+        Anexa à cadeia local blocos já validados a partir do nosso topo.
+        Requer a trava de escrita.
+        """
+        fully_validated = self._validated_length == len(self.chain)
+        for block in blocks:
+            self.chain.append(block)
+            self.total_work += self.block_work(block)
+            self.search_index.add_block(block)
+            self.mempool.mark_committed(block['transactions'])
+        if fully_validated:
+            self._validated_length = len(self.chain)
+        self._checkpoint_if_due()
+
+    def _replace_chain(self, chain, base_index=1, pruned_work=0, committed_ids=None):
+        """
+        Substitui a cadeia local por outra cadeia já validada.
+        Requer a trava de escrita.
+
+        Args:
+            chain (list): Os blocos, a partir do bloco de índice `base_index`.
+            base_index (int): Índice do primeiro bloco (> 1 em uma cadeia podada).
+            pruned_work (int): Trabalho acumulado dos blocos anteriores a `base_index`.
+            committed_ids (set): Ids gravados nos blocos anteriores a
+                `base_index` (só para cadeias podadas).
+        """
+        self.storage.rewrite(chain, base_index) # Salva a nova cadeia no disco
+        self.chain = ChainView(self.storage)
+        self._validated_length = len(self.chain)
+        self._last_checkpoint = len(self.chain)
+        self.pruned_work = pruned_work
+        self.total_work = pruned_work + self.chain_work(chain)
+        self.search_index.rebuild(chain)
+        if base_index == 1:
+            self.mempool.rebuild_committed(chain)
+            return
+        self.mempool.restore_committed(committed_ids or ())
+        for block in chain:
+            self.mempool.mark_committed(block['transactions'])
+        self._narrow_committed()
+        # Sem os blocos podados, o estado derivado só pode ser recuperado do retrato
+        self.save_snapshot()
+
+    def _notify_chain_replaced(self):
+        """Avisa os interessados (ex: o agendador de mineração) que a cadeia mudou."""
+        for listener in self.chain_replaced_listeners:
+            listener()
@@ -0,0 +1,434 @@
+# cryptocurrency/cluster.py
+
+"""
+Simulador de um cluster local de nós, para testes de escala do consenso.
+
+Inicia N processos `main.py` em portas diferentes (cada um em um diretório
+temporário próprio) e os conecta via /connect_node. Todo o tráfego entre os
+nós passa por um proxy TCP por nó, que conta os bytes transferidos e pode
+injetar latência ou simular um nó que não responde.
+
+Cenário executado:
+    1. Inicia os nós e espera que todos respondam.
+    2. Cria bifurcações: alguns nós mineram cadeias diferentes antes de se conhecerem.
+    3. Conecta os nós (malha completa ou `--degree` vizinhos aleatórios).
+    4. Derruba os nós "mortos" (processo encerrado ou proxy que não responde).
+    5. Mede até todos os nós vivos terem o mesmo topo: tempo, bytes e CPU por nó.
+
+O relatório é um JSON (na saída padrão ou em --output).
+
+Exemplo de uso:
+    python cluster.py --nodes 20 --forks 3 --latency 50 --dead 2
+    python cluster.py --nodes 50 --strategy consensus --output cluster.json
+"""
+
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+
+import requests
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+
+class LinkProxy:
+    """
+    Proxy TCP na frente de um nó. Os outros nós são conectados ao endereço do
+    proxy, então todo o tráfego destinado ao nó (pedidos e respostas) passa
+    por aqui.
+
+    Attributes:
+        latency (float): Atraso, em segundos, aplicado a cada mensagem (em cada sentido).
+        blackhole (bool): Se True, aceita conexões mas nunca responde (nó travado).
+        bytes_in (int): Bytes enviados ao nó.
+        bytes_out (int): Bytes respondidos pelo nó.
+    """
+
+    def __init__(self, target_port, latency=0.0):
+        self.target_port = target_port
+        self.latency = latency
+        self.blackhole = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+        proxy = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                proxy._handle(self.request)
+
+        self._server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name=f'proxy-{self.port}', daemon=True).start()
+
+    @property
+    def address(self):
+        return f'127.0.0.1:{self.port}'
+
+    def reset_counters(self):
+        with self._lock:
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, client):
+        if self.blackhole:
+            # Consome o pedido e nunca responde, até o outro lado desistir
+            while client.recv(65536):
+                pass
+            return
+        try:
+            upstream = socket.create_connection(('127.0.0.1', self.target_port))
+        except OSError:
+            return
+        # Qual sentido enviou por último; a latência é aplicada a cada troca de sentido
+        state = {'last': None}
+        pumps = [
+            threading.Thread(target=self._pump, args=(client, upstream, 'in', state), daemon=True),
+            threading.Thread(target=self._pump, args=(upstream, client, 'out', state), daemon=True)
+        ]
+        for pump in pumps:
+            pump.start()
+        for pump in pumps:
+            pump.join()
+        upstream.close()
+
+    def _pump(self, source, destination, direction, state):
+        try:
+            while True:
+                chunk = source.recv(65536)
+                if not chunk:
+                    break
+                if self.latency and state['last'] != direction:
+                    time.sleep(self.latency)
+                state['last'] = direction
+                destination.sendall(chunk)
+                with self._lock:
+                    if direction == 'in':
+                        self.bytes_in += len(chunk)
+                    else:
+                        self.bytes_out += len(chunk)
+        except OSError:
+            pass
+        finally:
+            try:
+                destination.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+class SimulatedNode:
+    """
+    Um processo `main.py` em um diretório temporário próprio, com seu proxy.
+    """
+
+    def __init__(self, number, port, work_dir, latency, sync_interval, extra_args=()):
+        self.number = number
+        self.port = port
+        self.data_dir = os.path.join(work_dir, f'node-{number}')
+        os.makedirs(self.data_dir)
+        self.log_path = os.path.join(self.data_dir, 'node.log')
+        self.proxy = LinkProxy(port, latency)
+        self.alive = True
+        with open(self.log_path, 'w') as log:
+            self.process = subprocess.Popen(
+                [sys.executable, MAIN_PATH, '-p', str(port), '--sync-interval', str(sync_interval), *extra_args],
+                cwd=self.data_dir, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+            )
+
+    @property
+    def url(self):
+        # Acesso direto (sem o proxy), usado pelo simulador para controlar o nó
+        return f'http://127.0.0.1:{self.port}'
+
+    def get(self, path, **kwargs):
+        return requests.get(self.url + path, timeout=kwargs.pop('timeout', 30), **kwargs)
+
+    def post(self, path, payload, **kwargs):
+        return requests.post(self.url + path, json=payload, timeout=kwargs.pop('timeout', 30), **kwargs)
+
+    def head(self):
+        return self.get('/chain/head', timeout=5).json()
+
+    def wait_ready(self, timeout=30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'O nó {self.number} encerrou ao iniciar. Veja {self.log_path}')
+            try:
+                self.head()
+                return
+            except requests.exceptions.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError(f'O nó {self.number} não respondeu em {timeout} segundos. Veja {self.log_path}')
+
+    def mine(self, blocks):
+        """Minera `blocks` blocos neste nó, esperando cada pedido terminar."""
+        for _ in range(blocks):
+            job = self.get('/mine_block').json()['job']
+            while job['status'] in ('queued', 'running'):
+                time.sleep(0.05)
+                job = self.get(f"/mining/jobs/{job['id']}").json()
+            if job['status'] != 'found':
+                raise RuntimeError(f"Mineração no nó {self.number} terminou com estado {job['status']}")
+
+    def cpu_seconds(self):
+        """
+        Tempo de CPU (usuário + sistema) do processo e de seus filhos (o
+        reloader do Flask inicia o servidor em um processo filho), lido de /proc.
+
+        Returns:
+            float: Os segundos de CPU, ou None fora do Linux.
+        """
+        pids = [self.process.pid] + _child_pids(self.process.pid)
+        total = 0
+        for pid in pids:
+            try:
+                with open(f'/proc/{pid}/stat', 'r') as f:
+                    # Os campos após o nome do processo (que pode conter espaços)
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except OSError:
+                if not os.path.exists('/proc'):
+                    return None
+                continue
+            total += int(fields[11]) + int(fields[12])  # utime + stime
+        return total / os.sysconf('SC_CLK_TCK')
+
+    def kill(self):
+        """Encerra o processo do nó (e o do reloader); o proxy passa a recusar conexões."""
+        self.alive = False
+        if self.process.poll() is None:
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+
+    def close(self):
+        self.kill()
+        self.proxy.close()
+
+
+def _child_pids(parent):
+    children = []
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == parent:
+            children.append(int(entry))
+            children.extend(_child_pids(int(entry)))
+    return children
+
+
+def wire(nodes, degree, rng):
+    """Conecta cada nó aos demais (ou a `degree` vizinhos aleatórios), pelos proxies."""
+    for node in nodes:
+        others = [other for other in nodes if other is not node]
+        if degree:
+            others = rng.sample(others, min(degree, len(others)))
+        response = node.post('/connect_node', {'nodes': [other.proxy.address for other in others]})
+        response.raise_for_status()
+
+
+def wait_convergence(nodes, timeout, strategy, expected_work, poll_interval=0.25):
+    """
+    Espera até todos os nós vivos terem o mesmo topo (/chain/head), com
+    trabalho acumulado de ao menos `expected_work` (o da bifurcação
+    vencedora). A altura não é comparada: com o ajuste de dificuldade, a
+    cadeia de maior trabalho não é necessariamente a mais alta.
+
+    Returns:
+        tuple: (convergiu, segundos decorridos, rodadas de consenso disparadas).
+    """
+    live = [node for node in nodes if node.alive]
+    started = time.monotonic()
+    rounds = 0
+    while time.monotonic() - started < timeout:
+        if strategy == 'consensus':
+            # O próprio simulador dispara uma rodada de consenso em todos os nós
+            for node in live:
+                try:
+                    node.get('/consensus', timeout=timeout)
+                except requests.exceptions.RequestException:
+                    pass
+            rounds += 1
+        heads = []
+        for node in live:
+            try:
+                heads.append(node.head())
+            except requests.exceptions.RequestException:
+                heads.append(None)
+        if all(heads) and len({head['tip_hash'] for head in heads}) == 1:
+            if heads[0]['cumulative_work'] >= expected_work:
+                return True, time.monotonic() - started, rounds
+        time.sleep(poll_interval)
+    return False, time.monotonic() - started, rounds
+
+
+def main():
+    parser = ArgumentParser(description='Simulador de um cluster local de nós')
+    parser.add_argument('--nodes', default=5, type=int, help='Quantidade de nós')
+    parser.add_argument('--base-port', default=5200, type=int, help='Porta do primeiro nó')
+    parser.add_argument('--latency', default=0.0, type=float,
+                        help='Latência injetada em cada mensagem entre os nós, em milissegundos')
+    parser.add_argument('--dead', default=0, type=int, help='Nós encerrados depois de conectados')
+    parser.add_argument('--blackhole', default=0, type=int,
+                        help='Nós que aceitam conexões mas nunca respondem')
+    parser.add_argument('--forks', default=2, type=int,
+                        help='Nós que mineram cadeias próprias antes de serem conectados')
+    parser.add_argument('--fork-blocks', default=3, type=int,
+                        help='Blocos minerados pela menor bifurcação (cada uma seguinte minera um a mais)')
+    parser.add_argument('--degree', default=0, type=int,
+                        help='Vizinhos por nó (0 = conecta todos com todos)')
+    parser.add_argument('--strategy', default='background', choices=['background', 'consensus'],
+                        help='background: espera a sincronização dos nós; consensus: dispara /consensus em rodadas')
+    parser.add_argument('--sync-interval', default=2.0, type=float,
+                        help='Intervalo de sincronização em segundo plano de cada nó')
+    parser.add_argument('--peer-timeout', default=2.0, type=float,
+                        help='Tempo máximo de resposta de cada nó, repassado aos nós')
+    parser.add_argument('--retarget-window', default=0, type=int,
+                        help='Janela de ajuste de dificuldade repassada aos nós (0 = dificuldade fixa)')
+    parser.add_argument('--target-block-interval', default=10.0, type=float,
+                        help='Intervalo desejado entre blocos, repassado aos nós')
+    parser.add_argument('--timeout', default=120.0, type=float, help='Tempo máximo para convergir')
+    parser.add_argument('--seed', default=42, type=int, help='Semente da escolha de vizinhos e nós mortos')
+    parser.add_argument('--keep', action='store_true', help='Mantém os diretórios (e logs) dos nós')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: saída padrão)')
+    args = parser.parse_args()
+
+    if args.forks + args.dead + args.blackhole > args.nodes:
+        parser.error('--forks, --dead e --blackhole somados não podem passar de --nodes')
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix='blockchain-cluster-')
+    extra_args = ['--peer-timeout', str(args.peer_timeout), '--peer-deadline', str(args.peer_timeout * 2),
+                  '--retarget-window', str(args.retarget_window),
+                  '--target-block-interval', str(args.target_block_interval)]
+    nodes = []
+    try:
+        print(f'Iniciando {args.nodes} nós em {work_dir}...', file=sys.stderr)
+        for number in range(args.nodes):
+            nodes.append(SimulatedNode(number, args.base_port + number, work_dir,
+                                       args.latency / 1000, args.sync_interval, extra_args))
+        for node in nodes:
+            node.wait_ready()
+
+        # Os nós que bifurcam são os primeiros; a cadeia vencedora é a de maior trabalho acumulado
+        for fork, node in enumerate(nodes[:args.forks]):
+            print(f'Nó {node.number}: minerando {args.fork_blocks + fork} blocos...', file=sys.stderr)
+            node.mine(args.fork_blocks + fork)
+        heads = [node.head() for node in nodes]
+        expected_work = max(head['cumulative_work'] for head in heads)
+        expected_tips = sorted({head['tip_hash'] for head in heads if head['cumulative_work'] == expected_work})
+
+        cpu_before = {node.number: node.cpu_seconds() for node in nodes}
+        for node in nodes:
+            node.proxy.reset_counters()
+
+        started = time.monotonic()
+        wire(nodes, args.degree, rng)
+
+        # Nós com falha, escolhidos fora das bifurcações para que a cadeia vencedora continue viva
+        candidates = nodes[args.forks:]
+        failed = rng.sample(candidates, args.dead + args.blackhole)
+        for node in failed[:args.dead]:
+            node.kill()
+        for node in failed[args.dead:]:
+            node.proxy.blackhole = True
+            node.alive = False
+
+        converged, elapsed, rounds = wait_convergence(nodes, args.timeout, args.strategy, expected_work)
+        convergence_seconds = time.monotonic() - started
+
+        live = [node for node in nodes if node.alive]
+        network_chain_ms = None
+        network_chain_status = None
+        if live:
+            request_started = time.perf_counter()
+            response = live[0].get('/network/chain', timeout=args.timeout)
+            network_chain_status = response.status_code
+            # Uma resposta de erro não conta como tempo da rota
+            if response.ok:
+                network_chain_ms = round((time.perf_counter() - request_started) * 1000, 2)
+
+        per_node = []
+        for node in nodes:
+            cpu = node.cpu_seconds() if node.process.poll() is None else None
+            head = None
+            if node.alive:
+                try:
+                    head = node.head()
+                except requests.exceptions.RequestException:
+                    pass
+            per_node.append({
+                'node': node.number,
+                'port': node.port,
+                'state': 'alive' if node.alive else ('dead' if node in failed[:args.dead] else 'blackhole'),
+                'height': head and head['height'],
+                'tip_hash': head and head['tip_hash'],
+                'cumulative_work': head and head['cumulative_work'],
+                'bytes_in': node.proxy.bytes_in,
+                'bytes_out': node.proxy.bytes_out,
+                'cpu_seconds': (round(cpu - cpu_before[node.number], 3)
+                                if cpu is not None and cpu_before[node.number] is not None else None)
+            })
+
+        report = {
+            'params': vars(args),
+            'converged': converged,
+            'convergence_seconds': round(convergence_seconds, 3),
+            'wait_seconds': round(elapsed, 3),
+            'consensus_rounds': rounds,
+            'expected_cumulative_work': expected_work,
+            'expected_tip_hashes': expected_tips,
+            'network_chain_ms': network_chain_ms,
+            'network_chain_status': network_chain_status,
+            'bytes_total': sum(entry['bytes_in'] + entry['bytes_out'] for entry in per_node),
+            'cpu_seconds_total': round(sum(entry['cpu_seconds'] or 0 for entry in per_node), 3),
+            'nodes': per_node
+        }
+    finally:
+        for node in nodes:
+            node.close()
+        if args.keep:
+            print(f'Diretórios dos nós mantidos em {work_dir}', file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0 if converged else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
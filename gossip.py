@@ -0,0 +1,189 @@
+# cryptocurrency/gossip.py
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from mempool import Mempool, TransactionRejected
+
+
+class TransactionGossip:
+    """
+    Propaga as transações pendentes para os outros nós da rede.
+
+    As transações a enviar são acumuladas por `flush_interval` segundos e
+    enviadas em um único POST por nó (/transactions/gossip), em uma thread
+    de fundo, para não atrasar a resposta ao cliente. Um filtro com os ids
+    já vistos impede que a mesma transação fique circulando entre os nós.
+    """
+
+    def __init__(self, blockchain, flush_interval=0.05, max_batch=500, seen_capacity=100000):
+        self.blockchain = blockchain
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.seen_capacity = seen_capacity
+        self._seen = OrderedDict()
+        self._outbox = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._sent_batches = 0
+        self._received = 0
+        self._accepted = 0
+        self._send_failures = 0
+
+    def broadcast(self, transactions):
+        """
+        Agenda o envio de transações aos outros nós (as já vistas são ignoradas).
+
+        Args:
+            transactions (list): As transações aceitas por este nó.
+        """
+        with self._lock:
+            fresh = [transaction for transaction in transactions if self._mark_seen(transaction)]
+            if not fresh:
+                return
+            self._outbox.extend(fresh)
+            self._ensure_thread()
+        self._wake.set()
+
+    def receive(self, transactions):
+        """
+        Processa um lote recebido de outro nó: adiciona ao mempool as
+        transações ainda não vistas e as repassa aos demais nós.
+
+        Args:
+            transactions (list): Transações já validadas e filtradas.
+
+        Returns:
+            int: Quantas transações foram aceitas no mempool.
+        """
+        accepted = []
+        for transaction in transactions:
+            with self._lock:
+                tx_id = Mempool.transaction_id(transaction)
+                if tx_id is None or tx_id in self._seen:
+                    continue
+            try:
+                self.blockchain.add_transaction(transaction)
+                accepted.append(transaction)
+            except TransactionRejected:
+                with self._lock:
+                    self._mark_seen(transaction)
+        with self._lock:
+            self._received += len(transactions)
+            self._accepted += len(accepted)
+        self.broadcast(accepted)
+        return len(accepted)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Contadores da propagação de transações.
+        """
+        with self._lock:
+            return {
+                'pending_outbox': len(self._outbox),
+                'seen_ids': len(self._seen),
+                'sent_batches': self._sent_batches,
+                'send_failures': self._send_failures,
+                'received': self._received,
+                'accepted': self._accepted
+            }
+
+    def _mark_seen(self, transaction):
+        """Registra o id no filtro; retorna False se já tinha sido visto. Requer self._lock."""
+        tx_id = Mempool.transaction_id(transaction)
+        if tx_id is None or tx_id in self._seen:
+            return False
+        self._seen[tx_id] = True
+        if len(self._seen) > self.seen_capacity:
+            self._seen.popitem(last=False)
+        return True
+
+    def _ensure_thread(self):
+        # Iniciada sob demanda, como o agendador de mineração. Requer self._lock.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='transaction-gossip', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Espera um pouco para juntar rajadas de transações em um só envio
+            time.sleep(self.flush_interval)
+            self._wake.clear()
+            with self._lock:
+                outbox, self._outbox = self._outbox, []
+            for start in range(0, len(outbox), self.max_batch):
+                self._send(outbox[start:start + self.max_batch])
+
+    def _send(self, batch):
+        responses = self.blockchain.peer_client.post_all(
+            self.blockchain.peers.available(), '/transactions/gossip', {'transactions': batch}
+        )
+        with self._lock:
+            self._sent_batches += 1
+            for response in responses:
+                if not response.ok:
+                    self._send_failures += 1
+                    print(f"AVISO: Não foi possível propagar transações para o nó {response.node}: "
+                          f"{response.error or response.status_code}")
+
+
+class BlockAnnouncer:
+    """
+    Anuncia os blocos novos aos outros nós (/blocks/announce), em uma
+    thread de fundo, em vez de esperar que eles baixem a cadeia no próximo
+    consenso. O bloco é enviado completo, para que quem recebe possa
+    anexá-lo direto ao topo sem uma segunda requisição.
+    """
+
+    def __init__(self, blockchain):
+        self.blockchain = blockchain
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._announced = 0
+        self._send_failures = 0
+
+    def announce(self, block):
+        """
+        Agenda o anúncio de um bloco a todos os nós registrados.
+
+        Args:
+            block (dict): O bloco recém-anexado à cadeia local.
+        """
+        self._queue.put(block)
+        with self._lock:
+            # Iniciada sob demanda, como o agendador de mineração
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='block-announcer', daemon=True)
+                self._thread.start()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Contadores dos anúncios de blocos.
+        """
+        with self._lock:
+            return {
+                'pending': self._queue.qsize(),
+                'announced': self._announced,
+                'send_failures': self._send_failures
+            }
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            responses = self.blockchain.peer_client.post_all(
+                self.blockchain.peers.available(), '/blocks/announce', {'block': block}
+            )
+            with self._lock:
+                self._announced += 1
+                for response in responses:
+                    if not response.ok:
+                        self._send_failures += 1
+                        print(f"AVISO: Não foi possível anunciar o bloco {block['index']} ao nó {response.node}: "
+                              f"{response.error or response.status_code}")
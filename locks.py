@@ -0,0 +1,82 @@
+# cryptocurrency/locks.py
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Trava de leitores/escritor: vários leitores podem segurá-la ao mesmo
+    tempo, mas um escritor a segura sozinho.
+
+    Escritores têm preferência (novos leitores esperam enquanto houver um
+    escritor na fila), para que os commits de blocos não fiquem parados
+    atrás de um fluxo contínuo de leituras. A trava é reentrante: uma thread
+    que já segura a leitura (ou a escrita) pode adquirir a leitura de novo,
+    e o escritor pode adquirir a escrita de novo. Promover uma leitura para
+    escrita não é permitido.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        depth = getattr(self._local, 'read_depth', 0)
+        with self._condition:
+            # Reentrância: quem já lê (ou escreve) não espera pelos escritores da fila
+            if depth == 0 and self._writer != me:
+                self._condition.wait_for(lambda: self._writer is None and not self._waiting_writers)
+            self._readers += 1
+        self._local.read_depth = depth + 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+        self._local.read_depth -= 1
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if getattr(self._local, 'read_depth', 0):
+                raise RuntimeError('Não é possível promover uma trava de leitura para escrita.')
+            self._waiting_writers += 1
+            try:
+                self._condition.wait_for(lambda: self._writer is None and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -1,30 +1,204 @@
 # cryptocurrency/main.py
 
+import atexit
+import socket
+import sys
+
 from flask import Flask
-from argparse import ArgumentParser # <-- 1. IMPORTE ArgumentParser
+from argparse import SUPPRESS, ArgumentParser, ArgumentTypeError # <-- 1. IMPORTE ArgumentParser
+from werkzeug.serving import is_running_from_reloader
+
+import server
 from blockchain import Blockchain
-from views import api_blueprint, set_blockchain
+from gossip import BlockAnnouncer, TransactionGossip
+from scheduler import MiningScheduler
+from sync import ChainSynchronizer
+from views import (api_blueprint, set_blockchain, set_block_announcer, set_chain_synchronizer,
+                   set_mining_scheduler, set_replica_pool, set_transaction_gossip, set_writer_proxy)
 
-# Cria a instância da aplicação Flask
+# Cria a instância da aplicação Flask. As rotas só funcionam depois de
+# create_node (ou create_replica): `main:app` não serve, sozinho, como
+# ponto de entrada WSGI; use `python main.py --server production`.
 app = Flask(__name__)
 
-# Cria a instância do Blockchain
-blockchain_instance = Blockchain()
-
-# Injeta a instância do blockchain no blueprint das rotas
-set_blockchain(blockchain_instance)
-
 # Registra o blueprint na aplicação Flask
 app.register_blueprint(api_blueprint)
 
+
+def positive_float(value):
+    """Tipo de argumento: número maior que zero."""
+    number = float(value)
+    if number <= 0:
+        raise ArgumentTypeError(f'deve ser maior que zero: {value}')
+    return number
+
+
+def blockchain_options(args):
+    """
+    Parâmetros do Blockchain vindos da linha de comando. Os que afetam a
+    validação e a poda precisam ser iguais no escritor e nas réplicas.
+    """
+    return {
+        'mining_workers': args.mining_workers,
+        'max_block_transactions': args.max_block_transactions,
+        'target_block_interval': args.target_block_interval,
+        'retarget_window': args.retarget_window,
+        'checkpoint_interval': args.checkpoint_interval,
+        'prune_depth': args.prune_depth
+    }
+
+
+def create_node(args):
+    """
+    Cria o Blockchain e os serviços do nó e os injeta no blueprint das rotas.
+
+    Args:
+        args (Namespace): Os argumentos da linha de comando.
+
+    Returns:
+        tuple: (Blockchain, ChainSynchronizer)
+    """
+    blockchain_instance = Blockchain(**blockchain_options(args))
+    blockchain_instance.peer_client.timeout = (3.05, args.peer_timeout)
+    blockchain_instance.peer_client.deadline = args.peer_deadline
+    blockchain_instance.peers.max_backoff = args.peer_max_backoff
+    blockchain_instance.peers.max_failures = args.peer_max_failures
+    blockchain_instance.mempool.max_transactions = args.mempool_size
+    blockchain_instance.mempool.eviction = args.mempool_eviction
+
+    # Garante que os blocos ainda não sincronizados e o retrato do estado sejam gravados ao encerrar
+    atexit.register(blockchain_instance.close)
+
+    # Injeta a instância do blockchain no blueprint das rotas
+    set_blockchain(blockchain_instance)
+    chain_synchronizer = ChainSynchronizer(blockchain_instance)
+    chain_synchronizer.interval = args.sync_interval
+    chain_synchronizer.max_staleness = args.max_staleness
+    set_chain_synchronizer(chain_synchronizer)
+    set_mining_scheduler(MiningScheduler(blockchain_instance, chain_synchronizer))
+    set_transaction_gossip(TransactionGossip(blockchain_instance))
+    block_announcer = BlockAnnouncer(blockchain_instance)
+    blockchain_instance.block_listeners.append(block_announcer.announce)
+    set_block_announcer(block_announcer)
+    return blockchain_instance, chain_synchronizer
+
+
+def create_replica(args):
+    """
+    Cria uma réplica somente leitura da cadeia, que repassa ao processo
+    escritor (`args.replica_of`) as rotas que ela não atende (ver server.py).
+
+    Args:
+        args (Namespace): Os argumentos da linha de comando (os mesmos do escritor).
+
+    Returns:
+        Blockchain: A réplica.
+    """
+    blockchain_instance = Blockchain(read_only=True, **blockchain_options(args))
+    atexit.register(blockchain_instance.close)
+    set_blockchain(blockchain_instance)
+    set_writer_proxy(server.WriterProxy(args.replica_of))
+    return blockchain_instance
+
 # 2. MODIFIQUE O BLOCO DE EXECUÇÃO
 if __name__ == '__main__':
     # Configura o parser para aceitar argumentos de linha de comando
     parser = ArgumentParser()
     parser.add_argument('-p', '--port', default=5000, type=int, help='Porta para escutar')
+    parser.add_argument('--mining-workers', default=1, type=int,
+                        help='Processos usados na prova de trabalho (0 = um por núcleo)')
+    parser.add_argument('--peer-timeout', default=10.0, type=float,
+                        help='Tempo máximo de resposta de cada nó, em segundos')
+    parser.add_argument('--peer-deadline', default=15.0, type=float,
+                        help='Prazo total de uma rodada de consulta aos nós, em segundos')
+    parser.add_argument('--peer-max-backoff', default=600.0, type=float,
+                        help='Espera máxima, em segundos, antes de consultar de novo um nó que vem falhando')
+    parser.add_argument('--peer-max-failures', default=12, type=int,
+                        help='Falhas seguidas após as quais um nó é removido do registro')
+    parser.add_argument('--sync-interval', default=30.0, type=float,
+                        help='Intervalo entre rodadas de consenso em segundo plano (0 = só sob demanda)')
+    parser.add_argument('--max-staleness', default=60.0, type=float,
+                        help='Idade máxima da última sincronização antes de pedir uma nova rodada')
+    parser.add_argument('--max-block-transactions', default=500, type=int,
+                        help='Quantidade máxima de transações por bloco')
+    parser.add_argument('--target-block-interval', default=10.0, type=positive_float,
+                        help='Intervalo desejado entre blocos, em segundos (igual em toda a rede)')
+    parser.add_argument('--retarget-window', default=10, type=int,
+                        help='Blocos recentes usados no ajuste de dificuldade (0 = dificuldade fixa; igual em toda a rede)')
+    parser.add_argument('--mempool-size', default=10000, type=int,
+                        help='Quantidade máxima de transações pendentes')
+    parser.add_argument('--mempool-eviction', default='reject', choices=['reject', 'oldest'],
+                        help='O que fazer com o mempool cheio: recusar novas ou descartar as mais antigas')
+    parser.add_argument('--checkpoint-interval', default=1000, type=int,
+                        help='A cada quantos blocos gravar o retrato do estado e podar os blocos antigos (0 = nunca)')
+    parser.add_argument('--prune-depth', default=0, type=int,
+                        help='Blocos mantidos em disco abaixo do topo; os mais antigos são descartados, e ids '
+                             'de transações repetidos só são recusados dentro desses blocos (0 = manter todos)')
+    parser.add_argument('--bootstrap-from',
+                        help='Nó (ex: http://192.168.0.5:5000) de cujo retrato a cadeia começa, em vez de baixá-la inteira')
+    parser.add_argument('--server', default='development', choices=['development', 'production'],
+                        help='Servidor HTTP: o de desenvolvimento do Flask (com debug) ou o waitress')
+    parser.add_argument('--workers', default=1, type=int,
+                        help='Processos que atendem as requisições no modo de produção (um escritor e as réplicas)')
+    parser.add_argument('--threads', default=8, type=int,
+                        help='Threads por processo no modo de produção')
+    # Usados internamente para iniciar as réplicas do modo de produção
+    parser.add_argument('--replica-of', help=SUPPRESS)
+    parser.add_argument('--listen-fd', type=int, action='append', help=SUPPRESS)
     args = parser.parse_args()
     port = args.port
 
+    if args.replica_of:
+        create_replica(args)
+        server.serve(app, [socket.socket(fileno=fd) for fd in args.listen_fd], args.threads)
+        sys.exit(0)
+
+    if args.server == 'development' and not is_running_from_reloader():
+        # Processo pai do reloader do modo debug: só vigia os arquivos e
+        # reinicia o processo filho, que é quem atende as requisições. Ele não
+        # abre a cadeia, senão gravaria ao encerrar um retrato do estado
+        # parado na altura em que o nó foi iniciado.
+        app.run(host='0.0.0.0', port=port, debug=True, threaded=True)
+        sys.exit(0)
+
+    if args.server == 'production':
+        # Falha antes de abrir a cadeia se o waitress não estiver instalado
+        server.load_waitress()
+    blockchain_instance, chain_synchronizer = create_node(args)
+
+    def bootstrap():
+        if args.bootstrap_from:
+            blockchain_instance.bootstrap(blockchain_instance.register_node(args.bootstrap_from))
+
+    if args.server == 'production':
+        # Sem debug nem reloader. Com mais de um processo, este é o único que
+        # grava a cadeia; as réplicas dividem o socket público com ele e
+        # repassam as escritas pelo endereço interno.
+        sockets = [server.listen_socket('0.0.0.0', port)]
+        replicas = None
+        if args.workers > 1:
+            internal_socket = server.listen_socket('127.0.0.1', 0)
+            sockets.append(internal_socket)
+            replicas = server.ReplicaPool(args.workers - 1, sys.argv[1:])
+            replicas.start(sockets[0], f'http://127.0.0.1:{internal_socket.getsockname()[1]}')
+            set_replica_pool(replicas)
+        bootstrap()
+        chain_synchronizer.start()
+        try:
+            server.serve(app, sockets, args.threads)
+        finally:
+            if replicas is not None:
+                replicas.stop()
+            # A cadeia e o retrato do estado são gravados pelo atexit (Blockchain.close)
+            print("SERVIDOR: Encerrando e gravando a cadeia em disco.")
+        sys.exit(0)
+
+    # Processo filho do reloader do modo debug
+    bootstrap()
+    chain_synchronizer.start()
+
     # O host '0.0.0.0' torna a aplicação acessível na sua rede local.
-    app.run(host='0.0.0.0', port=port, debug=True)
+    # O estado do blockchain é protegido por travas, então as requisições
+    # podem ser atendidas em threads concorrentes.
+    app.run(host='0.0.0.0', port=port, debug=True, threaded=True)
     
\ No newline at end of file
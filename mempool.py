@@ -0,0 +1,288 @@
+# cryptocurrency/mempool.py
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class TransactionRejected(ValueError):
+    """
+    Erro levantado quando o mempool recusa uma ou mais transações.
+
+    Attributes:
+        reason (str): 'duplicate' ou 'full'.
+        transaction_ids (list): Os ids das transações recusadas.
+    """
+
+    def __init__(self, reason, transaction_ids, message):
+        super().__init__(message)
+        self.reason = reason
+        self.transaction_ids = transaction_ids
+
+
+class Mempool:
+    """
+    Fila limitada de transações pendentes, indexada pelo 'id' da transação.
+
+    Recusa ids repetidos, tanto entre as pendentes quanto entre as já
+    gravadas na cadeia, e limita a quantidade de transações e o tamanho
+    total (em bytes do JSON). Quando o limite é atingido, a política
+    `eviction` decide o que acontece: 'reject' recusa as novas transações
+    e 'oldest' descarta as pendentes mais antigas para abrir espaço.
+
+    Os ids gravados são lembrados enquanto os seus blocos estiverem em
+    disco: em um nó que poda a cadeia, a recusa de ids repetidos cobre só
+    os blocos guardados (ver Blockchain.prune e retain_committed).
+    """
+
+    def __init__(self, max_transactions=10000, max_bytes=16 * 1024 * 1024, eviction='reject'):
+        if eviction not in ('reject', 'oldest'):
+            raise ValueError(f'Política de descarte inválida: {eviction}')
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self._pending = OrderedDict()
+        self._committed_ids = set()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._accepted = 0
+        self._duplicates = 0
+        self._rejected_full = 0
+        self._evicted = 0
+
+    @staticmethod
+    def transaction_id(transaction):
+        """
+        Retorna o id normalizado (texto) da transação, ou None se não tiver.
+        """
+        tx_id = transaction.get('id')
+        return None if tx_id is None else str(tx_id)
+
+    def add(self, transaction):
+        """
+        Adiciona uma transação pendente.
+
+        Raises:
+            TransactionRejected: Se o id já existir ou o mempool estiver cheio.
+        """
+        self.add_many([transaction])
+
+    def add_many(self, transactions):
+        """
+        Adiciona um lote de transações de forma atômica: ou todas entram,
+        ou nenhuma.
+
+        Args:
+            transactions (list): As transações a serem adicionadas.
+
+        Raises:
+            TransactionRejected: Se algum id já existir (inclusive repetido
+                dentro do lote) ou se o lote não couber no mempool.
+        """
+        entries = []
+        seen = set()
+        duplicates = []
+        with self._lock:
+            for transaction in transactions:
+                tx_id = self.transaction_id(transaction)
+                if tx_id is not None and (tx_id in seen or tx_id in self._pending or tx_id in self._committed_ids):
+                    duplicates.append(tx_id)
+                    continue
+                if tx_id is None:
+                    # Transações sem id (ex: recompensa) recebem uma chave interna
+                    key = (None, uuid.uuid4().hex)
+                else:
+                    key = tx_id
+                    seen.add(tx_id)
+                entries.append((key, transaction, len(json.dumps(transaction))))
+
+            if duplicates:
+                self._duplicates += len(duplicates)
+                raise TransactionRejected(
+                    'duplicate', duplicates,
+                    f'Transação(ões) com id já existente: {", ".join(duplicates)}'
+                )
+
+            batch_bytes = sum(size for _, _, size in entries)
+            if not self._make_room(len(entries), batch_bytes):
+                self._rejected_full += len(entries)
+                raise TransactionRejected(
+                    'full', [key for key, _, _ in entries if isinstance(key, str)],
+                    'O mempool está cheio. Tente novamente após a mineração do próximo bloco.'
+                )
+
+            for key, transaction, size in entries:
+                self._pending[key] = (transaction, size)
+                self._bytes += size
+            self._accepted += len(entries)
+
+    def add_bulk(self, transactions):
+        """
+        Adiciona as transações que puderem entrar, uma a uma, mas segurando
+        a trava uma única vez (usado na importação em massa). Ao contrário de
+        add_many, uma transação recusada não impede as demais.
+
+        Args:
+            transactions (list): As transações a serem adicionadas.
+
+        Returns:
+            list: Para cada transação, None se foi aceita ou o motivo da
+            recusa ('duplicate' ou 'full').
+        """
+        results = []
+        with self._lock:
+            for transaction in transactions:
+                tx_id = self.transaction_id(transaction)
+                if tx_id is not None and (tx_id in self._pending or tx_id in self._committed_ids):
+                    self._duplicates += 1
+                    results.append('duplicate')
+                    continue
+                size = len(json.dumps(transaction))
+                if not self._make_room(1, size):
+                    self._rejected_full += 1
+                    results.append('full')
+                    continue
+                key = (None, uuid.uuid4().hex) if tx_id is None else tx_id
+                self._pending[key] = (transaction, size)
+                self._bytes += size
+                self._accepted += 1
+                results.append(None)
+        return results
+
+    def take_batch(self, max_count):
+        """
+        Remove e retorna até `max_count` transações, das mais antigas para as
+        mais novas. Os ids retirados passam a contar como gravados (para que
+        não sejam aceitos de novo enquanto o bloco é gravado); se o bloco não
+        for gravado, o lote volta com return_batch.
+
+        Returns:
+            list: As transações retiradas.
+        """
+        batch = []
+        with self._lock:
+            while self._pending and len(batch) < max_count:
+                key, (transaction, size) = self._pending.popitem(last=False)
+                self._bytes -= size
+                if isinstance(key, str):
+                    self._committed_ids.add(key)
+                batch.append(transaction)
+        return batch
+
+    def return_batch(self, transactions):
+        """
+        Devolve ao início das pendentes, na ordem original, um lote retirado
+        por take_batch cujo bloco não chegou a ser gravado. Os ids deixam de
+        contar como gravados.
+        """
+        with self._lock:
+            for transaction in reversed(transactions):
+                tx_id = self.transaction_id(transaction)
+                key = (None, uuid.uuid4().hex) if tx_id is None else tx_id
+                self._committed_ids.discard(tx_id)
+                size = len(json.dumps(transaction))
+                self._pending[key] = (transaction, size)
+                self._pending.move_to_end(key, last=False)
+                self._bytes += size
+
+    def mark_committed(self, transactions):
+        """
+        Registra transações gravadas na cadeia (ex: blocos recebidos de outro
+        nó) e as remove das pendentes, se estiverem lá.
+        """
+        with self._lock:
+            for transaction in transactions:
+                tx_id = self.transaction_id(transaction)
+                if tx_id is None:
+                    continue
+                self._committed_ids.add(tx_id)
+                entry = self._pending.pop(tx_id, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+
+    def rebuild_committed(self, chain):
+        """
+        Recalcula os ids gravados a partir de uma cadeia completa (usado
+        quando a cadeia local é substituída).
+        """
+        committed_ids = set()
+        for block in chain:
+            for transaction in block['transactions']:
+                tx_id = self.transaction_id(transaction)
+                if tx_id is not None:
+                    committed_ids.add(tx_id)
+        with self._lock:
+            self._committed_ids = committed_ids
+            for tx_id in [key for key in self._pending if key in committed_ids]:
+                self._bytes -= self._pending.pop(tx_id)[1]
+
+    def committed_ids(self):
+        """Retorna uma cópia dos ids já gravados na cadeia."""
+        with self._lock:
+            return list(self._committed_ids)
+
+    def restore_committed(self, committed_ids):
+        """
+        Restaura os ids gravados a partir de um retrato salvo, sem percorrer
+        a cadeia, e remove das pendentes os que já estiverem gravados.
+        """
+        committed_ids = set(committed_ids)
+        with self._lock:
+            self._committed_ids = committed_ids
+            for tx_id in [key for key in self._pending if key in committed_ids]:
+                self._bytes -= self._pending.pop(tx_id)[1]
+
+    def retain_committed(self, keep):
+        """
+        Mantém apenas os ids gravados para os quais `keep(id)` é verdadeiro
+        (ex: os dos blocos que continuam em disco após uma poda).
+        """
+        with self._lock:
+            self._committed_ids = {tx_id for tx_id in self._committed_ids if keep(tx_id)}
+
+    def contains(self, tx_id):
+        """True se o id estiver pendente ou já gravado na cadeia."""
+        tx_id = str(tx_id)
+        with self._lock:
+            return tx_id in self._pending or tx_id in self._committed_ids
+
+    def transactions(self):
+        """Retorna uma cópia da lista de transações pendentes, em ordem de chegada."""
+        with self._lock:
+            return [transaction for transaction, _ in self._pending.values()]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Tamanho atual, limites e contadores do mempool.
+        """
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'pending_bytes': self._bytes,
+                'committed_ids': len(self._committed_ids),
+                'max_transactions': self.max_transactions,
+                'max_bytes': self.max_bytes,
+                'eviction': self.eviction,
+                'accepted': self._accepted,
+                'rejected_duplicates': self._duplicates,
+                'rejected_full': self._rejected_full,
+                'evicted': self._evicted
+            }
+
+    def _make_room(self, count, size):
+        """Abre espaço para `count` transações e `size` bytes. Requer self._lock."""
+        if count > self.max_transactions or size > self.max_bytes:
+            return False
+        while (len(self._pending) + count > self.max_transactions
+               or self._bytes + size > self.max_bytes):
+            if self.eviction != 'oldest' or not self._pending:
+                return False
+            _, (_, evicted_size) = self._pending.popitem(last=False)
+            self._bytes -= evicted_size
+            self._evicted += 1
+        return True
@@ -0,0 +1,98 @@
+# cryptocurrency/merkle.py
+
+import hashlib
+import json
+
+# Prefixos que separam o hash de uma folha do hash de um nó interno, para
+# que um nó interno não possa ser apresentado como se fosse uma transação
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def transaction_hash(transaction):
+    """
+    Calcula o hash de uma transação (folha da árvore de Merkle).
+
+    Args:
+        transaction (dict): A transação.
+
+    Returns:
+        bytes: O digest SHA-256.
+    """
+    encoded = json.dumps(transaction, sort_keys=True).encode()
+    return hashlib.sha256(LEAF_PREFIX + encoded).digest()
+
+
+def _parent(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level):
+    # Um nó sem par sobe sem ser combinado (não é duplicado), para que duas
+    # listas de transações diferentes não produzam a mesma raiz
+    parents = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(transactions):
+    """
+    Calcula a raiz de Merkle de uma lista de transações.
+
+    Args:
+        transactions (list): As transações do bloco, em ordem.
+
+    Returns:
+        str: A raiz em formato hexadecimal (o hash de b'' se a lista for vazia).
+    """
+    level = [transaction_hash(transaction) for transaction in transactions]
+    if not level:
+        return hashlib.sha256(b'').hexdigest()
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(transactions, position):
+    """
+    Monta o caminho de Merkle que prova que a transação na posição
+    `position` faz parte da raiz do bloco.
+
+    Args:
+        transactions (list): As transações do bloco, em ordem.
+        position (int): A posição da transação no bloco.
+
+    Returns:
+        list: Os passos, da folha até a raiz: {'hash': irmão em hexadecimal,
+        'side': 'left' ou 'right' (de que lado o irmão fica)}.
+    """
+    level = [transaction_hash(transaction) for transaction in transactions]
+    path = []
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            path.append({'hash': level[sibling].hex(), 'side': 'left' if sibling < position else 'right'})
+        level = _next_level(level)
+        position //= 2
+    return path
+
+
+def verify_proof(transaction, path, root):
+    """
+    Confere um caminho de Merkle (ver merkle_proof), como faria um cliente
+    leve que só conhece o cabeçalho do bloco.
+
+    Args:
+        transaction (dict): A transação.
+        path (list): O caminho de Merkle.
+        root (str): A raiz de Merkle do cabeçalho do bloco.
+
+    Returns:
+        bool: True se a transação pertence à raiz.
+    """
+    current = transaction_hash(transaction)
+    for step in path:
+        sibling = bytes.fromhex(step['hash'])
+        current = _parent(sibling, current) if step['side'] == 'left' else _parent(current, sibling)
+    return current.hex() == root
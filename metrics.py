@@ -0,0 +1,269 @@
+# cryptocurrency/metrics.py
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Limites (em segundos) dos histogramas de latência
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas exportadas pela rota /metrics, no formato de texto
+    do Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self, exports=()):
+        """
+        Args:
+            exports (list): Valores exportados por outros processos do mesmo
+                nó (ver export), somados aos deste.
+
+        Returns:
+            str: Todas as métricas no formato de texto do Prometheus.
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples([export.get(metric.name, ()) for export in exports]))
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """
+        Retorna os valores dos contadores e histogramas deste processo, em
+        formato JSON, para serem somados aos do processo que atende /metrics
+        (ex: as réplicas do modo de produção). Os medidores (gauges) ficam de
+        fora, pois descrevem o estado do nó e são atualizados a cada leitura.
+
+        Returns:
+            dict: Nome da métrica -> lista de [valores dos rótulos, valor].
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: metric.export() for metric in metrics if metric.kind != 'gauge'}
+
+
+class _Metric:
+    """
+    Base das métricas. Cada combinação de valores de rótulos tem seu próprio
+    valor; `labels(...)` retorna uma visão ligada a uma combinação.
+
+    As operações só seguram uma trava por métrica durante a atualização de
+    um número, para que possam ficar ligadas nos caminhos críticos.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        """Retorna a métrica ligada aos valores de rótulo informados (na ordem de `labelnames`)."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f'A métrica {self.name} espera os rótulos {self.labelnames}')
+        return _Bound(self, tuple(str(value) for value in values))
+
+    def samples(self, exports=()):
+        return [f'{self.name}{self._format_labels(key)} {_format_value(value)}'
+                for key, value in self._collect(exports)]
+
+    def export(self):
+        with self._lock:
+            return [[list(key), self._copy_value(value)] for key, value in self._values.items()]
+
+    def _collect(self, exports=()):
+        """Valores deste processo somados aos exportados por outros, em ordem de rótulos."""
+        with self._lock:
+            values = {key: self._copy_value(value) for key, value in self._values.items()}
+        for export in exports:
+            for key, value in export:
+                key = tuple(key)
+                values[key] = self._add_values(values[key], value) if key in values else value
+        return sorted(values.items())
+
+    def _copy_value(self, value):
+        return value
+
+    def _add_values(self, value, other):
+        return value + other
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Bound:
+    """Visão de uma métrica com os valores de rótulo já escolhidos."""
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._inc(self._key, amount)
+
+    def set(self, value):
+        self._metric._set(self._key, value)
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+    def time(self):
+        return self._metric._time(self._key)
+
+
+class Counter(_Metric):
+    """Contador que só cresce (ex: total de requisições)."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1):
+        self._inc((), amount)
+
+    def _inc(self, key, amount=1):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Valor que sobe e desce (ex: tamanho do mempool)."""
+
+    kind = 'gauge'
+
+    def set(self, value):
+        self._set((), value)
+
+    def inc(self, amount=1):
+        self._inc((), amount)
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def _inc(self, key, amount=1):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Distribuição de valores (ex: latências) em faixas cumulativas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value):
+        self._observe((), value)
+
+    def time(self):
+        return self._time(())
+
+    def _observe(self, key, value):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Contagem por faixa (a última é +Inf), soma e total
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def _time(self, key):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(key, time.perf_counter() - started)
+
+    def samples(self, exports=()):
+        lines = []
+        for key, (counts, total, count) in self._collect(exports):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                lines.append(f'{self.name}_bucket{self._format_labels(key, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{self._format_labels(key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{self._format_labels(key)} {count}')
+        return lines
+
+    def _copy_value(self, value):
+        counts, total, count = value
+        return [list(counts), total, count]
+
+    def _add_values(self, value, other):
+        return [[a + b for a, b in zip(value[0], other[0])], value[1] + other[1], value[2] + other[2]]
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value) if value == value and abs(value) != float('inf') else str(value)
+    return str(value)
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Rotas HTTP ---
+http_requests = Counter('http_requests_total', 'Requisições atendidas, por rota, método e status.',
+                        ['route', 'method', 'status'])
+http_request_duration = Histogram('http_request_duration_seconds',
+                                  'Tempo até a resposta ser montada, por rota e método.', ['route', 'method'])
+
+# --- Prova de trabalho ---
+pow_searches = Counter('pow_searches_total', 'Buscas de prova de trabalho, por resultado (found/cancelled).',
+                       ['outcome'])
+pow_hashes = Counter('pow_hashes_total', 'Hashes calculados nas buscas de prova de trabalho.')
+pow_search_duration = Histogram('pow_search_duration_seconds', 'Duração das buscas de prova de trabalho.')
+pow_hash_rate = Gauge('pow_hash_rate', 'Hashes por segundo da última busca de prova de trabalho.')
+
+# --- Comunicação com os outros nós ---
+peer_requests = Counter('peer_requests_total', 'Requisições a outros nós, por nó, rota e resultado (ok/error).',
+                        ['peer', 'path', 'outcome'])
+peer_request_duration = Histogram('peer_request_duration_seconds', 'Latência das requisições a outros nós.',
+                                  ['peer', 'path'])
+peers = Gauge('peers', 'Nós registrados, por estado (available/backoff).', ['state'])
+peers_evicted = Counter('peers_evicted_total', 'Nós removidos do registro após falhas seguidas.')
+
+# --- Validação e disco ---
+chain_validation_duration = Histogram('chain_validation_duration_seconds',
+                                      'Duração da validação de blocos, por modo (local/foreign/full/extension).', ['mode'])
+storage_write_duration = Histogram('storage_write_duration_seconds',
+                                   'Duração das gravações em disco, por operação.', ['operation'])
+
+# --- Estado do nó (atualizados a cada leitura de /metrics) ---
+mempool_transactions = Gauge('mempool_transactions', 'Transações pendentes no mempool.')
+mempool_bytes = Gauge('mempool_bytes', 'Tamanho das transações pendentes, em bytes do JSON.')
+chain_height = Gauge('chain_height', 'Quantidade de blocos da cadeia local.')
+chain_cumulative_work = Gauge('chain_cumulative_work', 'Trabalho acumulado da cadeia local.')
+mining_difficulty = Gauge('mining_difficulty', 'Dificuldade exigida do próximo bloco.')
@@ -0,0 +1,225 @@
+# cryptocurrency/miner.py
+
+import hashlib
+import multiprocessing
+import os
+import queue
+import time
+
+import metrics
+
+# Quantidade de zeros hexadecimais exigidos no início do hash ('0000')
+DIFFICULTY = 4
+
+
+def difficulty_target(difficulty=DIFFICULTY):
+    """
+    Converte a dificuldade (zeros hexadecimais à esquerda) no alvo em bytes.
+
+    Um digest SHA-256 tem `difficulty` zeros hexadecimais à esquerda se, e
+    somente se, for menor que 16 ** (64 - difficulty). Comparar os bytes
+    brutos evita gerar o hexdigest de cada candidato.
+
+    Args:
+        difficulty (int): Número de zeros hexadecimais exigidos.
+
+    Returns:
+        bytes: O alvo de 32 bytes (big-endian).
+    """
+    return (16 ** (64 - difficulty)).to_bytes(32, 'big')
+
+
+DEFAULT_TARGET = difficulty_target()
+
+# Trabalho (hashes esperados) de um bloco com o prefixo fixo '0000'. É a
+# dificuldade dos blocos gravados antes do ajuste de dificuldade por bloco.
+LEGACY_DIFFICULTY = 16 ** DIFFICULTY
+
+
+def work_target(difficulty):
+    """
+    Converte a dificuldade de um bloco (quantidade média de hashes para
+    encontrar a prova) no alvo em bytes: o digest precisa ser menor que
+    2**256 / dificuldade. work_target(LEGACY_DIFFICULTY) == DEFAULT_TARGET.
+
+    Args:
+        difficulty (int): A dificuldade do bloco.
+
+    Returns:
+        bytes: O alvo de 32 bytes (big-endian).
+    """
+    return min(2**256 // max(int(difficulty), 1), 2**256 - 1).to_bytes(32, 'big')
+
+
+def valid_proof(proof, previous_proof, target=DEFAULT_TARGET):
+    """
+    Verifica se a prova atende ao alvo de dificuldade.
+
+    Args:
+        proof (int): A prova candidata.
+        previous_proof (int): A prova do bloco anterior.
+        target (bytes): O alvo de dificuldade.
+
+    Returns:
+        bool: True se o hash da operação for menor que o alvo.
+    """
+    digest = hashlib.sha256(str(proof**2 - previous_proof**2).encode()).digest()
+    return digest < target
+
+
+def _scan(previous_proof, target, start, step, batch_size, stop_event):
+    """
+    Percorre as provas start, start + step, start + 2*step, ... até encontrar
+    uma válida ou até `stop_event` ser sinalizado (verificado a cada lote).
+
+    Returns:
+        tuple: (prova encontrada ou None, número de hashes calculados)
+    """
+    sha256 = hashlib.sha256
+    previous_square = previous_proof**2
+    proof = start
+    hashes = 0
+    while not stop_event.is_set():
+        for i in range(batch_size):
+            if sha256(str(proof * proof - previous_square).encode()).digest() < target:
+                return proof, hashes + i + 1
+            proof += step
+        hashes += batch_size
+    return None, hashes
+
+
+def _worker(previous_proof, target, start, step, batch_size, found_event, results):
+    """Ponto de entrada de cada processo do pool de mineração."""
+    proof, hashes = _scan(previous_proof, target, start, step, batch_size, found_event)
+    if proof is not None:
+        # O primeiro a encontrar uma prova avisa os demais para pararem
+        found_event.set()
+    results.put((proof, hashes))
+
+
+class MiningResult:
+    """
+    Resultado de uma busca de prova de trabalho.
+    """
+
+    def __init__(self, proof, hashes, elapsed, workers):
+        self.proof = proof
+        self.hashes = hashes
+        self.elapsed = elapsed
+        self.workers = workers
+
+    @property
+    def hash_rate(self):
+        """Hashes por segundo obtidos na busca."""
+        return self.hashes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            'proof': self.proof,
+            'workers': self.workers,
+            'hashes': self.hashes,
+            'elapsed_seconds': round(self.elapsed, 6),
+            'hashes_per_second': round(self.hash_rate, 2)
+        }
+
+
+class ProofOfWorkEngine:
+    """
+    Motor de prova de trabalho que divide o espaço de provas entre vários
+    processos. O processo k testa as provas 1 + k, 1 + k + N, 1 + k + 2N, ...
+    (N = número de processos), e o primeiro que encontrar uma prova válida
+    cancela os outros.
+    """
+
+    def __init__(self, workers=1, batch_size=5000, target=DEFAULT_TARGET):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.target = target
+        self.last_result = None
+
+    @property
+    def workers(self):
+        return self._workers
+
+    @workers.setter
+    def workers(self, value):
+        # 0 ou None significa "um processo por núcleo disponível"
+        self._workers = max(1, int(value or os.cpu_count() or 1))
+
+    def search(self, previous_proof, cancel_event=None, target=None):
+        """
+        Procura uma prova válida para o bloco seguinte.
+
+        Args:
+            previous_proof (int): A prova de trabalho do bloco anterior.
+            cancel_event (threading.Event, opcional): Quando sinalizado,
+                interrompe a busca.
+            target (bytes, opcional): O alvo do bloco (ver work_target).
+                Se omitido, usa `self.target`.
+
+        Returns:
+            MiningResult: O resultado; `proof` é None se a busca foi cancelada.
+        """
+        target = self.target if target is None else target
+        started = time.perf_counter()
+        if self.workers == 1:
+            stop_event = cancel_event or _NeverSet()
+            proof, hashes = _scan(previous_proof, target, 1, 1, self.batch_size, stop_event)
+        else:
+            proof, hashes = self._search_parallel(previous_proof, cancel_event, target)
+        result = MiningResult(proof, hashes, time.perf_counter() - started, self.workers)
+        self.last_result = result
+        metrics.pow_searches.labels('cancelled' if proof is None else 'found').inc()
+        metrics.pow_hashes.inc(hashes)
+        metrics.pow_search_duration.observe(result.elapsed)
+        metrics.pow_hash_rate.set(result.hash_rate)
+        return result
+
+    def _search_parallel(self, previous_proof, cancel_event, target):
+        if cancel_event is not None and cancel_event.is_set():
+            return None, 0
+        context = multiprocessing.get_context()
+        found_event = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_worker,
+                args=(previous_proof, target, 1 + k, self.workers,
+                      self.batch_size, found_event, results),
+                daemon=True
+            )
+            for k in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        proofs = []
+        hashes = 0
+        pending = len(processes)
+        try:
+            while pending:
+                try:
+                    proof, worker_hashes = results.get(timeout=0.1)
+                except queue.Empty:
+                    if cancel_event is not None and cancel_event.is_set():
+                        found_event.set()
+                    continue
+                pending -= 1
+                hashes += worker_hashes
+                if proof is not None:
+                    proofs.append(proof)
+        finally:
+            found_event.set()
+            for process in processes:
+                process.join()
+
+        # Mais de um processo pode ter encontrado uma prova no mesmo lote;
+        # a menor mantém o resultado próximo ao da busca sequencial.
+        return (min(proofs) if proofs else None), hashes
+
+
+class _NeverSet:
+    """Substituto de threading.Event para buscas que não podem ser canceladas."""
+
+    def is_set(self):
+        return False
@@ -0,0 +1,311 @@
+# cryptocurrency/peers.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+
+class PeerResponse:
+    """
+    Resultado da consulta a um nó da rede.
+    """
+
+    def __init__(self, node, data=None, status_code=None, latency=None, error=None):
+        self.node = node
+        self.data = data
+        self.status_code = status_code
+        self.latency = latency
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.status_code in (200, 201)
+
+    def to_dict(self):
+        return {
+            'node': self.node,
+            'ok': self.ok,
+            'status_code': self.status_code,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'error': self.error
+        }
+
+
+class PeerRecord:
+    """
+    Saúde de um nó registrado: latência, sequência de falhas, última
+    resposta e o topo que ele anunciou.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.added_at = time.monotonic()
+        # Média móvel exponencial da latência das respostas bem-sucedidas (segundos)
+        self.latency = None
+        self.failures = 0
+        self.total_failures = 0
+        self.successes = 0
+        self.last_seen = None
+        self.last_error = None
+        # Instante (time.monotonic) a partir do qual o nó volta a ser consultado
+        self.retry_at = 0.0
+        self.height = None
+        self.cumulative_work = None
+
+    def to_dict(self, now):
+        return {
+            'node': self.address,
+            'latency_ms': round(self.latency * 1000, 2) if self.latency is not None else None,
+            'failures': self.failures,
+            'total_failures': self.total_failures,
+            'successes': self.successes,
+            'seconds_since_last_seen': round(now - self.last_seen, 3) if self.last_seen is not None else None,
+            'last_error': self.last_error,
+            'backoff_seconds': round(max(0.0, self.retry_at - now), 3),
+            'height': self.height,
+            'cumulative_work': self.cumulative_work
+        }
+
+
+class PeerRegistry:
+    """
+    Registro dos nós da rede com o histórico de saúde de cada um.
+
+    Cada falha seguida dobra o tempo até o nó ser consultado de novo
+    (`base_backoff`, até `max_backoff` segundos), e um nó com `max_failures`
+    falhas seguidas é removido do registro. Uma resposta bem-sucedida zera
+    a sequência. Os nós disponíveis são ordenados pelos mais saudáveis
+    (menos falhas seguidas, depois menor latência).
+    """
+
+    def __init__(self, base_backoff=5.0, max_backoff=600.0, max_failures=12, latency_weight=0.3):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_failures = max_failures
+        self.latency_weight = latency_weight
+        self.evicted = 0
+        self._peers = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, address):
+        return address in self._peers
+
+    def __len__(self):
+        return len(self._peers)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._peers))
+
+    def add(self, address):
+        """
+        Registra um nó. Se ele já estava registrado, o histórico é mantido,
+        mas uma espera de backoff em andamento é cancelada.
+
+        Args:
+            address (str): Endereço do nó. Ex: '192.168.0.5:5000'
+        """
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is None:
+                self._peers[address] = PeerRecord(address)
+            else:
+                peer.retry_at = 0.0
+
+    def remove(self, address):
+        with self._lock:
+            self._peers.pop(address, None)
+
+    def available(self):
+        """
+        Returns:
+            list: Os endereços dos nós fora de backoff, dos mais saudáveis
+            para os menos saudáveis.
+        """
+        now = time.monotonic()
+        with self._lock:
+            peers = [peer for peer in self._peers.values() if peer.retry_at <= now]
+            peers.sort(key=self._health_key)
+            return [peer.address for peer in peers]
+
+    def record(self, response):
+        """
+        Registra o resultado de uma consulta (PeerResponse). Só erros de
+        conexão, prazos esgotados e erros 5xx contam como falha: um nó que
+        recusa o pedido (4xx) está respondendo. Respostas de nós que não
+        estão no registro são ignoradas.
+        """
+        if response.error is None and response.status_code < 500:
+            self._record_success(response.node, response.latency)
+        else:
+            self._record_failure(response.node, response.error or f'HTTP {response.status_code}')
+
+    def update_head(self, address, height, cumulative_work):
+        """Guarda o topo (altura e trabalho acumulado) anunciado por um nó."""
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is not None:
+                peer.height = height
+                peer.cumulative_work = cumulative_work
+
+    def status(self):
+        """
+        Returns:
+            list: A saúde de cada nó, dos mais saudáveis para os menos saudáveis.
+        """
+        now = time.monotonic()
+        with self._lock:
+            peers = sorted(self._peers.values(), key=self._health_key)
+            return [peer.to_dict(now) for peer in peers]
+
+    def _record_success(self, address, latency):
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is None:
+                return
+            if latency is not None:
+                peer.latency = latency if peer.latency is None else (
+                    self.latency_weight * latency + (1 - self.latency_weight) * peer.latency)
+            peer.failures = 0
+            peer.successes += 1
+            peer.last_seen = time.monotonic()
+            peer.retry_at = 0.0
+
+    def _record_failure(self, address, error):
+        with self._lock:
+            peer = self._peers.get(address)
+            if peer is None:
+                return
+            peer.failures += 1
+            peer.total_failures += 1
+            peer.last_error = error
+            if peer.failures >= self.max_failures:
+                del self._peers[address]
+                self.evicted += 1
+                metrics.peers_evicted.inc()
+                print(f"AVISO: O nó {address} falhou {peer.failures} vezes seguidas e foi removido do registro.")
+                return
+            backoff = min(self.base_backoff * 2 ** (peer.failures - 1), self.max_backoff)
+            peer.retry_at = time.monotonic() + backoff
+
+    @staticmethod
+    def _health_key(peer):
+        return (peer.failures, peer.latency if peer.latency is not None else float('inf'), peer.address)
+
+
+class PeerClient:
+    """
+    Cliente HTTP compartilhado para consultar os nós da rede em paralelo.
+
+    Usa uma única sessão com pool de conexões (reaproveitando as conexões
+    entre rodadas), um timeout por nó, um prazo total por rodada e um limite
+    de requisições simultâneas.
+    """
+
+    def __init__(self, timeout=(3.05, 10.0), deadline=15.0, max_concurrency=8, registry=None):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        # PeerRegistry que recebe o resultado de cada consulta, se informado
+        self.registry = registry
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='peer-client')
+
+    def get_json(self, node, path, params=None):
+        """
+        Faz um GET em um único nó e decodifica a resposta JSON.
+
+        Args:
+            node (str): Endereço do nó. Ex: '192.168.0.5:5000'
+            path (str): Caminho da rota. Ex: '/get_chain'
+            params (dict, opcional): Parâmetros de query.
+
+        Returns:
+            PeerResponse: O resultado, com a latência medida.
+        """
+        return self._request('GET', node, path, params=params)
+
+    def post_json(self, node, path, payload):
+        """
+        Faz um POST com corpo JSON em um único nó.
+
+        Args:
+            node (str): Endereço do nó.
+            path (str): Caminho da rota.
+            payload: O corpo da requisição.
+
+        Returns:
+            PeerResponse: O resultado, com a latência medida.
+        """
+        return self._request('POST', node, path, json=payload)
+
+    def fetch_all(self, nodes, path, params=None, deadline=None):
+        """
+        Consulta todos os nós em paralelo.
+
+        Nós que não responderem dentro do prazo total (`deadline`) são
+        reportados com erro, sem bloquear o restante da rodada.
+
+        Args:
+            nodes (iterable): Endereços dos nós.
+            path (str): Caminho da rota.
+            params (dict, opcional): Parâmetros de query.
+            deadline (float, opcional): Prazo total em segundos.
+
+        Returns:
+            list: Um PeerResponse por nó, na ordem em que os nós foram informados.
+        """
+        return self._fan_out(nodes, lambda node: self.get_json(node, path, params), deadline)
+
+    def post_all(self, nodes, path, payload, deadline=None):
+        """
+        Envia o mesmo POST a todos os nós em paralelo (ver fetch_all).
+
+        Returns:
+            list: Um PeerResponse por nó.
+        """
+        return self._fan_out(nodes, lambda node: self.post_json(node, path, payload), deadline)
+
+    def _request(self, method, node, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f'http://{node}{path}', timeout=self.timeout, **kwargs)
+            data = response.json() if response.status_code in (200, 201) else None
+            result = PeerResponse(node, data, response.status_code, time.perf_counter() - started)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            result = PeerResponse(node, latency=time.perf_counter() - started, error=str(e))
+        metrics.peer_requests.labels(node, path, 'ok' if result.ok else 'error').inc()
+        metrics.peer_request_duration.labels(node, path).observe(result.latency)
+        if self.registry is not None:
+            self.registry.record(result)
+        return result
+
+    def _fan_out(self, nodes, call, deadline):
+        nodes = list(nodes)
+        if not nodes:
+            return []
+        deadline = self.deadline if deadline is None else deadline
+        started = time.perf_counter()
+        futures = [self._executor.submit(call, node) for node in nodes]
+        wait(futures, timeout=deadline)
+
+        results = []
+        for node, future in zip(nodes, futures):
+            if future.done():
+                results.append(future.result())
+            else:
+                future.cancel()
+                result = PeerResponse(node, latency=time.perf_counter() - started,
+                                      error='Prazo total da rodada esgotado')
+                if self.registry is not None:
+                    self.registry.record(result)
+                results.append(result)
+        return results
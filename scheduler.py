@@ -0,0 +1,261 @@
+# cryptocurrency/scheduler.py
+
+import collections
+import datetime
+import threading
+import uuid
+
+from miner import work_target
+
+
+class MiningJob:
+    """
+    Um pedido de mineração de um bloco, executado em segundo plano.
+
+    Estados possíveis: 'queued', 'running', 'found', 'cancelled' e 'failed'.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.attempts = 0
+        self.block = None
+        self.mining = None
+        self.error = None
+        self.cancel_requested = False
+
+    @property
+    def finished(self):
+        return self.status in ('found', 'cancelled', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'attempts': self.attempts,
+            'block': self.block,
+            'mining': self.mining,
+            'error': self.error
+        }
+
+
+class MiningScheduler:
+    """
+    Executa os pedidos de mineração em uma thread de fundo, um de cada vez,
+    para que as rotas do Flask não fiquem presas durante a prova de trabalho.
+
+    Se a cadeia local for substituída por uma mais longa enquanto uma prova
+    está sendo procurada, a tentativa atual é abortada e recomeça sobre o
+    novo último bloco.
+    """
+
+    def __init__(self, blockchain, synchronizer=None, max_finished_jobs=100, max_events=100):
+        self.blockchain = blockchain
+        # Com um ChainSynchronizer, o consenso antes de minerar não concorre
+        # com as rodadas feitas em segundo plano
+        self.synchronizer = synchronizer
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs = collections.OrderedDict()
+        self._queue = collections.deque()
+        self._events = collections.deque(maxlen=max_events)
+        self._event_seq = 0
+        self._listeners = []
+        self._condition = threading.Condition()
+        self._attempt_cancel = None
+        self._restart_requested = False
+        self._thread = None
+        blockchain.chain_replaced_listeners.append(self.notify_new_tip)
+
+    # --- API de pedidos ---
+
+    def submit(self):
+        """
+        Enfileira um novo pedido de mineração.
+
+        Returns:
+            MiningJob: O pedido criado.
+        """
+        job = MiningJob()
+        with self._condition:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._trim_jobs()
+            self._ensure_thread()
+            self._condition.notify_all()
+        return job
+
+    def get(self, job_id):
+        """
+        Retorna o pedido com o id informado, ou None se não existir.
+        """
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancela um pedido pendente ou em execução.
+
+        Args:
+            job_id (str): O id do pedido.
+
+        Returns:
+            MiningJob: O pedido, ou None se não existir.
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_requested = True
+            if job.status == 'queued':
+                self._queue.remove(job)
+                self._finish(job, 'cancelled')
+            elif self._attempt_cancel is not None:
+                self._attempt_cancel.set()
+            return job
+
+    def add_listener(self, callback):
+        """
+        Registra uma função chamada como callback(evento) a cada evento
+        (por exemplo, quando um bloco é encontrado).
+        """
+        self._listeners.append(callback)
+
+    def wait_for_events(self, since=0, timeout=0):
+        """
+        Retorna os eventos com número de sequência maior que `since`,
+        esperando até `timeout` segundos caso ainda não exista nenhum.
+
+        Returns:
+            list: Os eventos encontrados (dicts com 'seq', 'type', 'job_id'...).
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._event_seq > since, timeout=timeout)
+            return [event for event in self._events if event['seq'] > since]
+
+    def notify_new_tip(self):
+        """
+        Avisa que a cadeia local mudou: a tentativa em andamento é abortada e
+        recomeça sobre o novo último bloco.
+        """
+        with self._condition:
+            if self._attempt_cancel is not None:
+                self._restart_requested = True
+                self._attempt_cancel.set()
+
+    # --- Thread de mineração ---
+
+    def _ensure_thread(self):
+        # Iniciada sob demanda para não criar threads no processo do reloader
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='mining-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue)
+                job = self._queue.popleft()
+                job.status = 'running'
+                job.started_at = _now()
+            try:
+                self._mine(job)
+            except Exception as e:
+                with self._condition:
+                    job.error = str(e)
+                    self._finish(job, 'failed')
+
+    def _mine(self, job):
+        # Garante que estamos na cadeia mais longa e válida antes de fazer o trabalho
+        print("Iniciando mineração: Verificando consenso com a rede...")
+        resolve_conflicts = self.synchronizer.sync if self.synchronizer else self.blockchain.resolve_conflicts
+        if resolve_conflicts():
+            print("CONSENSO: Cadeia atualizada. A mineração continuará na nova cadeia.")
+        else:
+            print("CONSENSO: Cadeia local já é a correta. Prosseguindo.")
+
+        while True:
+            with self._condition:
+                if job.cancel_requested:
+                    self._finish(job, 'cancelled')
+                    return
+                attempt_cancel = threading.Event()
+                self._attempt_cancel = attempt_cancel
+                self._restart_requested = False
+                job.attempts += 1
+
+            # O topo e o seu hash (o gravado, sem recalcular) lidos juntos
+            with self.blockchain.lock.read_locked():
+                previous_block = self.blockchain.get_previous_block()
+                previous_hash = self.blockchain.get_block_hash(len(self.blockchain.chain) - 1)
+            # A dificuldade depende só dos blocos até o topo; se o topo mudar
+            # antes do commit, a conferência abaixo descarta a prova
+            target = work_target(self.blockchain.next_difficulty())
+            result = self.blockchain.miner.search(previous_block['proof'], attempt_cancel, target)
+
+            with self._condition:
+                self._attempt_cancel = None
+                job.mining = result.to_dict()
+                if job.cancel_requested:
+                    self._finish(job, 'cancelled')
+                    return
+                if self._restart_requested or result.proof is None:
+                    print("MINERAÇÃO: Nova cadeia recebida, recomeçando sobre o novo bloco.")
+                    continue
+
+            # Confere o topo e grava o bloco de forma atômica: a cadeia pode
+            # ter mudado entre o fim da busca e este ponto
+            with self.blockchain.lock.write_locked():
+                height = len(self.blockchain.chain)
+                if (height != previous_block['index']
+                        or self.blockchain.get_block_hash(height - 1) != previous_hash):
+                    continue
+
+                # Recompensa por mineração, sempre incluída no bloco
+                node_address = str(uuid.uuid4()).replace('-', '')
+                reward = {
+                    'sender': 'reward',
+                    'receiver': node_address,
+                    'amount': 1
+                }
+                block = self.blockchain.create_block(result.proof, previous_hash, [reward])
+
+            with self._condition:
+                job.block = block
+                self._finish(job, 'found')
+                return
+
+    def _finish(self, job, status):
+        """Marca o pedido como encerrado e publica o evento. Requer self._condition."""
+        job.status = status
+        job.finished_at = _now()
+        self._event_seq += 1
+        event = {
+            'seq': self._event_seq,
+            'type': 'block_found' if status == 'found' else f'job_{status}',
+            'job_id': job.id,
+            'block_index': job.block['index'] if job.block else None,
+            'timestamp': job.finished_at
+        }
+        self._events.append(event)
+        self._condition.notify_all()
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"AVISO: Falha ao notificar evento de mineração: {e}")
+
+    def _trim_jobs(self):
+        """Descarta os pedidos encerrados mais antigos. Requer self._condition."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
@@ -0,0 +1,147 @@
+# cryptocurrency/search_index.py
+
+from collections import defaultdict
+
+
+class SearchIndex:
+    """
+    Índice invertido das transações da cadeia, usado pela rota /search.
+
+    Mapeia cada valor normalizado (str(valor).lower(), a mesma regra de
+    `search_recursively`) para as posições (block_index, tx_position) das
+    transações que o contêm, em qualquer nível de profundidade. Também
+    mantém um índice por campo, com o caminho das chaves separado por
+    pontos (ex: 'converter.code'), para buscas restritas a um campo.
+
+    Apenas valores simples (texto, números, booleanos) são indexados.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(list)
+        self._field_postings = defaultdict(list)
+        self.fields = set()
+
+    @staticmethod
+    def normalize(value):
+        """Normaliza um valor da mesma forma que a busca recursiva."""
+        return str(value).lower()
+
+    def add_block(self, block):
+        """
+        Indexa as transações de um bloco recém-anexado à cadeia.
+
+        Args:
+            block (dict): O bloco a ser indexado.
+        """
+        for position, transaction in enumerate(block['transactions']):
+            location = (block['index'], position)
+            values = set()
+            field_values = set()
+            for field, value in self._walk(transaction, ''):
+                term = self.normalize(value)
+                values.add(term)
+                field_values.add((field, term))
+            for term in values:
+                self._postings[term].append(location)
+            for key in field_values:
+                self._field_postings[key].append(location)
+                self.fields.add(key[0])
+
+    def rebuild(self, chain):
+        """
+        Reconstrói o índice do zero (usado quando a cadeia é substituída).
+
+        Args:
+            chain (list): A cadeia completa.
+        """
+        self._postings = defaultdict(list)
+        self._field_postings = defaultdict(list)
+        self.fields = set()
+        for block in chain:
+            self.add_block(block)
+
+    def prune(self, first_index):
+        """
+        Remove as posições dos blocos anteriores a `first_index` (blocos
+        podados da cadeia). As posições de cada termo estão em ordem de
+        bloco, então basta cortar o início de cada lista.
+
+        Args:
+            first_index (int): Índice do primeiro bloco mantido.
+        """
+        for postings in (self._postings, self._field_postings):
+            for key in list(postings):
+                locations = postings[key]
+                start = self._first_location(locations, first_index)
+                if start == len(locations):
+                    del postings[key]
+                elif start:
+                    postings[key] = locations[start:]
+        self.fields = {field for field, _ in self._field_postings}
+
+    def export_state(self):
+        """
+        Retorna o índice em um formato serializável em JSON, para o retrato
+        do estado da cadeia (ver Blockchain.save_snapshot).
+
+        Returns:
+            dict: Os postings gerais e por campo.
+        """
+        return {
+            'postings': self._postings,
+            'field_postings': [[field, term, locations]
+                               for (field, term), locations in self._field_postings.items()]
+        }
+
+    def load_state(self, state):
+        """
+        Restaura o índice a partir de `export_state`, sem percorrer a cadeia.
+
+        Args:
+            state (dict): O estado exportado.
+        """
+        self._postings = defaultdict(list, state['postings'])
+        self._field_postings = defaultdict(list)
+        self.fields = set()
+        for field, term, locations in state['field_postings']:
+            self._field_postings[(field, term)] = locations
+            self.fields.add(field)
+
+    def search(self, term, field=None):
+        """
+        Retorna as posições das transações que contêm o termo.
+
+        Args:
+            term (str): O valor procurado (comparação sem diferenciar maiúsculas).
+            field (str, opcional): Restringe a busca a um campo. Ex: 'converter.code'
+
+        Returns:
+            list: Pares (block_index, tx_position), na ordem da cadeia.
+        """
+        term = self.normalize(term)
+        if field is None:
+            return self._postings.get(term, [])
+        return self._field_postings.get((field, term), [])
+
+    @staticmethod
+    def _first_location(locations, first_index):
+        # Busca binária pelo bloco (as posições restauradas de um retrato são listas, não tuplas)
+        low, high = 0, len(locations)
+        while low < high:
+            middle = (low + high) // 2
+            if locations[middle][0] < first_index:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _walk(self, data, path):
+        """Percorre dicts e listas, gerando (caminho do campo, valor simples)."""
+        if isinstance(data, dict):
+            for key, value in data.items():
+                yield from self._walk(value, f'{path}.{key}' if path else str(key))
+        elif isinstance(data, list):
+            for item in data:
+                yield from self._walk(item, path)
+        elif path:
+            yield path, data
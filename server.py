@@ -0,0 +1,216 @@
+# cryptocurrency/server.py
+
+"""
+Modo de produção do nó: servidor WSGI (waitress) sem o modo debug e, com
+mais de um processo, um único processo escritor acompanhado de réplicas.
+
+O processo escritor é o nó completo (cadeia, mempool, mineração,
+sincronização) e o único que grava no diretório de dados. As réplicas
+atendem no mesmo socket as rotas que só leem a cadeia (ver views.py),
+lendo os mesmos arquivos de blocos (Blockchain com read_only=True), e
+repassam todas as outras ao escritor por um endereço interno.
+"""
+
+import io
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+import requests
+from flask import Response, jsonify
+
+# Cabeçalhos que valem só para uma conexão e não são repassados (RFC 7230, seção 6.1)
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+                      'te', 'trailer', 'transfer-encoding', 'upgrade'}
+
+
+def load_waitress():
+    """
+    Importa o waitress, que só é necessário no modo de produção.
+
+    Returns:
+        module: O módulo waitress.
+
+    Raises:
+        SystemExit: Se o pacote não estiver instalado.
+    """
+    try:
+        import waitress
+    except ImportError:
+        raise SystemExit("ERRO: O modo de produção requer o pacote waitress (pip install waitress).")
+    return waitress
+
+
+def listen_socket(host, port, backlog=1024):
+    """
+    Cria um socket TCP já escutando, que pode ser herdado pelas réplicas.
+
+    Args:
+        host (str): Endereço. Ex: '0.0.0.0'
+        port (int): Porta (0 = escolhida pelo sistema).
+        backlog (int): Tamanho da fila de conexões pendentes.
+
+    Returns:
+        socket.socket: O socket.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def stop_on_sigterm(signum, frame):
+    """
+    Tratador de SIGTERM: pede a parada do waitress (que trata SystemExit
+    como pedido de parada). Os próximos SIGTERM passam a ser ignorados,
+    para que um sinal repetido (ex: o gerenciador de processos insistindo)
+    não interrompa o atexit no meio da gravação da cadeia.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    sys.exit(0)
+
+
+def serve(app, sockets, threads):
+    """
+    Atende as requisições com o waitress até o processo receber SIGINT ou
+    SIGTERM. Ao retornar, o chamador faz o encerramento (as rotinas do
+    atexit gravam a cadeia e o retrato do estado).
+
+    Args:
+        app (Flask): A aplicação.
+        sockets (list): Sockets já escutando (ver listen_socket).
+        threads (int): Threads que atendem as requisições.
+    """
+    waitress = load_waitress()
+    # Sem o tratador, SIGTERM encerraria o processo sem executar o atexit
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+    waitress.serve(app, sockets=sockets, threads=threads, ident='cryptocurrency')
+
+
+class WriterProxy:
+    """
+    Repassa uma requisição recebida por uma réplica ao processo escritor e
+    devolve a resposta dele, sem carregar corpos grandes na memória.
+    """
+
+    def __init__(self, writer_url, timeout=(3.05, None), chunk_size=256 * 1024):
+        self.writer_url = writer_url.rstrip('/')
+        # Sem limite de leitura: rotas como /consensus (que consulta os outros
+        # nós) e /transactions/bulk (corpos grandes) podem demorar a responder
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+
+    def forward(self, request):
+        """
+        Args:
+            request (flask.Request): A requisição recebida.
+
+        Returns:
+            flask.Response: A resposta do escritor (502 se ele não responder).
+        """
+        headers = {name: value for name, value in request.headers.items()
+                   if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != 'content-length'}
+        headers['X-Forwarded-For'] = request.remote_addr or ''
+        body = None
+        if request.content_length or request.headers.get('Transfer-Encoding'):
+            body = self._read_chunks(io.BufferedReader(request.stream, self.chunk_size))
+        try:
+            upstream = self.session.request(
+                request.method, self.writer_url + request.full_path.rstrip('?'), headers=headers,
+                data=body, stream=True, allow_redirects=False, timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"ERRO: Falha ao repassar {request.method} {request.path} ao processo escritor: {e}")
+            return jsonify({'error': 'O processo escritor não respondeu.'}), 502
+
+        response_headers = [(name, value) for name, value in upstream.raw.headers.items()
+                            if name.lower() not in HOP_BY_HOP_HEADERS]
+        response = Response(upstream.raw.stream(self.chunk_size, decode_content=False),
+                            status=upstream.status_code, headers=response_headers)
+        response.call_on_close(upstream.close)
+        return response
+
+    def _read_chunks(self, stream):
+        while True:
+            chunk = stream.read1(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class ReplicaPool:
+    """
+    Processos réplica (`main.py --replica-of ...`) que atendem no mesmo
+    socket do processo escritor; o sistema distribui as conexões entre eles.
+    Cada réplica também escuta em um endereço interno próprio, pelo qual o
+    escritor coleta as métricas dela (ver collect_metrics).
+    """
+
+    def __init__(self, count, arguments, timeout=2.0):
+        self.count = count
+        # Argumentos de linha de comando repassados a cada réplica
+        self.arguments = list(arguments)
+        self.timeout = timeout
+        self.processes = []
+        # Endereço interno de cada réplica
+        self.replica_urls = []
+
+    def start(self, public_socket, writer_url):
+        """
+        Inicia as réplicas.
+
+        Args:
+            public_socket (socket.socket): O socket público, herdado pelas réplicas.
+            writer_url (str): Endereço interno do processo escritor.
+        """
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+        command = [sys.executable, main_path, *self.arguments,
+                   '--replica-of', writer_url, '--listen-fd', str(public_socket.fileno())]
+        for _ in range(self.count):
+            # O socket interno fica só com a réplica; o escritor guarda o endereço
+            with listen_socket('127.0.0.1', 0) as internal_socket:
+                self.processes.append(subprocess.Popen(
+                    command + ['--listen-fd', str(internal_socket.fileno())],
+                    pass_fds=(public_socket.fileno(), internal_socket.fileno())
+                ))
+                self.replica_urls.append(f'http://127.0.0.1:{internal_socket.getsockname()[1]}')
+        print(f"SERVIDOR: {self.count} réplica(s) iniciada(s), repassando escritas a {writer_url}.")
+
+    def collect_metrics(self):
+        """
+        Coleta os contadores e histogramas de cada réplica (/metrics/export),
+        para que /metrics no escritor inclua as leituras atendidas por elas.
+
+        Returns:
+            list: Os valores exportados (ver metrics.MetricsRegistry.export)
+            das réplicas que responderam.
+        """
+        exports = []
+        for url in self.replica_urls:
+            try:
+                response = requests.get(url + '/metrics/export', timeout=self.timeout)
+                response.raise_for_status()
+                exports.append(response.json())
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"AVISO: Não foi possível coletar as métricas da réplica {url}: {e}")
+        return exports
+
+    def stop(self, timeout=10.0):
+        """Pede que as réplicas encerrem (SIGTERM) e espera por elas."""
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                print(f"AVISO: A réplica {process.pid} não encerrou a tempo. Forçando.")
+                process.kill()
+                process.wait()
+        self.processes = []
+        self.replica_urls = []
@@ -0,0 +1,822 @@
+# cryptocurrency/storage.py
+
+import datetime
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+
+class BlockLog:
+    """
+    Log de blocos append-only em disco, no formato JSON-lines (um bloco por linha).
+
+    Cada bloco minerado é apenas anexado ao final do arquivo, então o custo de
+    gravação não cresce com o tamanho da cadeia. As chamadas a fsync são feitas
+    em lote (a cada `sync_every` blocos ou `sync_interval` segundos), e uma
+    linha final incompleta, deixada por uma queda no meio da escrita, é
+    descartada na próxima leitura.
+    """
+
+    def __init__(self, path='blockchain_data.jsonl', legacy_path='blockchain_data.json',
+                 sync_every=16, sync_interval=1.0):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def load(self):
+        """
+        Reproduz o log e retorna a cadeia armazenada.
+
+        Na primeira execução após a troca de formato, migra o antigo arquivo
+        JSON (`legacy_path`) para o log e o renomeia para `*.migrated`.
+
+        Returns:
+            list: Os blocos lidos do disco (lista vazia se não houver nenhum).
+        """
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+
+        chain = []
+        valid_size = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    # Linha sem '\n' final: escrita interrompida (cauda rasgada)
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        block = json.loads(line)
+                    except ValueError:
+                        break
+                    chain.append(block)
+                    valid_size += len(line)
+        except FileNotFoundError:
+            return chain
+
+        if os.path.getsize(self.path) > valid_size:
+            print(f"AVISO: Descartando registro incompleto no final de {self.path}.")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+                f.flush()
+                os.fsync(f.fileno())
+
+        return chain
+
+    def append(self, block):
+        """
+        Anexa um bloco ao final do log.
+
+        Args:
+            block (dict): O bloco a ser gravado.
+        """
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(self._encode(block))
+        self._file.flush()
+        self._pending += 1
+        if (self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+
+    def rewrite(self, chain):
+        """
+        Substitui todo o conteúdo do log de forma atômica (arquivo temporário
+        seguido de os.replace). Usado apenas quando a cadeia é trocada.
+
+        Args:
+            chain (list): A nova cadeia completa.
+        """
+        self.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for block in chain:
+                f.write(self._encode(block))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def sync(self):
+        """Força a gravação física (fsync) dos blocos pendentes."""
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sincroniza e fecha o arquivo de log, se estiver aberto."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def _migrate_legacy(self):
+        """Converte o antigo arquivo JSON completo para o log append-only."""
+        try:
+            with open(self.legacy_path, 'r') as f:
+                chain = json.load(f)
+        except json.JSONDecodeError:
+            chain = []
+        print(f"Migrando {self.legacy_path} para o log de blocos {self.path}...")
+        self.rewrite(chain or [])
+        os.replace(self.legacy_path, self.legacy_path + '.migrated')
+
+    @staticmethod
+    def _encode(block):
+        return json.dumps(block, separators=(',', ':')).encode() + b'\n'
+
+
+# Cabeçalho de tamanho fixo de cada registro em blocks.dat:
+# flags, index, proof, timestamp (microssegundos UTC), previous_hash (32 bytes)
+# e o tamanho do corpo (JSON compacto com as transações e demais campos).
+RECORD_HEADER = struct.Struct('<BIQq32sI')
+# Cabeçalho de blocks.idx: assinatura, versão e índice do primeiro bloco do arquivo
+INDEX_HEADER = struct.Struct('<4sIQ')
+INDEX_ENTRY = struct.Struct('<Q')
+INDEX_MAGIC = b'BIDX'
+INDEX_VERSION = 1
+# Cada entrada de blocks.hash é o digest SHA-256 (32 bytes) do bloco na mesma posição
+DIGEST_SIZE = 32
+
+# Bits de `flags`: indicam quais campos do bloco estão no cabeçalho binário.
+# Campos que não couberem (ex: o previous_hash '0' do Bloco Gênesis) vão para o corpo.
+HAS_INDEX = 1
+HAS_TIMESTAMP = 2
+HAS_PROOF = 4
+HAS_PREVIOUS_HASH = 8
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def encode_block(block):
+    """
+    Converte um bloco para o formato binário de blocks.dat.
+
+    Os campos fixos vão para o cabeçalho apenas quando a conversão é exata
+    (o bloco decodificado precisa ser idêntico ao original, para que o hash
+    canônico não mude); os demais vão para o corpo JSON.
+
+    Args:
+        block (dict): O bloco.
+
+    Returns:
+        bytes: O registro (cabeçalho + corpo).
+    """
+    body = dict(block)
+    flags = 0
+    index = proof = timestamp_us = 0
+    previous_hash = bytes(32)
+
+    value = block.get('index')
+    if type(value) is int and 0 <= value < 2**32:
+        flags |= HAS_INDEX
+        index = body.pop('index')
+
+    value = block.get('proof')
+    if type(value) is int and 0 <= value < 2**64:
+        flags |= HAS_PROOF
+        proof = body.pop('proof')
+
+    value = block.get('timestamp')
+    if isinstance(value, str):
+        try:
+            moment = datetime.datetime.fromisoformat(value)
+            delta = moment - EPOCH
+            micros = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+            if _format_timestamp(micros) == value:
+                flags |= HAS_TIMESTAMP
+                timestamp_us = micros
+                del body['timestamp']
+        except (ValueError, TypeError, OverflowError):
+            pass
+
+    value = block.get('previous_hash')
+    if isinstance(value, str) and len(value) == 64:
+        try:
+            raw = bytes.fromhex(value)
+            if raw.hex() == value:
+                flags |= HAS_PREVIOUS_HASH
+                previous_hash = raw
+                del body['previous_hash']
+        except ValueError:
+            pass
+
+    encoded_body = json.dumps(body, separators=(',', ':'), ensure_ascii=False).encode()
+    header = RECORD_HEADER.pack(flags, index, proof, timestamp_us, previous_hash, len(encoded_body))
+    return header + encoded_body
+
+
+def decode_block(buffer, offset):
+    """
+    Lê um registro de blocks.dat a partir de `offset`.
+
+    Returns:
+        dict: O bloco, idêntico ao que foi gravado.
+    """
+    flags, index, proof, timestamp_us, previous_hash, body_length = RECORD_HEADER.unpack_from(buffer, offset)
+    start = offset + RECORD_HEADER.size
+    body = json.loads(bytes(buffer[start:start + body_length]))
+
+    block = {}
+    if flags & HAS_INDEX:
+        block['index'] = index
+    if flags & HAS_TIMESTAMP:
+        block['timestamp'] = _format_timestamp(timestamp_us)
+    if flags & HAS_PROOF:
+        block['proof'] = proof
+    if flags & HAS_PREVIOUS_HASH:
+        block['previous_hash'] = previous_hash.hex()
+    block.update(body)
+    return block
+
+
+def _format_timestamp(micros):
+    return (EPOCH + datetime.timedelta(microseconds=micros)).isoformat()
+
+
+class BlockStore:
+    """
+    Armazenamento binário dos blocos, com um arquivo de índice.
+
+    `blocks.dat` guarda os registros (cabeçalho de tamanho fixo + corpo JSON
+    compacto) em sequência, e `blocks.idx` guarda a posição (offset) de cada
+    registro. Os dois arquivos são lidos via mmap, então qualquer bloco pode
+    ser lido sob demanda sem carregar a cadeia inteira na memória.
+
+    `blocks.hash` guarda o hash de cada bloco, calculado uma única vez por
+    `hasher(bloco)` ao gravá-lo, para que o hash não precise ser recalculado
+    (serializando o bloco de novo) a cada consulta. Se o arquivo estiver
+    incompleto, os hashes que faltam são calculados ao abrir.
+
+    Como no BlockLog, os blocos novos são apenas anexados, com fsync em lote.
+    Ao abrir, registros incompletos no final (queda no meio da escrita) são
+    descartados e o índice é reconstruído se não bater com os dados.
+
+    Com `read_only`, os arquivos gravados por outro processo (o escritor)
+    são apenas lidos: nada é reparado ao abrir, só aparecem os blocos já
+    gravados por completo (registro, índice e hash) e `refresh()` acompanha
+    os blocos novos e as substituições da cadeia.
+    """
+
+    def __init__(self, directory='.', legacy_log=None, hasher=None, sync_every=16, sync_interval=1.0,
+                 read_only=False):
+        self.data_path = os.path.join(directory, 'blocks.dat')
+        self.index_path = os.path.join(directory, 'blocks.idx')
+        self.digest_path = os.path.join(directory, 'blocks.hash')
+        # Função que calcula o hash (hexadecimal) de um bloco; ver Blockchain.hash
+        self.hasher = hasher
+        self.read_only = read_only
+        # Log JSON-lines (BlockLog) do formato anterior, migrado na primeira abertura
+        self.legacy_log = legacy_log
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.base_index = 1
+        self._count = 0
+        self._data_file = None
+        self._index_file = None
+        self._digest_file = None
+        self._data_map = None
+        self._index_map = None
+        self._digest_map = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._map_lock = threading.Lock()
+
+    def open(self):
+        """
+        Abre (ou cria) os arquivos, recuperando uma cauda incompleta.
+        """
+        self.close()
+        if self.read_only:
+            self._open_read_only()
+            return
+        if not os.path.exists(self.data_path):
+            self._write_files(self._load_legacy(), self.base_index)
+
+        data_size = os.path.getsize(self.data_path)
+        count, base_index = self._read_index_header()
+        if count is None or not self._index_matches(count, data_size):
+            print(f"AVISO: Reconstruindo o índice de blocos {self.index_path}.")
+            count = self._rebuild_index(base_index)
+
+        self._count = count
+        end = self._record_end(count - 1) if count else 0
+        if data_size > end:
+            print(f"AVISO: Descartando registro incompleto no final de {self.data_path}.")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self._data_file = open(self.data_path, 'ab')
+        self._index_file = open(self.index_path, 'ab')
+        self._remap()
+        self._open_digests()
+
+    def refresh(self):
+        """
+        Acompanha as gravações do processo escritor (apenas com `read_only`).
+
+        Returns:
+            str: 'replaced' se os arquivos foram substituídos (e reabertos),
+            'grown' se há blocos novos no final, ou None se nada mudou.
+        """
+        if self._replaced():
+            self.open()
+            return 'replaced'
+        count = self._visible_count()
+        if count > self._count:
+            self._count = count
+            return 'grown'
+        return None
+
+    def changed(self):
+        """True se `refresh()` encontraria blocos novos ou arquivos substituídos."""
+        return self._replaced() or self._visible_count() > self._count
+
+    def __len__(self):
+        return self._count
+
+    def read(self, position):
+        """
+        Lê o bloco da posição `position` (0 é o primeiro bloco do arquivo).
+
+        Args:
+            position (int): A posição do bloco.
+
+        Returns:
+            dict: O bloco decodificado.
+        """
+        if not 0 <= position < self._count:
+            raise IndexError('Posição de bloco fora do armazenamento')
+        offset = self._offset(position)
+        data_map = self._data_map
+        if data_map is None or offset + RECORD_HEADER.size > len(data_map):
+            data_map = self._remap()
+        _, _, _, _, _, body_length = RECORD_HEADER.unpack_from(data_map, offset)
+        if offset + RECORD_HEADER.size + body_length > len(data_map):
+            data_map = self._remap()
+        return decode_block(data_map, offset)
+
+    def digest(self, position):
+        """
+        Retorna o hash gravado do bloco da posição `position`.
+
+        Args:
+            position (int): A posição do bloco.
+
+        Returns:
+            str: O hash em formato hexadecimal.
+        """
+        if not 0 <= position < self._count:
+            raise IndexError('Posição de bloco fora do armazenamento')
+        start = position * DIGEST_SIZE
+        digest_map = self._digest_map
+        if digest_map is None or start + DIGEST_SIZE > len(digest_map):
+            self._remap()
+            digest_map = self._digest_map
+        return digest_map[start:start + DIGEST_SIZE].hex()
+
+    def append(self, block, digest=None):
+        """
+        Anexa um bloco ao final do armazenamento.
+
+        Args:
+            block (dict): O bloco a ser gravado.
+            digest (str, opcional): O hash do bloco, se já tiver sido
+                calculado; senão é calculado por `hasher`.
+        """
+        started = time.perf_counter()
+        digest = bytes.fromhex(digest or self.hasher(block))
+        record = encode_block(block)
+        offset = self._data_file.tell()
+        self._data_file.write(record)
+        self._data_file.flush()
+        self._index_file.write(INDEX_ENTRY.pack(offset))
+        self._index_file.flush()
+        self._digest_file.write(digest)
+        self._digest_file.flush()
+        self._count += 1
+        self._pending += 1
+        if (self._pending >= self.sync_every
+                or time.monotonic() - self._last_sync >= self.sync_interval):
+            self.sync()
+        metrics.storage_write_duration.labels('append').observe(time.perf_counter() - started)
+
+    def rewrite(self, blocks, base_index=1, digests=None):
+        """
+        Substitui todo o conteúdo (arquivos temporários seguidos de os.replace).
+        Usado apenas quando a cadeia é trocada ou podada.
+
+        Args:
+            blocks (iterable): Os blocos, em ordem.
+            base_index (int): O índice do primeiro bloco.
+            digests (list, opcional): Os hashes dos blocos, se já conhecidos.
+        """
+        with metrics.storage_write_duration.labels('rewrite').time():
+            self.close()
+            self._write_files(blocks, base_index, digests)
+            self.open()
+
+    def prune(self, count):
+        """
+        Descarta os `count` primeiros blocos, regravando os demais com o
+        índice base avançado.
+
+        Args:
+            count (int): Quantos blocos descartar.
+        """
+        count = min(count, self._count)
+        if count <= 0:
+            return
+        blocks = [self.read(position) for position in range(count, self._count)]
+        digests = [self.digest(position) for position in range(count, self._count)]
+        with metrics.storage_write_duration.labels('prune').time():
+            self.close()
+            self._write_files(blocks, self.base_index + count, digests)
+            self.open()
+
+    def sync(self):
+        """Força a gravação física (fsync) dos registros pendentes."""
+        if self._data_file is not None and self._pending:
+            with metrics.storage_write_duration.labels('sync').time():
+                os.fsync(self._data_file.fileno())
+                os.fsync(self._index_file.fileno())
+                os.fsync(self._digest_file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sincroniza e fecha os arquivos, se estiverem abertos."""
+        if self._data_file is not None:
+            self.sync()
+            for f in (self._data_file, self._index_file, self._digest_file):
+                if f is not None:
+                    f.close()
+            self._data_file = None
+            self._index_file = None
+            self._digest_file = None
+        self._data_map = None
+        self._index_map = None
+        self._digest_map = None
+
+    def _load_legacy(self):
+        """Lê os blocos do formato anterior (se houver) e renomeia o log para `*.migrated`."""
+        log = self.legacy_log
+        if log is None or not (os.path.exists(log.path)
+                               or (log.legacy_path and os.path.exists(log.legacy_path))):
+            return []
+        chain = log.load()
+        print(f"Migrando {log.path} para o armazenamento binário {self.data_path}...")
+        self._write_files(chain, self.base_index)
+        log.close()
+        os.replace(log.path, log.path + '.migrated')
+        return chain
+
+    def _write_files(self, blocks, base_index, digests=None):
+        data_tmp = self.data_path + '.tmp'
+        index_tmp = self.index_path + '.tmp'
+        digest_tmp = self.digest_path + '.tmp'
+        with open(data_tmp, 'wb') as data_file, open(index_tmp, 'wb') as index_file, \
+                open(digest_tmp, 'wb') as digest_file:
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, base_index))
+            for position, block in enumerate(blocks):
+                index_file.write(INDEX_ENTRY.pack(data_file.tell()))
+                data_file.write(encode_block(block))
+                digest = digests[position] if digests is not None else self.hasher(block)
+                digest_file.write(bytes.fromhex(digest))
+            for f in (data_file, index_file, digest_file):
+                f.flush()
+                os.fsync(f.fileno())
+        # Os dados são trocados antes do índice; se a troca for interrompida
+        # entre os dois, o índice antigo não bate e é reconstruído ao abrir.
+        # Os hashes antigos são apagados antes, pois não há como conferi-los
+        # sem recalcular: se faltarem, são recalculados ao abrir.
+        if os.path.exists(self.digest_path):
+            os.remove(self.digest_path)
+        os.replace(data_tmp, self.data_path)
+        os.replace(index_tmp, self.index_path)
+        os.replace(digest_tmp, self.digest_path)
+        self.base_index = base_index
+
+    def _open_read_only(self):
+        self._data_file = open(self.data_path, 'rb')
+        self._index_file = open(self.index_path, 'rb')
+        try:
+            self._digest_file = open(self.digest_path, 'rb')
+        except FileNotFoundError:
+            # A cadeia está sendo regravada; os blocos aparecem no próximo refresh
+            self._digest_file = None
+        entries, self.base_index = self._read_index_header()
+        self._count = 0
+        if entries is not None:
+            self._count = self._visible_count()
+        self._remap()
+
+    def _visible_count(self):
+        """Quantidade de blocos com registro, índice e hash já gravados (modo `read_only`)."""
+        if self._digest_file is None:
+            return 0
+        entries = (os.fstat(self._index_file.fileno()).st_size - INDEX_HEADER.size) // INDEX_ENTRY.size
+        count = min(entries, os.fstat(self._digest_file.fileno()).st_size // DIGEST_SIZE)
+        if count > self._count and not self._index_matches(count, os.fstat(self._data_file.fileno()).st_size):
+            return self._count
+        return count
+
+    def _replaced(self):
+        """True se algum dos arquivos abertos foi trocado por outro (ver _write_files)."""
+        for path, f in ((self.data_path, self._data_file), (self.index_path, self._index_file),
+                        (self.digest_path, self._digest_file)):
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != (os.fstat(f.fileno()).st_ino if f is not None else None):
+                return True
+        return False
+
+    def _open_digests(self):
+        """
+        Abre blocks.hash, descartando hashes de registros que não existem mais
+        e calculando os que faltam (ex: queda entre a gravação do bloco e a
+        do hash, ou arquivos de uma versão anterior).
+        """
+        size = os.path.getsize(self.digest_path) if os.path.exists(self.digest_path) else 0
+        stored = min(size // DIGEST_SIZE, self._count)
+        if size != stored * DIGEST_SIZE:
+            with open(self.digest_path, 'r+b') as f:
+                f.truncate(stored * DIGEST_SIZE)
+        self._digest_file = open(self.digest_path, 'ab')
+        if stored < self._count:
+            print(f"Calculando {self._count - stored} hash(es) de bloco ausente(s) em {self.digest_path}...")
+            for position in range(stored, self._count):
+                self._digest_file.write(bytes.fromhex(self.hasher(self.read(position))))
+            self._digest_file.flush()
+            os.fsync(self._digest_file.fileno())
+        self._remap()
+
+    def _read_index_header(self):
+        """Retorna (quantidade de entradas, base_index), ou (None, base) se inválido."""
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+        except FileNotFoundError:
+            return None, self.base_index
+        if len(header) < INDEX_HEADER.size:
+            return None, self.base_index
+        magic, version, base_index = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            return None, self.base_index
+        self.base_index = base_index
+        entries = (os.path.getsize(self.index_path) - INDEX_HEADER.size) // INDEX_ENTRY.size
+        return entries, base_index
+
+    def _index_matches(self, count, data_size):
+        """Confere se a última entrada do índice aponta para um registro completo."""
+        if count == 0:
+            return data_size == 0
+        with open(self.index_path, 'rb') as f:
+            f.seek(INDEX_HEADER.size + (count - 1) * INDEX_ENTRY.size)
+            (offset,) = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+        with open(self.data_path, 'rb') as f:
+            f.seek(offset)
+            header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return False
+        flags, index, _, _, _, body_length = RECORD_HEADER.unpack(header)
+        if flags & HAS_INDEX and index != self.base_index + count - 1:
+            return False
+        return offset + RECORD_HEADER.size + body_length <= data_size
+
+    def _rebuild_index(self, base_index):
+        """Reconstrói blocks.idx percorrendo blocks.dat. Retorna a quantidade de registros."""
+        offsets = []
+        data_size = os.path.getsize(self.data_path)
+        with open(self.data_path, 'rb') as f:
+            offset = 0
+            while offset + RECORD_HEADER.size <= data_size:
+                f.seek(offset)
+                body_length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))[-1]
+                end = offset + RECORD_HEADER.size + body_length
+                if end > data_size:
+                    break
+                offsets.append(offset)
+                offset = end
+        index_tmp = self.index_path + '.tmp'
+        with open(index_tmp, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, base_index))
+            for offset in offsets:
+                f.write(INDEX_ENTRY.pack(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(index_tmp, self.index_path)
+        self.base_index = base_index
+        return len(offsets)
+
+    def _offset(self, position):
+        entry = INDEX_HEADER.size + position * INDEX_ENTRY.size
+        index_map = self._index_map
+        if index_map is None or entry + INDEX_ENTRY.size > len(index_map):
+            self._remap()
+            index_map = self._index_map
+        return INDEX_ENTRY.unpack_from(index_map, entry)[0]
+
+    def _record_end(self, position):
+        with open(self.data_path, 'rb') as f:
+            offset = self._offset_from_file(position)
+            f.seek(offset)
+            body_length = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))[-1]
+        return offset + RECORD_HEADER.size + body_length
+
+    def _offset_from_file(self, position):
+        with open(self.index_path, 'rb') as f:
+            f.seek(INDEX_HEADER.size + position * INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+
+    def _remap(self):
+        """(Re)mapeia os arquivos na memória após terem crescido."""
+        with self._map_lock:
+            for f in (self._data_file, self._index_file, self._digest_file):
+                if f is not None:
+                    f.flush()
+            if self.read_only:
+                # Mapeia os arquivos abertos, e não os caminhos, que podem já
+                # apontar para arquivos novos gravados pelo escritor
+                self._data_map = _map_handle(self._data_file)
+                self._index_map = _map_handle(self._index_file)
+                self._digest_map = _map_handle(self._digest_file) if self._digest_file is not None else None
+                return self._data_map
+            self._data_map = _map_file(self.data_path)
+            self._index_map = _map_file(self.index_path)
+            self._digest_map = _map_file(self.digest_path) if self._digest_file is not None else None
+            return self._data_map
+
+
+def _map_file(path):
+    with open(path, 'rb') as f:
+        return _map_handle(f)
+
+
+def _map_handle(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PrunedBlockError(IndexError):
+    """O bloco pedido foi podado (descartado) do armazenamento."""
+
+
+class ChainView:
+    """
+    Sequência (como uma lista) que representa a cadeia sobre um BlockStore.
+
+    Os blocos são lidos do disco sob demanda e os mais recentes ficam em um
+    cache LRU de `cache_size` blocos. Atribuir `chain[i] = bloco` altera o
+    bloco apenas na memória (usado por edit_block_test); o disco não muda,
+    e o hash gravado deixa de valer para essa posição (ver digest).
+
+    As posições são as da cadeia completa (a posição é o índice do bloco
+    menos 1), mesmo depois de uma poda: `len()` é a altura da cadeia, ler
+    uma posição anterior a `first` gera PrunedBlockError e as fatias e a
+    iteração começam em `first`.
+    """
+
+    def __init__(self, store, cache_size=1024):
+        self.store = store
+        self.cache_size = cache_size
+        # Posição do primeiro bloco guardado (0 se a cadeia nunca foi podada)
+        self.first = store.base_index - 1
+        self._cache = OrderedDict()
+        self._overrides = {}
+        self._override_digests = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.first + len(self.store)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self))) if i >= self.first]
+        position = self._check_position(position)
+        if position in self._overrides:
+            return self._overrides[position]
+        with self._lock:
+            block = self._cache.get(position)
+            if block is not None:
+                self._cache.move_to_end(position)
+                return block
+        block = self.store.read(position - self.first)
+        with self._lock:
+            self._cache[position] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return block
+
+    def __setitem__(self, position, block):
+        position = self._check_position(position)
+        self._overrides[position] = block
+        self._override_digests.pop(position, None)
+
+    def __iter__(self):
+        for position in range(self.first, len(self)):
+            yield self[position]
+
+    @property
+    def edited(self):
+        """True se algum bloco foi alterado apenas na memória."""
+        return bool(self._overrides)
+
+    def digest(self, position):
+        """
+        Retorna o hash do bloco da posição `position`: o gravado junto ao
+        bloco ou, se o bloco foi alterado na memória, o do bloco alterado.
+
+        Args:
+            position (int): A posição do bloco.
+
+        Returns:
+            str: O hash em formato hexadecimal.
+        """
+        position = self._check_position(position)
+        if position in self._overrides:
+            digest = self._override_digests.get(position)
+            if digest is None:
+                digest = self._override_digests[position] = self.store.hasher(self._overrides[position])
+            return digest
+        return self.store.digest(position - self.first)
+
+    def append(self, block, digest=None):
+        """Grava o bloco (e o seu hash, se informado) no armazenamento e o mantém no cache."""
+        self.store.append(block, digest)
+        with self._lock:
+            self._cache[len(self) - 1] = block
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _check_position(self, position):
+        length = len(self)
+        if position < 0:
+            position += length
+        if not 0 <= position < length:
+            raise IndexError('Índice de bloco fora da cadeia')
+        if position < self.first:
+            raise PrunedBlockError(f'O bloco de índice {position + 1} foi podado '
+                                   f'(o primeiro guardado é o {self.first + 1})')
+        return position
+
+
+class StateSnapshot:
+    """
+    Retrato (em JSON) do estado derivado da cadeia: altura, hash do topo,
+    trabalho acumulado, índice de busca e ids gravados.
+
+    Permite iniciar o nó sem percorrer todos os blocos. O retrato só é usado
+    se o hash do bloco na altura registrada conferir com o armazenamento.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path='chain_state.json'):
+        self.path = path
+
+    def load(self):
+        """
+        Returns:
+            dict: O estado salvo, ou None se não existir ou for ilegível.
+        """
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            print(f"AVISO: Retrato de estado {self.path} ilegível. Ignorando.")
+            return None
+        if state.get('version') != self.VERSION:
+            return None
+        return state
+
+    def save(self, state):
+        """
+        Grava o estado de forma atômica (arquivo temporário seguido de os.replace).
+
+        Args:
+            state (dict): O estado a ser gravado.
+        """
+        tmp_path = self.path + '.tmp'
+        with metrics.storage_write_duration.labels('snapshot').time():
+            with open(tmp_path, 'w') as f:
+                json.dump(dict(state, version=self.VERSION), f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,100 @@
+# cryptocurrency/sync.py
+
+import threading
+import time
+
+
+class ChainSynchronizer:
+    """
+    Executa o algoritmo de consenso em uma thread de fundo, em vez de dentro
+    das rotas.
+
+    A sincronização acontece a cada `interval` segundos ou imediatamente
+    quando `trigger()` é chamado (ex: ao conectar um novo nó). Se a última
+    sincronização bem-sucedida for mais antiga que `max_staleness`, a
+    cadeia é considerada desatualizada e uma nova rodada é disparada.
+    """
+
+    def __init__(self, blockchain, interval=30.0, max_staleness=60.0):
+        self.blockchain = blockchain
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self.last_sync = None
+        self.last_duration = None
+        self.last_replaced = False
+        self.last_error = None
+        self.rounds = 0
+        self._wake = threading.Event()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread de sincronização, se ainda não estiver rodando."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='chain-sync', daemon=True)
+            self._thread.start()
+            # A primeira rodada acontece logo ao iniciar
+            self.trigger()
+
+    def trigger(self):
+        """Pede uma rodada de consenso imediata, sem esperar por ela."""
+        self._wake.set()
+
+    @property
+    def is_stale(self):
+        """True se a cadeia não é sincronizada há mais de `max_staleness` segundos."""
+        return self.last_sync is None or time.monotonic() - self.last_sync > self.max_staleness
+
+    def ensure_fresh(self):
+        """Dispara uma rodada de consenso caso a cadeia esteja desatualizada."""
+        if self.is_stale:
+            self.trigger()
+
+    def sync(self):
+        """
+        Executa uma rodada de consenso agora (na thread de quem chamou).
+
+        Returns:
+            bool: True se a cadeia local foi substituída.
+        """
+        with self._sync_lock:
+            started = time.monotonic()
+            try:
+                self.last_replaced = self.blockchain.resolve_conflicts()
+                self.last_error = None
+                self.last_sync = time.monotonic()
+                if self.last_replaced:
+                    print("SINCRONIZAÇÃO: Cadeia atualizada pela cadeia autoritativa da rede.")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"AVISO: Falha na sincronização com a rede: {e}")
+            finally:
+                self.rounds += 1
+                self.last_duration = time.monotonic() - started
+            return self.last_replaced
+
+    def status(self):
+        """
+        Returns:
+            dict: O estado atual da sincronização.
+        """
+        return {
+            'interval_seconds': self.interval,
+            'max_staleness_seconds': self.max_staleness,
+            'seconds_since_last_sync': (
+                round(time.monotonic() - self.last_sync, 3) if self.last_sync is not None else None
+            ),
+            'is_stale': self.is_stale,
+            'last_duration_seconds': round(self.last_duration, 6) if self.last_duration is not None else None,
+            'last_replaced': self.last_replaced,
+            'last_error': self.last_error,
+            'rounds': self.rounds
+        }
+
+    def _run(self):
+        while True:
+            # Um intervalo <= 0 desativa a sincronização periódica;
+            # as rodadas passam a acontecer apenas por trigger().
+            self._wake.wait(timeout=self.interval if self.interval > 0 else None)
+            self._wake.clear()
+            self.sync()
@@ -0,0 +1,344 @@
+# cryptocurrency/tests/test_blockchain.py
+
+import datetime
+import itertools
+import json
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+import views
+from blockchain import Blockchain
+from merkle import merkle_root
+from miner import LEGACY_DIFFICULTY, valid_proof, work_target
+from peers import PeerResponse
+from storage import PrunedBlockError
+
+
+class BlockchainTestCase(unittest.TestCase):
+    """Base dos testes: um Blockchain novo em um diretório temporário."""
+
+    blockchain_options = {}
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name, **self.blockchain_options)
+
+    def tearDown(self):
+        self.blockchain.close()
+        self.data_dir.cleanup()
+
+    def mine_block(self, blockchain=None):
+        blockchain = blockchain or self.blockchain
+        proof = blockchain.proof_of_work(blockchain.chain[-1]['proof'])
+        return blockchain.create_block(proof, blockchain.get_block_hash(len(blockchain.chain) - 1))
+
+
+class BlockHashTest(BlockchainTestCase):
+    """Hash de blocos com raiz de Merkle, que cobre só o cabeçalho."""
+
+    def make_block(self):
+        transactions = [{'id': 't1', 'name': 'Ticket'}]
+        return {
+            'index': 2,
+            'timestamp': '2026-01-01T00:00:00+00:00',
+            'proof': 1,
+            'previous_hash': '0' * 64,
+            'difficulty': 1,
+            'merkle_root': merkle_root(transactions),
+            'transactions': transactions
+        }
+
+    def test_hash_ignores_transactions(self):
+        block = self.make_block()
+        header = self.blockchain.block_header(block)
+
+        self.assertEqual(self.blockchain.hash(block), self.blockchain.hash(header))
+        self.assertEqual(self.blockchain.hash(block), self.blockchain.hash(dict(block, transactions=[])))
+
+    def test_hash_covers_header(self):
+        block = self.make_block()
+
+        self.assertNotEqual(self.blockchain.hash(block), self.blockchain.hash(dict(block, proof=2)))
+        self.assertNotEqual(self.blockchain.hash(block),
+                            self.blockchain.hash(dict(block, merkle_root=merkle_root([]))))
+
+    def test_hash_of_legacy_block_covers_transactions(self):
+        block = self.make_block()
+        del block['merkle_root']
+
+        self.assertNotEqual(self.blockchain.hash(block), self.blockchain.hash(dict(block, transactions=[])))
+
+    def test_tampered_transactions_are_rejected(self):
+        # O hash não muda, então é a raiz de Merkle que denuncia a alteração
+        self.blockchain.add_transaction({'id': 't1', 'name': 'Ticket'})
+        self.mine_block()
+        chain = json.loads(json.dumps(list(self.blockchain.chain)))
+        self.assertTrue(self.blockchain.is_chain_valid(chain))
+
+        chain[1]['transactions'][0]['name'] = 'Outro'
+
+        self.assertFalse(self.blockchain.is_chain_valid(chain))
+
+
+class CheckpointChainTest(BlockchainTestCase):
+    """Listas de blocos recebidas de outro nó que começam depois do Bloco Gênesis."""
+
+    def forged_chain(self, count):
+        # Blocos sem prova de trabalho que declaram uma dificuldade enorme
+        previous_hash = self.blockchain.get_block_hash(0)
+        chain = []
+        for index in range(2, count + 2):
+            block = {
+                'index': index,
+                'timestamp': '2026-01-01T00:00:00+00:00',
+                'proof': 1,
+                'previous_hash': previous_hash,
+                'difficulty': 10**30,
+                'merkle_root': merkle_root([]),
+                'transactions': []
+            }
+            previous_hash = self.blockchain.hash(block)
+            chain.append(block)
+        return chain
+
+    def test_forged_window_is_rejected(self):
+        chain = self.forged_chain(self.blockchain.retarget_window + 1)
+
+        self.assertFalse(self.blockchain.is_chain_valid(chain))
+        # A janela inicial não é a nossa: a dificuldade declarada não conta como trabalho
+        self.assertIsNone(self.blockchain.chain_total_work(chain))
+
+
+class RetargetTest(BlockchainTestCase):
+    """Ajuste da dificuldade pela janela de blocos anteriores."""
+
+    # Um segundo entre blocos já é lento: o ajuste fica no limite de 1/4
+    blockchain_options = {'target_block_interval': 0.01, 'retarget_window': 2}
+
+    def window(self, seconds, difficulty=1000, count=3):
+        # Blocos com a mesma dificuldade, `seconds` segundos um após o outro
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        return [{'index': index + 1,
+                 'timestamp': (start + datetime.timedelta(seconds=seconds * index)).isoformat(),
+                 'difficulty': difficulty}
+                for index in range(count)]
+
+    def next_block(self, chain, difficulty, seconds=1):
+        # Próximo bloco, com a prova minerada para a dificuldade declarada
+        previous_block = chain[-1]
+        target = work_target(difficulty)
+        proof = next(proof for proof in itertools.count()
+                     if valid_proof(proof, previous_block['proof'], target))
+        timestamp = self.blockchain.block_time(previous_block) + datetime.timedelta(seconds=seconds)
+        return {
+            'index': previous_block['index'] + 1,
+            'timestamp': timestamp.isoformat(),
+            'proof': proof,
+            'previous_hash': self.blockchain.hash(previous_block),
+            'difficulty': difficulty,
+            'merkle_root': merkle_root([]),
+            'transactions': []
+        }
+
+    def test_adjusts_in_proportion_to_the_window_time(self):
+        # Dois intervalos de 0,02 s em vez de 0,01 s: metade do trabalho médio
+        self.assertEqual(self.blockchain._expected_difficulty(self.window(0.02), 3), 500)
+
+    def test_fast_blocks_raise_difficulty_at_most_four_times(self):
+        self.assertEqual(self.blockchain._expected_difficulty(self.window(0), 3), 4000)
+
+    def test_slow_blocks_lower_difficulty_at_most_four_times(self):
+        self.assertEqual(self.blockchain._expected_difficulty(self.window(3600), 3), 250)
+
+    def test_retargeted_chain_is_valid(self):
+        chain = [self.blockchain.chain[0]]
+        chain.append(self.next_block(chain, LEGACY_DIFFICULTY))
+        chain.append(self.next_block(chain, LEGACY_DIFFICULTY // 4))
+
+        self.assertTrue(self.blockchain.is_chain_valid(chain))
+
+    def test_difficulty_other_than_expected_is_rejected(self):
+        # A prova atende à dificuldade declarada, mas ela não é a calculada
+        chain = [self.blockchain.chain[0]]
+        chain.append(self.next_block(chain, LEGACY_DIFFICULTY // 4))
+
+        self.assertFalse(self.blockchain.is_chain_valid(chain))
+
+    def test_proof_below_retargeted_difficulty_is_rejected(self):
+        chain = [self.blockchain.chain[0]]
+        chain.append(self.next_block(chain, LEGACY_DIFFICULTY))
+        block = self.next_block(chain, LEGACY_DIFFICULTY // 4)
+        # Uma prova que só atende a um alvo mais fácil que o ajustado
+        block['proof'] = next(proof for proof in itertools.count()
+                              if valid_proof(proof, chain[-1]['proof'], work_target(2))
+                              and not valid_proof(proof, chain[-1]['proof'], work_target(block['difficulty'])))
+        chain.append(block)
+
+        self.assertFalse(self.blockchain.is_chain_valid(chain))
+
+
+class FlaskPeerClient:
+    """
+    PeerClient que atende as consultas pelas rotas de outro Blockchain, sem
+    rede. Os nós de `canned` respondem com `canned[nó](caminho)`.
+    """
+
+    def __init__(self, blockchain, canned=None):
+        views.set_blockchain(blockchain)
+        app = Flask(__name__)
+        app.register_blueprint(views.api_blueprint)
+        self.client = app.test_client()
+        self.canned = canned or {}
+
+    def get_json(self, node, path, params=None):
+        if node in self.canned:
+            return PeerResponse(node, data=self.canned[node](path), status_code=200, latency=0.0)
+        response = self.client.get(path, query_string=params)
+        return PeerResponse(node, data=response.get_json(), status_code=response.status_code, latency=0.0)
+
+    def fetch_all(self, nodes, path, params=None, deadline=None):
+        return [self.get_json(node, path, params) for node in nodes]
+
+
+class PruneTest(BlockchainTestCase):
+    """Poda dos blocos antigos, reinício a partir dos retratos e bootstrap."""
+
+    # Blocos minerados em sequência são sempre lentos para esse intervalo:
+    # a dificuldade cai a cada bloco e a mineração fica rápida
+    blockchain_options = {'target_block_interval': 1e-6, 'retarget_window': 2,
+                          'checkpoint_interval': 4, 'prune_depth': 4}
+
+    def setUp(self):
+        super().setUp()
+        for number in range(12):
+            self.blockchain.add_transaction({'id': f't{number}', 'name': f'Ticket {number}'})
+            self.mine_block()
+
+    def reopen(self):
+        self.blockchain.close()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name, **self.blockchain_options)
+
+    def test_old_blocks_are_pruned(self):
+        chain = self.blockchain.chain
+
+        self.assertEqual(len(chain), 13)
+        self.assertEqual(chain.first, 12 - 4)
+        self.assertEqual(chain[chain.first]['index'], chain.first + 1)
+        self.assertTrue(self.blockchain.is_chain_valid(chain, full=True))
+
+    def test_reads_below_first_raise(self):
+        chain = self.blockchain.chain
+
+        with self.assertRaises(PrunedBlockError):
+            chain[chain.first - 1]
+        with self.assertRaises(IndexError):
+            chain[0]
+        self.assertEqual(chain[:chain.first + 1], [chain[chain.first]])
+
+    def test_restart_from_snapshot(self):
+        head = self.blockchain.get_head()
+
+        self.reopen()
+
+        self.assertEqual(self.blockchain.get_head(), head)
+        self.assertTrue(self.blockchain.is_chain_valid(self.blockchain.chain, full=True))
+        self.assertEqual(self.blockchain.find_transaction('t11')[0]['index'], 13)
+        self.mine_block()
+        self.assertTrue(self.blockchain.is_chain_valid(self.blockchain.chain, full=True))
+
+    def test_restart_from_prune_points(self):
+        # Sem o retrato, o trabalho dos blocos podados vem do ponto de poda
+        head = self.blockchain.get_head()
+        self.blockchain.close()
+        os.remove(os.path.join(self.data_dir.name, 'chain_state.json'))
+        self.blockchain = Blockchain(data_dir=self.data_dir.name, **self.blockchain_options)
+
+        self.assertEqual(self.blockchain.get_head(), head)
+        self.assertTrue(self.blockchain.is_chain_valid(self.blockchain.chain, full=True))
+
+    def test_committed_ids_cover_only_kept_blocks(self):
+        # t0..t6 estão nos blocos 2..8, podados; t7..t11 nos blocos mantidos
+        kept = {f't{number}' for number in range(7, 12)}
+
+        self.assertEqual(set(self.blockchain.mempool.committed_ids()), kept)
+        self.blockchain.add_transaction({'id': 't0', 'name': 'Ticket 0'})
+
+    def test_committed_ids_narrowed_after_crash(self):
+        # Sem encerrar, vale o retrato gravado antes da última poda
+        self.blockchain.storage.close()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name, **self.blockchain_options)
+
+        self.assertEqual(set(self.blockchain.mempool.committed_ids()), {f't{number}' for number in range(7, 12)})
+
+    def test_bootstrap_from_peer(self):
+        peer_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(peer_dir.cleanup)
+        node = Blockchain(data_dir=peer_dir.name, **self.blockchain_options)
+        self.addCleanup(node.close)
+        self.addCleanup(views.set_blockchain, None)
+        node.peer_client = FlaskPeerClient(self.blockchain)
+
+        self.assertTrue(node.bootstrap('peer:5000'))
+
+        self.assertEqual(node.get_head()['tip_hash'], self.blockchain.get_head()['tip_hash'])
+        self.assertEqual(node.total_work, self.blockchain.total_work)
+        self.assertEqual(node.chain.first, 13 - self.blockchain.retarget_window - 2)
+        self.assertTrue(node.is_chain_valid(node.chain, full=True))
+        self.assertTrue(node.mempool.contains('t11'))
+        self.mine_block(node)
+        self.assertTrue(node.is_chain_valid(node.chain, full=True))
+
+
+class PeerValidationTest(BlockchainTestCase):
+    """Respostas malformadas de outros nós durante o consenso."""
+
+    blockchain_options = {'target_block_interval': 1e-6, 'retarget_window': 2}
+
+    def setUp(self):
+        super().setUp()
+        peer_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(peer_dir.cleanup)
+        self.peer = Blockchain(data_dir=peer_dir.name, **self.blockchain_options)
+        self.addCleanup(self.peer.close)
+        self.addCleanup(views.set_blockchain, None)
+        for _ in range(3):
+            self.mine_block(self.peer)
+
+    def resolve_with(self, canned):
+        self.blockchain.peer_client = FlaskPeerClient(self.peer, canned)
+        for node in ['good:5000', *canned]:
+            self.blockchain.register_node(f'http://{node}')
+        return self.blockchain.resolve_conflicts()
+
+    @staticmethod
+    def answer(head, page):
+        # Nó que responde com `head` em /chain/head e `page` em /chain/blocks
+        return lambda path: head if path == '/chain/head' else page
+
+    def test_malformed_heads_are_skipped(self):
+        replaced = self.resolve_with({
+            'text:5000': lambda path: {'height': '9', 'cumulative_work': 10**9},
+            'list:5000': lambda path: [],
+            'negative:5000': lambda path: {'height': 9, 'cumulative_work': 10**9, 'first_index': 0},
+        })
+
+        self.assertTrue(replaced)
+        self.assertEqual(self.blockchain.get_head(), self.peer.get_head())
+
+    def test_malformed_blocks_are_skipped(self):
+        head = {'height': 2, 'first_index': 1, 'tip_hash': 'ab' * 32, 'cumulative_work': 10**9}
+        # Blocos no índice certo (logo após o nosso topo), mas sem campos ou com tipos errados
+        pages = [{}, {'blocks': 'nenhum'}, {'blocks': [{'index': 2}]},
+                 {'blocks': [{'index': 2, 'timestamp': '', 'proof': '1', 'previous_hash': '0', 'transactions': []}]}]
+        canned = {f'bad{number}:5000': self.answer(head, page) for number, page in enumerate(pages)}
+
+        # Os nós malformados anunciam mais trabalho e são tentados primeiro
+        self.assertTrue(self.resolve_with(canned))
+        self.assertEqual(self.blockchain.get_head(), self.peer.get_head())
+
+
+if __name__ == '__main__':
+    unittest.main()
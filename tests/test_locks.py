@@ -0,0 +1,94 @@
+# cryptocurrency/tests/test_locks.py
+
+import threading
+import time
+import unittest
+
+from locks import ReadWriteLock
+
+# Tempo máximo de espera por uma thread antes de considerar o teste travado
+TIMEOUT = 5.0
+
+
+class ReadWriteLockTest(unittest.TestCase):
+    """Preferência dos escritores e reentrância da trava de leitores/escritor."""
+
+    def setUp(self):
+        self.lock = ReadWriteLock()
+        self.events = []
+
+    def start(self, name, locked):
+        # Thread que segura a trava (read_locked ou write_locked) e registra a entrada
+        def run():
+            with locked():
+                self.events.append(name)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, TIMEOUT)
+        return thread
+
+    def wait_until(self, condition):
+        deadline = time.monotonic() + TIMEOUT
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('A condição não foi atingida a tempo.')
+            time.sleep(0.005)
+
+    def test_waiting_writer_blocks_new_readers(self):
+        self.lock.acquire_read()
+        writer = self.start('writer', self.lock.write_locked)
+        self.wait_until(lambda: self.lock._waiting_writers == 1)
+
+        reader = self.start('reader', self.lock.read_locked)
+        reader.join(0.1)
+        # O leitor novo espera atrás do escritor da fila
+        self.assertTrue(reader.is_alive())
+        self.assertEqual(self.events, [])
+
+        self.lock.release_read()
+        writer.join(TIMEOUT)
+        reader.join(TIMEOUT)
+        self.assertEqual(self.events, ['writer', 'reader'])
+
+    def test_reader_reenters_with_writer_waiting(self):
+        with self.lock.read_locked():
+            writer = self.start('writer', self.lock.write_locked)
+            self.wait_until(lambda: self.lock._waiting_writers == 1)
+            # Esperar aqui pelo escritor seria um impasse
+            with self.lock.read_locked():
+                self.events.append('nested')
+        writer.join(TIMEOUT)
+
+        self.assertEqual(self.events, ['nested', 'writer'])
+
+    def test_writer_can_take_read_lock(self):
+        with self.lock.write_locked():
+            with self.lock.read_locked():
+                reader = self.start('reader', self.lock.read_locked)
+                reader.join(0.1)
+                # Outras threads continuam sem ler enquanto a escrita está com o dono
+                self.assertTrue(reader.is_alive())
+                self.events.append('writer')
+        reader.join(TIMEOUT)
+
+        self.assertEqual(self.events, ['writer', 'reader'])
+
+    def test_writer_reenters(self):
+        with self.lock.write_locked():
+            with self.lock.write_locked():
+                pass
+            self.assertEqual(self.lock._writer, threading.get_ident())
+        self.assertIsNone(self.lock._writer)
+
+    def test_read_cannot_be_promoted(self):
+        with self.lock.read_locked():
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+        # A tentativa não deixa a trava presa
+        with self.lock.write_locked():
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# cryptocurrency/tests/test_mempool.py
+
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from blockchain import Blockchain
+from mempool import Mempool, TransactionRejected
+
+
+def make_transaction(tx_id, name='Ticket'):
+    return {'id': tx_id, 'name': name}
+
+
+class MempoolDedupTest(unittest.TestCase):
+    """Recusa de ids repetidos, entre as pendentes e as já gravadas."""
+
+    def setUp(self):
+        self.mempool = Mempool()
+
+    def test_pending_id_is_rejected(self):
+        self.mempool.add(make_transaction('t1'))
+
+        with self.assertRaises(TransactionRejected) as context:
+            self.mempool.add(make_transaction('t1', 'Outro'))
+
+        self.assertEqual(context.exception.reason, 'duplicate')
+        self.assertEqual(context.exception.transaction_ids, ['t1'])
+        self.assertEqual(self.mempool.transactions(), [make_transaction('t1')])
+
+    def test_committed_id_is_rejected(self):
+        self.mempool.mark_committed([make_transaction('t1')])
+
+        with self.assertRaises(TransactionRejected):
+            self.mempool.add(make_transaction('t1'))
+        self.assertEqual(len(self.mempool), 0)
+
+    def test_ids_are_compared_as_text(self):
+        self.mempool.add(make_transaction(1))
+
+        with self.assertRaises(TransactionRejected):
+            self.mempool.add(make_transaction('1'))
+
+    def test_batch_with_repeated_id_is_rejected_whole(self):
+        with self.assertRaises(TransactionRejected):
+            self.mempool.add_many([make_transaction('t1'), make_transaction('t2'), make_transaction('t1')])
+
+        self.assertEqual(len(self.mempool), 0)
+
+    def test_transactions_without_id_are_accepted(self):
+        self.mempool.add({'name': 'Recompensa'})
+        self.mempool.add({'name': 'Recompensa'})
+
+        self.assertEqual(len(self.mempool), 2)
+
+    def test_returned_batch_is_pending_again(self):
+        self.mempool.add_many([make_transaction(f't{number}') for number in range(3)])
+        batch = self.mempool.take_batch(2)
+        self.mempool.add(make_transaction('t3'))
+
+        # Enquanto o bloco é gravado, os ids do lote contam como gravados
+        with self.assertRaises(TransactionRejected):
+            self.mempool.add(make_transaction('t0'))
+        self.mempool.return_batch(batch)
+
+        self.assertEqual([transaction['id'] for transaction in self.mempool.transactions()],
+                         ['t0', 't1', 't2', 't3'])
+        self.assertEqual(self.mempool.committed_ids(), [])
+
+
+class MempoolEvictionTest(unittest.TestCase):
+    """Políticas para o mempool cheio."""
+
+    def fill(self, eviction):
+        mempool = Mempool(max_transactions=2, eviction=eviction)
+        mempool.add_many([make_transaction('t1'), make_transaction('t2')])
+        return mempool
+
+    def test_reject_refuses_new_transactions(self):
+        mempool = self.fill('reject')
+
+        with self.assertRaises(TransactionRejected) as context:
+            mempool.add(make_transaction('t3'))
+
+        self.assertEqual(context.exception.reason, 'full')
+        self.assertEqual([transaction['id'] for transaction in mempool.transactions()], ['t1', 't2'])
+        self.assertEqual(mempool.stats()['rejected_full'], 1)
+
+    def test_oldest_evicts_first_pending(self):
+        mempool = self.fill('oldest')
+
+        mempool.add(make_transaction('t3'))
+
+        self.assertEqual([transaction['id'] for transaction in mempool.transactions()], ['t2', 't3'])
+        self.assertEqual(mempool.stats()['evicted'], 1)
+        # A descartada não foi gravada e pode ser enviada de novo
+        self.assertFalse(mempool.contains('t1'))
+
+    def test_batch_larger_than_limit_is_rejected(self):
+        mempool = self.fill('oldest')
+
+        with self.assertRaises(TransactionRejected):
+            mempool.add_many([make_transaction(f'n{number}') for number in range(3)])
+        self.assertEqual(len(mempool), 2)
+
+    def test_byte_limit(self):
+        size = len(json.dumps(make_transaction('t1')))
+        mempool = Mempool(max_bytes=2 * size)
+        mempool.add_many([make_transaction('t1'), make_transaction('t2')])
+
+        with self.assertRaises(TransactionRejected):
+            mempool.add(make_transaction('t3'))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            Mempool(eviction='newest')
+
+
+class FailedBlockWriteTest(unittest.TestCase):
+    """O lote retirado do mempool volta a ficar pendente se o bloco não for gravado."""
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name)
+
+    def tearDown(self):
+        self.blockchain.close()
+        self.data_dir.cleanup()
+
+    def test_batch_is_returned(self):
+        transactions = [make_transaction(f't{number}') for number in range(3)]
+        self.blockchain.add_transactions(transactions)
+
+        with mock.patch.object(self.blockchain.chain, 'append', side_effect=OSError('disco cheio')):
+            with self.assertRaises(OSError):
+                self.blockchain.create_block(proof=1, previous_hash=self.blockchain.get_block_hash(0))
+
+        self.assertEqual(len(self.blockchain.chain), 1)
+        self.assertEqual(self.blockchain.mempool.transactions(), transactions)
+        self.assertEqual(self.blockchain.mempool.committed_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# cryptocurrency/tests/test_merkle.py
+
+import unittest
+
+from merkle import merkle_proof, merkle_root, verify_proof
+
+
+def make_transactions(count):
+    return [{'id': f't{index}', 'name': f'Ticket {index}'} for index in range(count)]
+
+
+class MerkleProofTest(unittest.TestCase):
+    """Caminhos de Merkle montados e conferidos como faria um cliente leve."""
+
+    def test_every_leaf_is_proven_with_odd_count(self):
+        for count in (1, 3, 5, 7):
+            transactions = make_transactions(count)
+            root = merkle_root(transactions)
+            for position, transaction in enumerate(transactions):
+                with self.subTest(count=count, position=position):
+                    path = merkle_proof(transactions, position)
+                    self.assertTrue(verify_proof(transaction, path, root))
+
+    def test_tampered_leaf_fails(self):
+        transactions = make_transactions(5)
+        path = merkle_proof(transactions, 2)
+        tampered = dict(transactions[2], name='Outro')
+
+        self.assertFalse(verify_proof(tampered, path, merkle_root(transactions)))
+
+    def test_tampered_sibling_fails(self):
+        transactions = make_transactions(5)
+        root = merkle_root(transactions)
+        for step in range(len(merkle_proof(transactions, 2))):
+            with self.subTest(step=step):
+                path = merkle_proof(transactions, 2)
+                path[step]['hash'] = 'ff' * 32
+                self.assertFalse(verify_proof(transactions[2], path, root))
+
+    def test_swapped_side_fails(self):
+        transactions = make_transactions(4)
+        path = merkle_proof(transactions, 1)
+        path[0]['side'] = 'right' if path[0]['side'] == 'left' else 'left'
+
+        self.assertFalse(verify_proof(transactions[1], path, merkle_root(transactions)))
+
+    def test_odd_leaf_is_not_duplicated(self):
+        # Repetir a última transação não pode produzir a mesma raiz
+        transactions = make_transactions(3)
+
+        self.assertNotEqual(merkle_root(transactions), merkle_root(transactions + transactions[-1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
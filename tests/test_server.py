@@ -0,0 +1,25 @@
+# cryptocurrency/tests/test_server.py
+
+import signal
+import unittest
+
+import server
+
+
+class StopOnSigtermTest(unittest.TestCase):
+    """Tratador de SIGTERM do modo de produção."""
+
+    def setUp(self):
+        previous = signal.signal(signal.SIGTERM, server.stop_on_sigterm)
+        self.addCleanup(signal.signal, signal.SIGTERM, previous)
+
+    def test_first_signal_stops_and_ignores_the_next(self):
+        with self.assertRaises(SystemExit) as context:
+            server.stop_on_sigterm(signal.SIGTERM, None)
+
+        self.assertEqual(context.exception.code, 0)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_IGN)
+
+
+if __name__ == '__main__':
+    unittest.main()
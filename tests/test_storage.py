@@ -0,0 +1,122 @@
+# cryptocurrency/tests/test_storage.py
+
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+
+from storage import BlockLog, BlockStore, decode_block, encode_block
+
+
+def block_hash(block):
+    return hashlib.sha256(json.dumps(block, sort_keys=True).encode()).hexdigest()
+
+
+def make_block(index, previous_hash='0' * 64):
+    return {
+        'index': index,
+        'timestamp': f'2026-01-01T00:00:{index:02d}.123456+00:00',
+        'proof': 1000 + index,
+        'previous_hash': previous_hash,
+        'transactions': [{'id': f't{index}', 'name': 'ção'}]
+    }
+
+
+class BlockEncodingTest(unittest.TestCase):
+    """Formato binário de um registro de bloco."""
+
+    def test_round_trip(self):
+        block = make_block(7, 'ab' * 32)
+        self.assertEqual(decode_block(encode_block(block), 0), block)
+
+    def test_round_trip_keeps_irregular_fields(self):
+        # Campos que não cabem no cabeçalho vão para o corpo JSON sem mudar
+        block = {'index': -1, 'timestamp': '2026-01-01 00:00:00', 'proof': 2**70,
+                 'previous_hash': '0', 'transactions': [], 'difficulty': 3}
+        self.assertEqual(decode_block(encode_block(block), 0), block)
+
+
+class BlockStoreTest(unittest.TestCase):
+    """Abertura do armazenamento binário após falhas e a partir dos formatos antigos."""
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.directory = self.data_dir.name
+
+    def tearDown(self):
+        self.data_dir.cleanup()
+
+    def open_store(self, legacy_log=None):
+        store = BlockStore(self.directory, legacy_log=legacy_log, hasher=block_hash)
+        store.open()
+        self.addCleanup(store.close)
+        return store
+
+    def write_blocks(self, count):
+        store = self.open_store()
+        blocks = [make_block(index) for index in range(1, count + 1)]
+        for block in blocks:
+            store.append(block)
+        store.close()
+        return blocks
+
+    def test_torn_tail_record_is_discarded(self):
+        blocks = self.write_blocks(3)
+        data_path = os.path.join(self.directory, 'blocks.dat')
+        size = os.path.getsize(data_path)
+        # Queda no meio da escrita do quarto registro
+        with open(data_path, 'ab') as f:
+            f.write(encode_block(make_block(4))[:20])
+
+        store = self.open_store()
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual([store.read(position) for position in range(3)], blocks)
+        self.assertEqual(os.path.getsize(data_path), size)
+        store.append(make_block(4))
+        self.assertEqual(store.read(3), make_block(4))
+
+    def test_missing_digest_file_is_rebuilt(self):
+        blocks = self.write_blocks(3)
+        os.remove(os.path.join(self.directory, 'blocks.hash'))
+
+        store = self.open_store()
+
+        self.assertEqual([store.digest(position) for position in range(3)],
+                         [block_hash(block) for block in blocks])
+
+    def test_migrates_legacy_json(self):
+        blocks = [make_block(index) for index in range(1, 4)]
+        legacy_path = os.path.join(self.directory, 'blockchain_data.json')
+        with open(legacy_path, 'w') as f:
+            json.dump(blocks, f)
+
+        store = self.open_store(self.legacy_log())
+
+        self.assertEqual([store.read(position) for position in range(3)], blocks)
+        self.assertTrue(os.path.exists(legacy_path + '.migrated'))
+        self.assertFalse(os.path.exists(legacy_path))
+
+    def test_migrates_legacy_jsonl(self):
+        blocks = [make_block(index) for index in range(1, 4)]
+        log_path = os.path.join(self.directory, 'blockchain_data.jsonl')
+        with open(log_path, 'w') as f:
+            for block in blocks:
+                f.write(json.dumps(block) + '\n')
+
+        store = self.open_store(self.legacy_log())
+
+        self.assertEqual([store.read(position) for position in range(3)], blocks)
+        self.assertEqual([store.digest(position) for position in range(3)],
+                         [block_hash(block) for block in blocks])
+        self.assertTrue(os.path.exists(log_path + '.migrated'))
+        self.assertFalse(os.path.exists(log_path))
+
+    def legacy_log(self):
+        return BlockLog(path=os.path.join(self.directory, 'blockchain_data.jsonl'),
+                        legacy_path=os.path.join(self.directory, 'blockchain_data.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
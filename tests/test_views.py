@@ -0,0 +1,86 @@
+# cryptocurrency/tests/test_views.py
+
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+import views
+from blockchain import Blockchain
+from sync import ChainSynchronizer
+
+
+class NetworkChainTest(unittest.TestCase):
+    """Rota /network/chain de um nó sem outros nós registrados."""
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name)
+        views.set_blockchain(self.blockchain)
+        app = Flask(__name__)
+        app.register_blueprint(views.api_blueprint)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        views.set_blockchain(None)
+        self.blockchain.close()
+        self.data_dir.cleanup()
+
+    def test_local_chain_is_authoritative(self):
+        response = self.client.get('/network/chain')
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.get_data())
+        self.assertEqual(data['message'], 'A cadeia local já é a autoritativa.')
+        self.assertEqual([block['index'] for block in data['chain']], [1])
+
+
+class AddTransactionTest(unittest.TestCase):
+    """Rota /add_transaction e a recusa de ids repetidos."""
+
+    def setUp(self):
+        self.data_dir = tempfile.TemporaryDirectory()
+        self.blockchain = Blockchain(data_dir=self.data_dir.name)
+        self.gossip = mock.Mock()
+        views.set_blockchain(self.blockchain)
+        views.set_chain_synchronizer(ChainSynchronizer(self.blockchain))
+        views.set_transaction_gossip(self.gossip)
+        app = Flask(__name__)
+        app.register_blueprint(views.api_blueprint)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        views.set_blockchain(None)
+        views.set_chain_synchronizer(None)
+        views.set_transaction_gossip(None)
+        self.blockchain.close()
+        self.data_dir.cleanup()
+
+    def post(self, *ids):
+        tickets = [{'id': tx_id, 'name': 'Ticket', 'engine': 'v8',
+                    'converter': {'code': 'c1', 'id': 1, 'name': 'Conversor'}} for tx_id in ids]
+        return self.client.post('/add_transaction', json={'transactions': tickets})
+
+    def test_new_transactions_are_accepted(self):
+        response = self.post('t1', 't2')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([transaction['id'] for transaction in self.blockchain.transactions], ['t1', 't2'])
+        self.gossip.broadcast.assert_called_once()
+
+    def test_duplicate_id_returns_409(self):
+        self.post('t1')
+
+        response = self.post('t2', 't1')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.get_json()['transaction_ids'], ['t1'])
+        # O lote é recusado inteiro e não é propagado
+        self.assertEqual([transaction['id'] for transaction in self.blockchain.transactions], ['t1'])
+        self.assertEqual(self.gossip.broadcast.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,36 @@
 # cryptocurrency/views.py
 
-from flask import Blueprint, jsonify, request, render_template
-import requests
-import uuid
+from flask import Blueprint, Response, g, jsonify, request, render_template
+import io
+import json
+import time
+
+import metrics
+from blockchain import validate_block_fields
+from merkle import merkle_proof
+from mempool import TransactionRejected
 
 # 'api' é o nome do blueprint. Usado para organizar as rotas.
 api_blueprint = Blueprint('api', __name__)
 
-# Esta variável global será preenchida pela instância criada em main.py
+# Estas variáveis globais serão preenchidas pelas instâncias criadas em main.py
 blockchain = None
+mining_scheduler = None
+chain_synchronizer = None
+transaction_gossip = None
+block_announcer = None
+# Preenchido apenas nas réplicas do modo de produção (ver server.py)
+writer_proxy = None
+# Preenchido apenas no processo escritor do modo de produção com réplicas
+replica_pool = None
+
+# Rotas que só leem a cadeia e podem ser atendidas por uma réplica; todas
+# as outras são repassadas ao processo escritor
+REPLICA_ENDPOINTS = {
+    'api.home', 'api.search_transactions', 'api.get_chain', 'api.get_chain_head',
+    'api.get_chain_blocks', 'api.get_chain_headers', 'api.get_transaction_proof',
+    'api.export_metrics'
+}
 
 def set_blockchain(blockchain_instance):
     """
@@ -17,6 +39,92 @@ def set_blockchain(blockchain_instance):
     global blockchain
     blockchain = blockchain_instance
 
+def set_mining_scheduler(scheduler_instance):
+    """
+    Função para injetar o agendador de mineração a partir do main.py.
+    """
+    global mining_scheduler
+    mining_scheduler = scheduler_instance
+
+def set_chain_synchronizer(synchronizer_instance):
+    """
+    Função para injetar o sincronizador da cadeia a partir do main.py.
+    """
+    global chain_synchronizer
+    chain_synchronizer = synchronizer_instance
+
+def set_transaction_gossip(gossip_instance):
+    """
+    Função para injetar o propagador de transações a partir do main.py.
+    """
+    global transaction_gossip
+    transaction_gossip = gossip_instance
+
+def set_block_announcer(announcer_instance):
+    """
+    Função para injetar o anunciador de blocos a partir do main.py.
+    """
+    global block_announcer
+    block_announcer = announcer_instance
+
+def set_writer_proxy(proxy_instance):
+    """
+    Função para injetar, em uma réplica, o repasse ao processo escritor.
+    """
+    global writer_proxy
+    writer_proxy = proxy_instance
+
+def set_replica_pool(pool_instance):
+    """
+    Função para injetar, no processo escritor, as réplicas cujas métricas
+    entram em /metrics.
+    """
+    global replica_pool
+    replica_pool = pool_instance
+
+@api_blueprint.before_request
+def require_node():
+    """
+    As rotas dependem das instâncias injetadas por main.py (create_node ou
+    create_replica). Importar `main:app` em um servidor WSGI não as cria.
+    """
+    if blockchain is None:
+        raise RuntimeError("O nó não foi criado. Inicie-o com 'python main.py' (use --server production "
+                           "para o waitress) ou chame main.create_node(args) antes de atender requisições.")
+
+# --- Métricas das rotas ---
+
+@api_blueprint.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@api_blueprint.before_request
+def route_replica_request():
+    """
+    Em uma réplica, repassa ao escritor as rotas que alteram o estado (ou
+    dependem do mempool e dos serviços do nó) e, nas demais, incorpora
+    antes os blocos que o escritor gravou.
+    """
+    if writer_proxy is None:
+        return None
+    if request.endpoint not in REPLICA_ENDPOINTS:
+        return writer_proxy.forward(request)
+    blockchain.refresh()
+    return None
+
+@api_blueprint.after_request
+def record_request_metrics(response):
+    """
+    Conta a requisição e registra quanto tempo levou para montar a resposta
+    (em respostas enviadas aos poucos, o envio do corpo não entra na conta).
+    """
+    route = request.url_rule.rule if request.url_rule else 'desconhecida'
+    metrics.http_requests.labels(route, request.method, response.status_code).inc()
+    started = g.get('request_started')
+    if started is not None:
+        metrics.http_request_duration.labels(route, request.method).observe(time.perf_counter() - started)
+    return response
+
 # --- Funções Auxiliares ---
 
 def search_recursively(data, term_to_find):
@@ -51,6 +159,62 @@ def search_recursively(data, term_to_find):
     return False
 
 
+def filter_transaction(t):
+    """
+    Valida uma transação (ticket) e monta a versão filtrada, apenas com os
+    campos essenciais que são salvos na blockchain.
+
+    Returns:
+        tuple: (transação filtrada, None) se for válida, ou (None, mensagem de erro).
+    """
+    # --- Validação dos campos obrigatórios ---
+    required_keys = ['id', 'name', 'engine', 'converter']
+    if not isinstance(t, dict) or not all(key in t for key in required_keys):
+        return None, f'Transação inválida. Os campos "id", "name", "engine", e "converter" são obrigatórios. Transação problemática: {t}'
+
+    converter_data = t.get('converter')
+    if not isinstance(converter_data, dict):
+        return None, f'O campo "converter" deve ser um objeto (dicionário). Transação problemática: {t}'
+
+    required_converter_keys = ['code', 'id', 'name']
+    if not all(key in converter_data for key in required_converter_keys):
+        return None, f'Objeto "converter" inválido. Os campos "code", "id", e "name" são obrigatórios. Transação problemática: {t}'
+
+    # --- Criação do novo objeto JSON filtrado ---
+    # Apenas os campos que você quer serão incluídos aqui.
+    new_clean_transaction = {
+        'id': t.get('id'),
+        'name': t.get('name'),
+        'engine': t.get('engine'),
+        'converter': {
+            'id': converter_data.get('id'),
+            'code': converter_data.get('code'),
+            'name': converter_data.get('name')
+        }
+    }
+    return new_clean_transaction, None
+
+
+def stream_json_list(fields, list_key, items, chunk_size=64 * 1024):
+    """
+    Gera um objeto JSON em partes: primeiro os campos de `fields` e, por
+    último, a lista `list_key`, serializando um item de cada vez. Assim a
+    resposta é enviada enquanto é montada, sem existir inteira na memória.
+    """
+    buffer = [json.dumps(fields)[:-1] + (', ' if fields else '') + json.dumps(list_key) + ': [']
+    buffered = 0
+    for position, item in enumerate(items):
+        part = (', ' if position else '') + json.dumps(item)
+        buffer.append(part)
+        buffered += len(part)
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    buffer.append(']}')
+    yield ''.join(buffer)
+
+
 # --- Rotas da API ---
 
 @api_blueprint.route('/', methods=['GET'])
@@ -66,8 +230,12 @@ def home():
 @api_blueprint.route('/search', methods=['GET'])
 def search_transactions():
     """
-    Busca por um termo em qualquer lugar dentro das transações na blockchain.
-    Exemplo de uso: /search?q=termo_a_buscar
+    Busca por um termo em qualquer lugar dentro das transações na blockchain,
+    usando o índice invertido mantido pelo blockchain.
+    Exemplos de uso:
+        /search?q=termo_a_buscar
+        /search?q=X&field=converter.code   (ou /search?q=converter.code=X)
+        /search?q=termo&offset=100&limit=50
     """
     # Pega o parâmetro de busca 'q' da URL
     query_term = request.args.get('q')
@@ -75,77 +243,219 @@ def search_transactions():
     if not query_term:
         return jsonify({'error': 'Parâmetro de busca "q" é obrigatório.'}), 400
 
-    found_transactions = []
+    # Busca restrita a um campo: 'field' explícito ou o formato 'campo=valor'
+    field = request.args.get('field')
+    if field is None and '=' in query_term:
+        candidate_field, candidate_term = query_term.split('=', 1)
+        if candidate_field in blockchain.search_index.fields:
+            field, query_term = candidate_field, candidate_term
 
-    # Percorre toda a cadeia de blocos
-    for block in blockchain.chain:
-        # Percorre todas as transações dentro de um bloco
-        for transaction in block['transactions']:
-            # Usa a nova função de busca recursiva
-            if search_recursively(transaction, query_term):
-                # Se encontrar, adiciona a transação e o índice do bloco aos resultados
-                found_transactions.append({
-                    'block_index': block['index'],
-                    'transaction': transaction
-                })
-
-    if not found_transactions:
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', 100, type=int)
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'Os parâmetros "offset" e "limit" devem ser positivos.'}), 400
+    limit = min(limit, 1000)
+
+    found_transactions = []
+    with blockchain.lock.read_locked():
+        locations = blockchain.search_index.search(query_term, field)
+        for block_index, position in locations[offset:offset + limit]:
+            block = blockchain.chain[block_index - 1]
+            found_transactions.append({
+                'block_index': block_index,
+                'transaction': block['transactions'][position]
+            })
+
+    if not locations:
         return jsonify({
             'message': 'Nenhuma transação encontrada contendo o termo fornecido.',
             'search_term': query_term
         }), 404
 
     return jsonify({
-        'message': f'{len(found_transactions)} transação(ões) encontrada(s).',
-        'results': found_transactions
+        'message': f'{len(locations)} transação(ões) encontrada(s).',
+        'results': found_transactions,
+        'total': len(locations),
+        'offset': offset,
+        'limit': limit
     }), 200
 # ==================================================================
 
 @api_blueprint.route('/mine_block', methods=['GET'])
 def mine_block():
     """
-    Minera um novo bloco, adiciona à cadeia e retorna seus detalhes.
+    Inicia a mineração de um novo bloco em segundo plano.
+    O andamento pode ser acompanhado em /mining/jobs/<id>.
     """
-    # ==================================================================
-    # PASSO ZERO: CONSENSO AUTOMÁTICO ANTES DE MINERAR
-    # Garante que estamos na cadeia mais longa e válida antes de fazer o trabalho.
-    print("Iniciando mineração: Verificando consenso com a rede...")
-    replaced = blockchain.resolve_conflicts()
-    if replaced:
-        print("CONSENSO: Cadeia atualizada. A mineração continuará na nova cadeia.")
-    else:
-        print("CONSENSO: Cadeia local já é a correta. Prosseguindo.")
-    # ==================================================================
-
-    previous_block = blockchain.get_previous_block()
-    previous_proof = previous_block['proof']
-    proof = blockchain.proof_of_work(previous_proof)
-    previous_hash = blockchain.hash(previous_block)
-    
-    # Recompensa por mineração
-    node_address = str(uuid.uuid4()).replace('-', '')
-    blockchain.add_transaction({
-        'sender': 'reward',
-        'receiver': node_address,
-        'amount': 1
-    })
-
-    block = blockchain.create_block(proof, previous_hash)
-    
+    job = mining_scheduler.submit()
     response = {
-        'message': 'Parabéns, você minerou um bloco!',
-        'block': block
+        'message': 'Mineração iniciada em segundo plano.',
+        'job': job.to_dict(),
+        'status_url': f'/mining/jobs/{job.id}'
     }
-    return jsonify(response), 200
+    return jsonify(response), 202
+
+@api_blueprint.route('/mining/jobs', methods=['POST'])
+def start_mining_job():
+    """
+    Cria um novo pedido de mineração.
+    """
+    job = mining_scheduler.submit()
+    return jsonify(job.to_dict()), 202
+
+@api_blueprint.route('/mining/jobs/<job_id>', methods=['GET'])
+def get_mining_job(job_id):
+    """
+    Retorna o estado de um pedido de mineração.
+    """
+    job = mining_scheduler.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Pedido de mineração {job_id} não encontrado.'}), 404
+    return jsonify(job.to_dict()), 200
+
+@api_blueprint.route('/mining/jobs/<job_id>', methods=['DELETE'])
+def cancel_mining_job(job_id):
+    """
+    Cancela um pedido de mineração pendente ou em andamento.
+    """
+    job = mining_scheduler.cancel(job_id)
+    if job is None:
+        return jsonify({'error': f'Pedido de mineração {job_id} não encontrado.'}), 404
+    return jsonify(job.to_dict()), 200
+
+@api_blueprint.route('/mining/events', methods=['GET'])
+def get_mining_events():
+    """
+    Retorna os eventos de mineração (ex: bloco encontrado) posteriores a 'since'.
+    Com 'timeout', espera até esse número de segundos por um novo evento.
+    Exemplo de uso: /mining/events?since=3&timeout=30
+    """
+    since = request.args.get('since', 0, type=int)
+    timeout = min(request.args.get('timeout', 0, type=float), 60)
+    events = mining_scheduler.wait_for_events(since, timeout)
+    return jsonify({'events': events}), 200
 
 @api_blueprint.route('/get_chain', methods=['GET'])
 def get_chain():
     """
-    Retorna a blockchain completa.
+    Retorna a blockchain, em uma resposta enviada aos poucos (streaming).
+    Aceita paginação por posição: /get_chain?offset=100&limit=50
+
+    Em um nó podado, os blocos começam em 'first_index' (o índice do
+    primeiro bloco guardado) e 'offset' nunca é anterior a ele.
+
+    A resposta leva um ETag baseado no hash do último bloco (e no número de
+    blocos alterados por edit_block_test); se o cliente enviar o mesmo valor
+    em If-None-Match, recebe 304 sem o corpo.
+    """
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({'error': 'Os parâmetros "offset" e "limit" devem ser positivos.'}), 400
+
+    # Altura e ETag lidos juntos sob a trava; os blocos são lidos e
+    # serializados um a um durante o envio
+    with blockchain.lock.read_locked():
+        length = len(blockchain.chain)
+        first_index = blockchain.chain.first + 1
+        offset = max(offset, first_index - 1)
+        etag = f'{blockchain.get_block_hash(length - 1)}-{blockchain.edit_count}-{offset}-{limit}'
+        end = length if limit is None else offset + limit
+        blocks = blockchain.iter_blocks(offset, end)
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    fields = {'length': length, 'first_index': first_index, 'offset': offset, 'limit': limit}
+    response = Response(stream_json_list(fields, 'chain', blocks), mimetype='application/json')
+    response.set_etag(etag)
+    return response, 200
+
+@api_blueprint.route('/chain/head', methods=['GET'])
+def get_chain_head():
+    """
+    Retorna apenas o topo da cadeia: altura, hash do último bloco e trabalho
+    acumulado. Usada pelos outros nós para comparar cadeias sem baixá-las.
+    """
+    return jsonify(blockchain.get_head()), 200
+
+@api_blueprint.route('/chain/snapshot', methods=['GET'])
+def get_chain_snapshot():
+    """
+    Retorna o retrato usado por um nó novo para começar pelo topo da cadeia
+    (ver Blockchain.bootstrap): o topo e os ids de transações já gravados.
+    """
+    return jsonify(blockchain.get_bootstrap_state()), 200
+
+@api_blueprint.route('/chain/blocks', methods=['GET'])
+def get_chain_blocks():
+    """
+    Retorna os blocos a partir de um índice (o Bloco Gênesis tem índice 1).
+    Exemplo de uso: /chain/blocks?from=120&limit=500
+    """
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', 500, type=int)
+    if limit < 1:
+        return jsonify({'error': 'O parâmetro "limit" deve ser positivo.'}), 400
+
+    blocks = blockchain.get_blocks(start, min(limit, 5000))
+    response = {
+        'from': start,
+        'blocks': blocks,
+        'height': len(blockchain.chain)
+    }
+    return jsonify(response), 200
+
+@api_blueprint.route('/chain/headers', methods=['GET'])
+def get_chain_headers():
+    """
+    Retorna os cabeçalhos (blocos sem as transações) a partir de um índice,
+    para clientes leves e validação só dos cabeçalhos.
+    Exemplo de uso: /chain/headers?from=1&limit=2000
+    """
+    start = request.args.get('from', 1, type=int)
+    limit = request.args.get('limit', 2000, type=int)
+    if limit < 1:
+        return jsonify({'error': 'O parâmetro "limit" deve ser positivo.'}), 400
+
+    response = {
+        'from': start,
+        'headers': blockchain.get_headers(start, min(limit, 20000)),
+        'height': len(blockchain.chain)
+    }
+    return jsonify(response), 200
+
+@api_blueprint.route('/proof', methods=['GET'])
+def get_transaction_proof():
     """
+    Retorna a prova de inclusão de uma transação: o caminho de Merkle até a
+    raiz e o cabeçalho do bloco. Um cliente leve confere o caminho contra
+    'merkle_root' do cabeçalho (ver merkle.verify_proof) e o cabeçalho contra
+    a cadeia de cabeçalhos (/chain/headers), sem baixar os blocos.
+    Exemplo de uso: /proof?tx_id=123
+    """
+    tx_id = request.args.get('tx_id')
+    if not tx_id:
+        return jsonify({'error': 'Forneça o parâmetro "tx_id".'}), 400
+
+    block, position = blockchain.find_transaction(tx_id)
+    if block is None:
+        return jsonify({'error': f'Transação {tx_id} não encontrada na cadeia.'}), 404
+    if 'merkle_root' not in block:
+        return jsonify({'error': f'O bloco {block["index"]} é anterior às raízes de Merkle e não tem prova de inclusão.'}), 422
+
     response = {
-        'chain': blockchain.chain,
-        'length': len(blockchain.chain)
+        'tx_id': tx_id,
+        'transaction': block['transactions'][position],
+        'block_index': block['index'],
+        'position': position,
+        'merkle_root': block['merkle_root'],
+        'path': merkle_proof(block['transactions'], position),
+        'header': blockchain.block_header(block),
+        'confirmations': len(blockchain.chain) - block['index'] + 1,
+        'headers_url': f'/chain/headers?from=1&limit={block["index"]}'
     }
     return jsonify(response), 200
 
@@ -161,42 +471,51 @@ def get_authoritative_chain():
     1. Identifica todos os nós na rede, incluindo a si mesmo.
     2. Pede a cadeia de cada um deles usando a rota /get_chain.
     3. Compara todas as cadeias recebidas.
-    4. Retorna a cadeia que for a mais longa e válida.
+    4. Retorna a cadeia válida de maior trabalho acumulado (o mesmo
+       critério de Blockchain.resolve_conflicts).
     """
     print("Iniciando busca pela cadeia autoritativa em toda a rede...")
     
     # 1. Monta a lista de todos os nós que precisamos verificar.
-    # Começamos com uma cópia dos nós registrados.
-    nodes_to_check = blockchain.nodes.copy()
+    # Começamos com os nós registrados que não estão em backoff após falhas.
+    nodes_to_check = set(blockchain.peers.available())
     # Adicionamos o endereço do próprio nó à lista, para que ele também seja uma fonte.
     # `request.host` é uma forma prática do Flask obter o endereço do servidor atual.
     nodes_to_check.add(request.host)
 
     best_chain = None
-    max_length = len(blockchain.chain) # O tamanho da nossa cadeia local é o recorde a ser batido
+    max_work = blockchain.total_work # O trabalho da nossa cadeia local é o recorde a ser batido
 
-    # 2. Faz um loop por cada nó para "entrevistá-lo".
-    for node in nodes_to_check:
-        try:
-            # Pede a cadeia usando a rota simples /get_chain
-            response = requests.get(f'http://{node}/get_chain')
-
-            if response.status_code == 200:
-                data = response.json()
-                length = data['length']
-                chain = data['chain']
-
-                # 3. A VERIFICAÇÃO DUPLA: É mais longa E é válida?
-                # Usamos a lógica de validação do nosso próprio nó para auditar a cadeia recebida.
-                if length > max_length and blockchain.is_chain_valid(chain):
-                    authoritative_node = f"Encontrada uma cadeia melhor no nó {node} (Tamanho: {length})"
-                    max_length = length
-                    best_chain = chain
-
-        except requests.exceptions.RequestException:
-            print(f"AVISO: Nó {node} está offline ou não respondeu.")
+    # 2. "Entrevista" todos os nós em paralelo, pedindo a cadeia pela rota simples /get_chain
+    peer_responses = blockchain.peer_client.fetch_all(nodes_to_check, '/get_chain')
+
+    for peer_response in peer_responses:
+        if not peer_response.ok:
+            print(f"AVISO: Nó {peer_response.node} está offline ou não respondeu.")
+            continue
+
+        chain = peer_response.data.get('chain') if isinstance(peer_response.data, dict) else None
+        if not isinstance(chain, list) or not chain:
+            error = 'O campo "chain" deve ser uma lista não vazia.'
+        else:
+            error = next((error for error in map(validate_block_fields, chain) if error), None)
+        if error:
+            print(f"AVISO: Cadeia inválida do nó {peer_response.node}: {error} Ignorando.")
+            continue
+        # Um nó podado envia a cadeia a partir de um ponto de poda
+        work = blockchain.chain_total_work(chain)
+        if work is None:
+            print(f"AVISO: A cadeia do nó {peer_response.node} começa em um bloco que não temos. Ignorando.")
             continue
 
+        # 3. A VERIFICAÇÃO DUPLA: Tem mais trabalho E é válida?
+        # Usamos a lógica de validação do nosso próprio nó para auditar a cadeia recebida.
+        if work > max_work and blockchain.is_chain_valid(chain):
+            authoritative_node = (f"Encontrada uma cadeia melhor no nó {peer_response.node} "
+                                  f"(Tamanho: {len(chain)}, Trabalho acumulado: {work})")
+            max_work = work
+            best_chain = chain
+
     # 4. Determina a resposta final.
     # Se encontramos uma cadeia melhor na rede, 'best_chain' terá essa cadeia.
     # Se não, 'best_chain' ainda será None.
@@ -204,23 +523,28 @@ def get_authoritative_chain():
         
         final_response_data = {
             'message': f'{authoritative_node}',
-            'chain': best_chain
+            'chain': best_chain,
+            'peers': [peer_response.to_dict() for peer_response in peer_responses]
         }
         return jsonify(final_response_data), 200
     else:
         # Se nenhuma cadeia melhor foi encontrada, a nossa já era a correta.
-        final_response_data = {
+        # A cadeia local é lida do disco um bloco por vez e enviada aos poucos, como em /consensus
+        fields = {
             'message': 'A cadeia local já é a autoritativa.',
-            'chain': blockchain.chain
+            'peers': [peer_response.to_dict() for peer_response in peer_responses]
         }
-        return jsonify(final_response_data), 200
+        chain = blockchain.iter_blocks()
+        return Response(stream_json_list(fields, 'chain', chain), mimetype='application/json'), 200
 
 @api_blueprint.route('/is_valid', methods=['GET'])
 def is_valid():
     """
     Verifica se a blockchain é válida.
+    Use /is_valid?full=1 para revalidar tudo desde o Bloco Gênesis (auditoria).
     """
-    valid = blockchain.is_chain_valid(blockchain.chain)
+    full = request.args.get('full', '').lower() in ('1', 'true')
+    valid = blockchain.is_chain_valid(blockchain.chain, full=full)
     if valid:
         response = {'message': 'A blockchain é válida.'}
     else:
@@ -233,11 +557,9 @@ def add_transaction_route():
     Adiciona uma nova transação, filtrando e validando para salvar
     apenas os campos essenciais na blockchain.
     """
-    # ==================================================================
-    # PASSO ZERO: CONSENSO AUTOMÁTICO ANTES DE ADICIONAR TRANSAÇÃO
-    # Garante que o nó está sincronizado com a rede.
-    blockchain.resolve_conflicts()
-    # ==================================================================
+    # O consenso roda em segundo plano (ver sync.py); aqui apenas pedimos uma
+    # nova rodada, sem esperar por ela, caso a cadeia esteja desatualizada.
+    chain_synchronizer.ensure_fresh()
 
     json_data = request.get_json()
     
@@ -253,52 +575,104 @@ def add_transaction_route():
 
     # 2. Itera sobre cada transação enviada para validar e filtrar
     for t in transactions_input:
-        # --- Validação dos campos obrigatórios ---
-        required_keys = ['id', 'name', 'engine', 'converter']
-        if not all(key in t for key in required_keys):
-            error_msg = f'Transação inválida. Os campos "id", "name", "engine", e "converter" são obrigatórios. Transação problemática: {t}'
+        new_clean_transaction, error_msg = filter_transaction(t)
+        if error_msg:
             return jsonify({'error': error_msg}), 400
-
-        converter_data = t.get('converter')
-        if not isinstance(converter_data, dict):
-            error_msg = f'O campo "converter" deve ser um objeto (dicionário). Transação problemática: {t}'
-            return jsonify({'error': error_msg}), 400
-            
-        required_converter_keys = ['code', 'id', 'name']
-        if not all(key in converter_data for key in required_converter_keys):
-            error_msg = f'Objeto "converter" inválido. Os campos "code", "id", e "name" são obrigatórios. Transação problemática: {t}'
-            return jsonify({'error': error_msg}), 400
-            
-        # --- Criação do novo objeto JSON filtrado ---
-        # Apenas os campos que você quer serão incluídos aqui.
-        new_clean_transaction = {
-            'id': t.get('id'),
-            'name': t.get('name'),
-            'engine': t.get('engine'),
-            'converter': {
-                'id': converter_data.get('id'),
-                'code': converter_data.get('code'),
-                'name': converter_data.get('name')
-            }
-        }
-        
         filtered_transactions_to_add.append(new_clean_transaction)
 
     # 3. Se todas as transações no lote forem válidas, adiciona-as à blockchain
     if not filtered_transactions_to_add:
         return jsonify({'error': 'Nenhuma transação válida foi fornecida.'}), 400
 
-    for clean_t in filtered_transactions_to_add:
-        blockchain.add_transaction(clean_t)
-        
+    # O lote entra no mempool de uma vez: se algum id for repetido (ou não
+    # houver espaço), nenhuma transação do lote é adicionada
+    try:
+        index = blockchain.add_transactions(filtered_transactions_to_add)
+    except TransactionRejected as e:
+        status_code = 409 if e.reason == 'duplicate' else 503
+        return jsonify({'error': str(e), 'transaction_ids': e.transaction_ids}), status_code
+
+    # Propaga o lote para os outros nós em segundo plano
+    transaction_gossip.broadcast(filtered_transactions_to_add)
+
     # 4. Retorna uma resposta de sucesso
-    previous_block = blockchain.get_previous_block()
-    index = previous_block['index'] + 1
     response = {
         'message': f'{len(filtered_transactions_to_add)} transações foram validadas, filtradas e serão adicionadas ao Bloco {index}'
     }
     return jsonify(response), 201
 
+@api_blueprint.route('/transactions/bulk', methods=['POST'])
+def bulk_add_transactions():
+    """
+    Importação em massa de tickets, no formato NDJSON (um ticket JSON por
+    linha, como em requests.jsonl). O corpo é lido e validado linha a linha,
+    sem ser carregado inteiro, e os tickets válidos entram no mempool em uma
+    única operação. Um ticket inválido ou repetido não recusa os demais.
+
+    Responde com o resultado de cada linha ('accepted' ou 'rejected', com o
+    motivo). Com ?details=rejected, a lista traz apenas as linhas recusadas.
+    Exemplo de uso:
+        curl -X POST --data-binary @tickets.jsonl -H 'Content-Type: application/x-ndjson' /transactions/bulk
+    """
+    chain_synchronizer.ensure_fresh()
+    only_rejected = request.args.get('details', 'all') == 'rejected'
+
+    results = []
+    accepted_transactions = []
+    accepted_results = []
+    seen_ids = set()
+    # Leitura com buffer: o stream da requisição, lido linha a linha, faria uma leitura por byte
+    body = io.BufferedReader(request.stream, buffer_size=256 * 1024)
+    for line_number, raw_line in enumerate(body, start=1):
+        if not raw_line.strip():
+            continue
+        try:
+            ticket = json.loads(raw_line)
+        except ValueError as e:
+            results.append({'line': line_number, 'status': 'rejected', 'error': f'JSON inválido: {e}'})
+            continue
+        clean_transaction, error_msg = filter_transaction(ticket)
+        if error_msg:
+            results.append({'line': line_number, 'status': 'rejected', 'error': error_msg})
+            continue
+        tx_id = str(clean_transaction['id'])
+        if tx_id in seen_ids:
+            results.append({'line': line_number, 'id': clean_transaction['id'], 'status': 'rejected',
+                            'error': 'Id repetido na mesma importação.'})
+            continue
+        seen_ids.add(tx_id)
+        result = {'line': line_number, 'id': clean_transaction['id'], 'status': 'accepted'}
+        results.append(result)
+        accepted_transactions.append(clean_transaction)
+        accepted_results.append(result)
+
+    if not results:
+        return jsonify({'error': 'Nenhum ticket foi enviado. Envie um ticket JSON por linha (NDJSON).'}), 400
+
+    # Todos os tickets válidos entram no mempool com uma única aquisição da trava
+    outcomes, index = blockchain.add_transactions_bulk(accepted_transactions)
+    enqueued = []
+    for transaction, result, reason in zip(accepted_transactions, accepted_results, outcomes):
+        if reason is None:
+            enqueued.append(transaction)
+        elif reason == 'duplicate':
+            result.update(status='rejected', error='Transação com id já existente.')
+        else:
+            result.update(status='rejected', error='O mempool está cheio.')
+
+    # Propaga os tickets aceitos para os outros nós em segundo plano
+    transaction_gossip.broadcast(enqueued)
+
+    fields = {
+        'message': f'{len(enqueued)} tickets aceitos, serão adicionados a partir do Bloco {index}.',
+        'accepted': len(enqueued),
+        'rejected': len(results) - len(enqueued)
+    }
+    if only_rejected:
+        results = [result for result in results if result['status'] == 'rejected']
+    status_code = 201 if enqueued else 400
+    return Response(stream_json_list(fields, 'results', results), mimetype='application/json'), status_code
+
 # Adicione esta rota ao final do seu arquivo views.py
 
 @api_blueprint.route('/edit_block_test', methods=['POST'])
@@ -320,16 +694,23 @@ def edit_block_test():
         return jsonify({'error': 'Os campos "block_index" e "new_transaction" são obrigatórios.'}), 400
         
     # Verifica se o índice do bloco é válido
-    if not isinstance(block_index, int) or block_index >= len(blockchain.chain) or block_index < 0:
-        return jsonify({'error': f'Índice de bloco inválido. A blockchain tem {len(blockchain.chain)} blocos (índices de 0 a {len(blockchain.chain) - 1}).'}), 400
+    first = blockchain.chain.first
+    if not isinstance(block_index, int) or block_index >= len(blockchain.chain) or block_index < first:
+        return jsonify({'error': f'Índice de bloco inválido. A blockchain tem {len(blockchain.chain)} blocos (índices de {first} a {len(blockchain.chain) - 1}; os anteriores foram podados).'}), 400
         
     # --- O ATO DA "SABOTAGEM" ---
     # Altera diretamente a lista de transações de um bloco já existente.
     # Isso é algo que NUNCA se deve fazer.
     print(f"--- INICIANDO TESTE DE SABOTAGEM NO BLOCO {block_index} ---")
-    original_block = blockchain.chain[block_index].copy()
-    blockchain.chain[block_index]['transactions'] = [new_transaction]
-    edited_block = blockchain.chain[block_index]
+    with blockchain.lock.write_locked():
+        original_block = blockchain.chain[block_index]
+        # A alteração fica só na memória: os blocos em disco não são regravados
+        edited = dict(original_block)
+        edited['transactions'] = [new_transaction]
+        blockchain.chain[block_index] = edited
+        blockchain.invalidate_block(block_index)
+        blockchain.search_index.rebuild(blockchain.chain)
+        edited_block = blockchain.chain[block_index]
     print(f"Bloco Original: {original_block}")
     print(f"Bloco Editado: {edited_block}")
     
@@ -367,27 +748,139 @@ def connect_node():
     for node in nodes:
         blockchain.register_node(node)
 
+    # Sincroniza com os novos nós em segundo plano
+    chain_synchronizer.trigger()
+
     response = {
         'message': 'Todos os nós foram conectados. A blockchain agora contém os seguintes nós:',
         'total_nodes': list(blockchain.nodes),
     }
     return jsonify(response), 201
 
+@api_blueprint.route('/peers', methods=['GET'])
+def get_peers():
+    """
+    Retorna a saúde dos nós registrados (latência, falhas seguidas, última
+    resposta, backoff e topo anunciado), dos mais saudáveis para os menos.
+    """
+    return jsonify({'peers': blockchain.peers.status(), 'evicted': blockchain.peers.evicted}), 200
+
 @api_blueprint.route('/consensus', methods=['GET'])
 def consensus():
     """
     Executa o algoritmo de consenso para garantir que o nó tem a cadeia correta.
     """
-    replaced = blockchain.resolve_conflicts()
+    replaced = chain_synchronizer.sync()
 
     if replaced:
-        response = {
-            'message': 'A cadeia foi substituída pela cadeia autoritativa (mais longa).',
-            'new_chain': blockchain.chain
+        fields = {
+            'message': 'A cadeia foi substituída pela cadeia autoritativa (de maior trabalho acumulado).',
+            'peers': blockchain.last_peer_report
         }
+        chain_key = 'new_chain'
     else:
-        response = {
+        fields = {
             'message': 'A cadeia atual já é a autoritativa.',
-            'current_chain': blockchain.chain
+            'peers': blockchain.last_peer_report
         }
+        chain_key = 'current_chain'
+    body = stream_json_list(fields, chain_key, blockchain.iter_blocks())
+    return Response(body, mimetype='application/json'), 200
+
+@api_blueprint.route('/sync/status', methods=['GET'])
+def sync_status():
+    """
+    Retorna o estado da sincronização da cadeia em segundo plano.
+    """
+    response = chain_synchronizer.status()
+    response['block_announcements'] = block_announcer.stats()
+    return jsonify(response), 200
+
+@api_blueprint.route('/mempool', methods=['GET'])
+def mempool_stats():
+    """
+    Retorna o tamanho, os limites e os contadores do mempool.
+    """
+    response = blockchain.mempool.stats()
+    response['gossip'] = transaction_gossip.stats()
+    return jsonify(response), 200
+
+@api_blueprint.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Retorna as métricas do nó no formato de texto do Prometheus: contadores
+    e latências por rota, prova de trabalho, consultas a outros nós,
+    validação, gravações em disco e tamanho do mempool. No modo de produção
+    com réplicas, inclui as requisições atendidas por elas.
+    """
+    mempool_stats = blockchain.mempool.stats()
+    metrics.mempool_transactions.set(mempool_stats['pending'])
+    metrics.mempool_bytes.set(mempool_stats['pending_bytes'])
+    head = blockchain.get_head()
+    metrics.chain_height.set(head['height'])
+    metrics.chain_cumulative_work.set(head['cumulative_work'])
+    metrics.mining_difficulty.set(blockchain.next_difficulty())
+    available = len(blockchain.peers.available())
+    metrics.peers.labels('available').set(available)
+    metrics.peers.labels('backoff').set(len(blockchain.peers) - available)
+    # Com réplicas, os contadores e latências delas são somados aos deste processo
+    exports = replica_pool.collect_metrics() if replica_pool is not None else []
+    return Response(metrics.REGISTRY.render(exports), content_type=metrics.CONTENT_TYPE), 200
+
+@api_blueprint.route('/metrics/export', methods=['GET'])
+def export_metrics():
+    """
+    Retorna os contadores e histogramas deste processo em JSON. Usada pelo
+    processo escritor do modo de produção para somar as métricas das réplicas.
+    """
+    return jsonify(metrics.REGISTRY.export()), 200
+
+@api_blueprint.route('/transactions/gossip', methods=['POST'])
+def receive_gossip():
+    """
+    Recebe um lote de transações propagado por outro nó.
+    Transações inválidas ou já conhecidas são ignoradas.
+    """
+    json_data = request.get_json(silent=True) or {}
+    transactions_input = json_data.get('transactions')
+    if not isinstance(transactions_input, list):
+        return jsonify({'error': 'O campo "transactions" deve ser uma lista.'}), 400
+
+    valid_transactions = []
+    for t in transactions_input:
+        clean_transaction, error_msg = filter_transaction(t)
+        if clean_transaction is not None:
+            valid_transactions.append(clean_transaction)
+
+    accepted = transaction_gossip.receive(valid_transactions)
+    response = {
+        'received': len(transactions_input),
+        'accepted': accepted
+    }
     return jsonify(response), 200
+
+@api_blueprint.route('/blocks/announce', methods=['POST'])
+def receive_block_announcement():
+    """
+    Recebe um bloco recém-minerado por outro nó.
+    Se ele se encaixa no nosso topo, é anexado e repassado aos demais nós;
+    se houver um buraco ou uma bifurcação, pede uma sincronização.
+    """
+    json_data = request.get_json(silent=True) or {}
+    block = json_data.get('block')
+    error = validate_block_fields(block)
+    if error:
+        return jsonify({'error': f'Bloco inválido. {error}'}), 400
+
+    status = blockchain.receive_block(block)
+    if status == 'appended':
+        block_announcer.announce(block)
+    elif status in ('gap', 'fork'):
+        # Busca os blocos que faltam pela sincronização por intervalos
+        chain_synchronizer.trigger()
+
+    response = {
+        'status': status,
+        'height': len(blockchain.chain)
+    }
+    return jsonify(response), 400 if status == 'invalid' else 200